@@ -0,0 +1,214 @@
+"""Chromium launch options and measurements for WhatsApp Web automation.
+
+Lean mode trims what the automation never looks at: chat-list avatars, incoming
+media thumbnails and web fonts are blocked through Playwright request routing,
+and Chromium runs with flags that cut background work and renderer memory.
+Uploads (POSTs to the media hosts), the app bundle and emoji assets still load.
+
+`desktop_user_agent` lets headless Chromium pass WhatsApp Web's browser check.
+
+`process_tree_rss` reads /proc to report how much memory the browser processes
+started by this Python process use; `python -m src.browser` compares page-ready
+time and RSS with and without lean mode against a local stand-in page.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse
+
+LEAN_CHROMIUM_ARGS = [
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-background-timer-throttling",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,AutofillServerCommunication",
+    "--no-first-run",
+    "--mute-audio",
+    "--renderer-process-limit=2",
+    "--disable-dev-shm-usage",
+]
+
+BLOCKED_RESOURCE_TYPES = {"font"}
+# Profile pictures (chat list, headers).
+AVATAR_HOST_SUFFIX = "pps.whatsapp.net"
+# Encrypted media CDN: GETs are thumbnails/downloads of received media; POSTs
+# are our uploads and must pass.
+MEDIA_HOST_PREFIX = "mmg"
+
+
+def desktop_user_agent(user_agent: str) -> str:
+    """
+    Headless Chromium announces itself as ``HeadlessChrome``, which WhatsApp Web
+    treats as an unsupported browser; report the regular Chrome token instead.
+    """
+    return user_agent.replace("HeadlessChrome/", "Chrome/")
+
+
+def should_block(url: str, resource_type: str, method: str = "GET") -> bool:
+    """True for requests lean mode drops."""
+    if resource_type in BLOCKED_RESOURCE_TYPES:
+        return True
+    host = (urlparse(url).hostname or "").lower()
+    if host.endswith(AVATAR_HOST_SUFFIX):
+        return True
+    if (
+        method.upper() == "GET"
+        and host.startswith(MEDIA_HOST_PREFIX)
+        and host.endswith(".whatsapp.net")
+    ):
+        return True
+    return False
+
+
+def install_lean_routing(context) -> None:
+    """Route every request of ``context`` through `should_block`."""
+
+    def _handle(route, request):
+        if should_block(request.url, request.resource_type, request.method):
+            route.abort()
+        else:
+            route.continue_()
+
+    context.route("**/*", _handle)
+
+
+async def install_lean_routing_async(context) -> None:
+    """`install_lean_routing` for a ``playwright.async_api`` context."""
+
+    async def _handle(route, request):
+        if should_block(request.url, request.resource_type, request.method):
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route("**/*", _handle)
+
+
+def _read_rss_kib(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", encoding="utf-8") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def process_tree_rss(root_pid: int | None = None) -> int:
+    """
+    Resident memory (bytes) of all descendants of ``root_pid`` (default: this
+    process), i.e. the browser processes it launched. 0 where /proc is missing.
+    """
+    root = root_pid or os.getpid()
+    children: dict[int, list[int]] = {}
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return 0
+    for name in entries:
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", encoding="utf-8") as fh:
+                stat = fh.read()
+            # Field 4 (ppid) follows the parenthesised command name.
+            ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(name))
+
+    total = 0
+    stack = list(children.get(root, []))
+    while stack:
+        pid = stack.pop()
+        total += _read_rss_kib(pid)
+        stack.extend(children.get(pid, []))
+    return total * 1024
+
+
+_STANDIN_HTML = """<!doctype html>
+<html><head><meta charset="utf-8">
+<style>@font-face{font-family:f;src:url(/font.woff2)}body{font-family:f}</style>
+</head><body>
+<div id="pane-side">%s</div>
+<footer><div role="textbox" contenteditable="true"></div></footer>
+</body></html>
+"""
+
+
+def _write_standin(root: Path, rows: int = 200) -> None:
+    """A chat-list-like page: one avatar per row (from the avatar host) and a web font."""
+    (root / "font.woff2").write_bytes(os.urandom(64 * 1024))
+    (root / "avatar.jpg").write_bytes(os.urandom(32 * 1024))
+    items = "".join(
+        f'<div role="listitem"><img src="http://{AVATAR_HOST_SUFFIX}/avatar.jpg?{i}">'
+        f'<span title="Chat {i}">Chat {i}</span></div>'
+        for i in range(rows)
+    )
+    (root / "index.html").write_text(_STANDIN_HTML % items, encoding="utf-8")
+
+
+def bench(*, lean: bool, headless: bool = True, rows: int = 200) -> dict:
+    """
+    Load the stand-in page once; return page-ready time and browser RSS.
+    The avatar host resolves to the local server, so the real `should_block`
+    rules apply unchanged.
+    """
+    from playwright.sync_api import sync_playwright
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        _write_standin(root, rows)
+        handler = partial(SimpleHTTPRequestHandler, directory=str(root))
+        handler.log_message = lambda *a, **k: None  # type: ignore[assignment]
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.server_address[1]
+        args = [f"--host-resolver-rules=MAP {AVATAR_HOST_SUFFIX} 127.0.0.1:{port}"]
+        if lean:
+            args += LEAN_CHROMIUM_ARGS
+        try:
+            with sync_playwright() as pw:
+                t0 = time.perf_counter()
+                browser = pw.chromium.launch(headless=headless, args=args)
+                context = browser.new_context()
+                if lean:
+                    install_lean_routing(context)
+                page = context.new_page()
+                page.goto(f"http://127.0.0.1:{port}/index.html", wait_until="load")
+                page.wait_for_selector("footer div[role=textbox]")
+                ready_s = time.perf_counter() - t0
+                rss = process_tree_rss()
+                browser.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+    return {"lean": lean, "ready_s": round(ready_s, 3), "rss_mib": rss >> 20}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(
+        description="Compare page-ready time and RSS with and without lean mode."
+    )
+    ap.add_argument("--rows", type=int, default=200, help="Chat rows in the page")
+    ap.add_argument("--headed", action="store_true", help="Show the browser")
+    args = ap.parse_args()
+    for lean in (False, True):
+        r = bench(lean=lean, headless=not args.headed, rows=args.rows)
+        label = "lean   " if lean else "default"
+        print(f"[browser] {label}: ready {r['ready_s']:.2f}s, RSS {r['rss_mib']} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""Crash-resumable journal of the current run (``run_checkpoint.json``).
+
+`stage_run` writes what it has done so far: the listing (items per recipient,
+the post cursor and story mark it would record), then the files of each item
+as its download finishes. Sends completed per recipient are added as they
+happen. If the process dies before the run finishes, the next run for the
+same scope continues from there: it reuses the listing and the on-disk files,
+only downloads what is missing, and skips Instagram entirely when nothing is.
+A finished run removes the journal.
+
+Downloads are journaled before image optimization; optimizing them again on
+resume is served from the optimizer's cache. Items kept only in memory
+(zero-disk mode) are not journaled as downloaded and are fetched again.
+There is one journal: a run for a different scope (another recipient, or
+``--force``) starts over and replaces it.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from src.ig import IgItem, PostCursor
+from src.media import MediaFile
+
+CHECKPOINT_PATH = Path("run_checkpoint.json")
+# Older journals are ignored: the listing is stale and a fresh run is cheap.
+MAX_CHECKPOINT_AGE_S = 6 * 60 * 60
+
+
+@dataclass
+class RunCheckpoint:
+    recipient_id: str | None
+    force_resend_current: bool
+    listed_ts: float
+    post_cursor: dict | None = None  # {"pk": ..., "ts": ...}
+    story_mark: float | None = None
+    items: dict[str, dict] = field(default_factory=dict)  # unique_id -> item fields
+    items_by_recipient: dict[str, list[str]] = field(default_factory=dict)
+    downloaded: dict[str, list[str]] = field(default_factory=dict)  # on-disk only
+    sent: dict[str, list[str]] = field(default_factory=dict)
+    path: Path = field(default=CHECKPOINT_PATH, repr=False, compare=False)
+
+    def save(self) -> None:
+        payload = asdict(self)
+        payload.pop("path")
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(
+            json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8"
+        )
+        os.replace(tmp, self.path)
+
+    def record_listing(
+        self,
+        items_by_recipient: dict[str, list[IgItem]],
+        post_cursor: PostCursor | None,
+        story_mark: float | None,
+    ) -> None:
+        self.post_cursor = (
+            {"pk": post_cursor.pk, "ts": post_cursor.ts} if post_cursor else None
+        )
+        self.story_mark = story_mark
+        self.items = {
+            it.unique_id: item_to_dict(it)
+            for lst in items_by_recipient.values()
+            for it in lst
+        }
+        self.items_by_recipient = {
+            rid: [it.unique_id for it in lst] for rid, lst in items_by_recipient.items()
+        }
+        self.save()
+
+    def record_download(self, uid: str, files: list[MediaFile]) -> None:
+        """Journal the raw (not yet optimized) download of ``uid`` if all on disk."""
+        if not files or not all(isinstance(p, Path) for p in files):
+            return
+        self.downloaded[uid] = [str(p) for p in files]
+        self.save()
+
+    def mark_sent(self, rid: str, unique_ids: list[str]) -> None:
+        done = self.sent.setdefault(rid, [])
+        done.extend(u for u in unique_ids if u not in done)
+        self.save()
+
+    def cursor(self) -> PostCursor | None:
+        if not self.post_cursor:
+            return None
+        return PostCursor(pk=self.post_cursor.get("pk"), ts=self.post_cursor["ts"])
+
+    def reusable_files(self, uid: str) -> list[Path] | None:
+        """Journaled files of ``uid`` if all still exist on disk, else None."""
+        paths = [Path(p) for p in self.downloaded.get(uid, [])]
+        if paths and all(p.exists() for p in paths):
+            return paths
+        return None
+
+
+def item_to_dict(it: IgItem) -> dict:
+    return {
+        "kind": it.kind,
+        "unique_id": it.unique_id,
+        "title": it.title,
+        "caption": it.caption,
+        "created_ts": it.created_ts,
+        "media_pk": it._media_pk,
+        "story_is_close_friends": it.story_is_close_friends,
+    }
+
+
+def item_from_dict(d: dict) -> IgItem:
+    """An item without an Instagram client; rebind with `IgClient.rebind` to download."""
+    return IgItem(
+        kind=d["kind"],
+        unique_id=d["unique_id"],
+        title=d.get("title", ""),
+        caption=d.get("caption", ""),
+        created_ts=float(d.get("created_ts") or 0.0),
+        story_is_close_friends=d.get("story_is_close_friends"),
+        _client=None,
+        _media_pk=int(d["media_pk"]),
+    )
+
+
+def start_checkpoint(
+    *,
+    recipient_id: str | None,
+    force_resend_current: bool,
+    listed_ts: float,
+    path: Path = CHECKPOINT_PATH,
+) -> RunCheckpoint:
+    return RunCheckpoint(
+        recipient_id=recipient_id,
+        force_resend_current=force_resend_current,
+        listed_ts=listed_ts,
+        path=path,
+    )
+
+
+def load_checkpoint(
+    *,
+    recipient_id: str | None,
+    force_resend_current: bool,
+    now: float | None = None,
+    path: Path = CHECKPOINT_PATH,
+) -> RunCheckpoint | None:
+    """The unfinished run for this scope, or None (none, other scope, or too old)."""
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        cp = RunCheckpoint(**data, path=path)
+    except Exception:
+        return None
+    now = time.time() if now is None else now
+    if (
+        cp.recipient_id != recipient_id
+        or cp.force_resend_current != force_resend_current
+        or now - cp.listed_ts > MAX_CHECKPOINT_AGE_S
+    ):
+        return None
+    return cp
+
+
+def clear_checkpoint(path: Path = CHECKPOINT_PATH) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,241 @@
+"""Resumable, streaming HTTP downloads for large media files.
+
+instagrapi's ``video_download`` buffers the whole response and cannot resume,
+so a dropped connection on a large reel restarts from zero on the next run.
+This module streams a CDN URL to a ``.part`` file in fixed-size chunks, resumes
+from the partial file with an HTTP ``Range`` request, verifies the expected
+length and atomically renames the file into place once it is complete.
+"""
+
+from __future__ import annotations
+
+import http.client
+import os
+import re
+import socket
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+from src.exceptions import MediaDownloadError
+from src.media import InlineMedia, MediaFile, guess_mime_type, spill_dir
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024  # 1 MiB
+DEFAULT_TIMEOUT_S = 30.0
+DEFAULT_MAX_ATTEMPTS = 4
+
+_USER_AGENT = (
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+|\*)-?(\d*)/(\d+|\*)")
+
+# Errors that mean "the connection dropped"; the .part file is kept and resumed.
+_RETRYABLE_ERRORS = (
+    urllib.error.URLError,
+    http.client.IncompleteRead,
+    http.client.HTTPException,
+    ConnectionError,
+    socket.timeout,
+    TimeoutError,
+)
+
+
+def part_path_for(dest: Path) -> Path:
+    """Path of the in-progress download for ``dest``."""
+    return dest.with_name(dest.name + ".part")
+
+
+def _parse_content_range(value: str) -> tuple[Optional[int], Optional[int]]:
+    """
+    Parse ``Content-Range`` into (start, total). Either may be None when the
+    server sends ``*`` (e.g. ``bytes */1234`` on a 416).
+    """
+    m = _CONTENT_RANGE_RE.match((value or "").strip())
+    if not m:
+        return None, None
+    start = int(m.group(1)) if m.group(1) != "*" else None
+    total = int(m.group(3)) if m.group(3) != "*" else None
+    return start, total
+
+
+def _open(url: str, *, offset: int, timeout_s: float, headers: dict[str, str]):
+    req_headers = {"User-Agent": _USER_AGENT, **headers}
+    if offset > 0:
+        req_headers["Range"] = f"bytes={offset}-"
+    req = urllib.request.Request(url, headers=req_headers)
+    return urllib.request.urlopen(req, timeout=timeout_s)  # noqa: S310 - CDN URL
+
+
+def _stream_once(
+    url: str,
+    part: Path,
+    *,
+    chunk_size: int,
+    timeout_s: float,
+    headers: dict[str, str],
+) -> Optional[int]:
+    """
+    Run one request, appending to ``part``. Returns the total size announced by
+    the server (None if unknown). Network errors propagate to the caller.
+    """
+    offset = part.stat().st_size if part.exists() else 0
+    try:
+        resp = _open(url, offset=offset, timeout_s=timeout_s, headers=headers)
+    except urllib.error.HTTPError as e:
+        if e.code == 416:
+            # Range not satisfiable: either we already have everything,
+            # or the partial file does not belong to this object anymore.
+            _, total = _parse_content_range(e.headers.get("Content-Range", ""))
+            if total is not None and offset == total:
+                return total
+            part.unlink(missing_ok=True)
+            raise http.client.HTTPException("stale partial download discarded") from e
+        raise
+
+    with resp:
+        status = getattr(resp, "status", None) or resp.getcode()
+        total: Optional[int] = None
+        if status == 206:
+            start, total = _parse_content_range(resp.headers.get("Content-Range", ""))
+            if start != offset:
+                # Server resumed from somewhere else; start over cleanly.
+                part.unlink(missing_ok=True)
+                raise http.client.HTTPException(
+                    f"server resumed at byte {start}, expected {offset}"
+                )
+            mode = "ab"
+        else:
+            # 200: server ignored the Range header, so rewrite from zero.
+            length = resp.headers.get("Content-Length")
+            total = int(length) if length and length.isdigit() else None
+            mode = "wb"
+
+        with part.open(mode) as fh:
+            while True:
+                chunk = resp.read(chunk_size)
+                if not chunk:
+                    break
+                fh.write(chunk)
+    return total
+
+
+def download_resumable(
+    url: str,
+    dest: Path,
+    *,
+    expected_size: Optional[int] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    timeout_s: float = DEFAULT_TIMEOUT_S,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    headers: Optional[dict[str, str]] = None,
+    retry_delay_s: float = 2.0,
+) -> Path:
+    """
+    Download ``url`` to ``dest`` in ``chunk_size`` pieces, resuming from
+    ``dest``'s ``.part`` file if a previous attempt was interrupted.
+
+    Memory use is bounded by ``chunk_size``. The file only appears at ``dest``
+    once its length matches what the server (or ``expected_size``) announced.
+    If every attempt fails, the partial file is kept for the next run and
+    ``MediaDownloadError`` is raised.
+    """
+    dest = Path(dest)
+    if dest.exists() and (
+        expected_size is None or dest.stat().st_size == expected_size
+    ):
+        return dest
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part = part_path_for(dest)
+    chunk_size = max(1, int(chunk_size))
+    hdrs = dict(headers or {})
+
+    last_err: Optional[BaseException] = None
+    for attempt in range(1, max(1, max_attempts) + 1):
+        try:
+            total = _stream_once(
+                url, part, chunk_size=chunk_size, timeout_s=timeout_s, headers=hdrs
+            )
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500 and e.code not in (408, 429):
+                # Expired/forbidden CDN URL: retrying the same URL won't help.
+                raise MediaDownloadError(
+                    f"Download of {dest.name} failed: HTTP {e.code}"
+                ) from e
+            last_err = e
+        except _RETRYABLE_ERRORS as e:
+            last_err = e
+        else:
+            want = expected_size if expected_size is not None else total
+            have = part.stat().st_size if part.exists() else 0
+            if want is None or have == want:
+                os.replace(part, dest)
+                return dest
+            if have > want:
+                part.unlink(missing_ok=True)
+                last_err = http.client.HTTPException(
+                    f"got {have} bytes, expected {want}; discarded"
+                )
+            else:
+                last_err = http.client.IncompleteRead(b"", want - have)
+
+        have = part.stat().st_size if part.exists() else 0
+        print(
+            f"[download] {dest.name}: attempt {attempt}/{max_attempts} interrupted "
+            f"at {have} bytes ({last_err}); resuming"
+        )
+        time.sleep(min(retry_delay_s * attempt, 10.0))
+
+    raise MediaDownloadError(
+        f"Download of {dest.name} incomplete after {max_attempts} attempts; "
+        f"partial file kept at {part}"
+    ) from last_err
+
+
+def fetch_media(
+    url: str,
+    name: str,
+    *,
+    inline_max_bytes: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    timeout_s: float = DEFAULT_TIMEOUT_S,
+) -> MediaFile:
+    """
+    Fetch ``url`` for the zero-disk mode.
+
+    Responses up to ``inline_max_bytes`` are returned as ``InlineMedia``. Larger
+    ones spill to a tmpfs-backed file: the bytes read so far become the
+    ``.part`` file and ``download_resumable`` continues from there with Range.
+    """
+    dest = spill_dir() / name
+    try:
+        resp = _open(url, offset=0, timeout_s=timeout_s, headers={})
+    except _RETRYABLE_ERRORS:
+        # Let the resumable path own retries/errors for flaky connections.
+        return download_resumable(url, dest, chunk_size=chunk_size, timeout_s=timeout_s)
+
+    with resp:
+        length = resp.headers.get("Content-Length")
+        total = int(length) if length and length.isdigit() else None
+        if total is None or total <= inline_max_bytes:
+            buf = bytearray()
+            try:
+                while len(buf) <= inline_max_bytes:
+                    chunk = resp.read(chunk_size)
+                    if not chunk:
+                        break
+                    buf.extend(chunk)
+            except _RETRYABLE_ERRORS:
+                pass
+            else:
+                complete = total is None or len(buf) == total
+                if complete and len(buf) <= inline_max_bytes:
+                    return InlineMedia(
+                        name=name, mime_type=guess_mime_type(name), data=bytes(buf)
+                    )
+            # Too big (or cut short): hand what we have to the resumable path.
+            part_path_for(dest).write_bytes(bytes(buf))
+
+    return download_resumable(url, dest, chunk_size=chunk_size, timeout_s=timeout_s)
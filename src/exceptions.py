@@ -59,6 +59,13 @@ class InstagramAuthenticationError(PermanentError):
     pass
 
 
+class MediaDownloadError(TransientError):
+    """Media download was interrupted; a partial file is kept for resuming."""
+
+    def __init__(self, message: str, retry_after_seconds: int = 60):
+        super().__init__(message, retry_after_seconds)
+
+
 class WhatsAppError(InstaBridgeError):
     """WhatsApp automation related errors."""
 
@@ -82,6 +89,15 @@ class WhatsAppSendError(TransientError):
     pass
 
 
+class WhatsAppLoggedOutError(PermanentError):
+    """WhatsApp Web session in the browser profile is logged out (QR shown).
+
+    Needs a headed run to scan the QR code again; retrying won't help.
+    """
+
+    pass
+
+
 class StateError(InstaBridgeError):
     """State persistence or loading error."""
 
@@ -1,14 +1,65 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
 from typing import Optional
+from urllib.parse import urlparse
 
 from instagrapi import Client
 
+from src.downloader import download_resumable, fetch_media
+from src.media import MediaFile
 from src.rate_limiter import RateLimits, human_like_delay
 
 
+def _http_url(v) -> Optional[str]:
+    """instagrapi exposes CDN URLs as pydantic HttpUrl (or None); normalize to str."""
+    if not v:
+        return None
+    s = str(v)
+    return s if s.startswith(("http://", "https://")) else None
+
+
+def _video_filename(info, media_pk: int) -> str:
+    # Same naming scheme as instagrapi's video_download / story_download.
+    username = str(getattr(getattr(info, "user", None), "username", "") or "").strip()
+    return f"{username}_{media_pk}.mp4" if username else f"{media_pk}.mp4"
+
+
+def _photo_filename(info, media_pk: int, url: str) -> str:
+    # instagrapi keeps the CDN file's extension (jpg/webp/heic) for photos.
+    ext = urlparse(url).path.rsplit(".", 1)[-1].lower() or "jpg"
+    if not ext.isalnum() or len(ext) > 4:
+        ext = "jpg"
+    return _video_filename(info, media_pk)[: -len("mp4")] + ext
+
+
+def _cdn_sources(info, media_pk: int) -> list[tuple[str, str]]:
+    """
+    (url, filename) for every file of a media/story info object.
+    Returns [] if any URL is missing, so callers can fall back to instagrapi.
+    """
+    if info is None:
+        return []
+    if getattr(info, "media_type", None) == 8:
+        parts = list(getattr(info, "resources", None) or [])
+    else:
+        parts = [info]
+    out: list[tuple[str, str]] = []
+    for res in parts:
+        pk = getattr(res, "pk", None) or media_pk
+        if getattr(res, "media_type", None) == 2:
+            url = _http_url(getattr(res, "video_url", None))
+            name = _video_filename(info, pk) if url else ""
+        else:
+            url = _http_url(getattr(res, "thumbnail_url", None))
+            name = _photo_filename(info, pk, url) if url else ""
+        if not url:
+            return []
+        out.append((url, name))
+    return out
+
+
 @dataclass(frozen=True)
 class IgItem:
     kind: str  # "post" | "story"
@@ -21,20 +72,33 @@ class IgItem:
     # Stories only: True if "close friends" story, False if normal, None if unknown.
     story_is_close_friends: Optional[bool] = None
 
-    def download(self, dest_dir: Path) -> list[Path]:
-        """Download media with small human-like delay between files."""
-        dest_dir.mkdir(exist_ok=True)
+    def download(self, dest_dir: Path, *, inline_max_bytes: int = 0) -> list[MediaFile]:
+        """
+        Download media with small human-like delay between files.
 
+        With ``inline_max_bytes`` > 0 (zero-disk mode) files up to that size are
+        returned in memory and larger ones spill to tmpfs instead of ``dest_dir``.
+        """
         # Small delay to appear more human-like
         human_like_delay(0.5, 1.5)
 
         if self.kind == "post":
             info = self._client.media_info(self._media_pk)
+            if inline_max_bytes > 0:
+                inline = self._fetch_inline(info, inline_max_bytes)
+                if inline:
+                    return inline
+            dest_dir.mkdir(exist_ok=True)
             media_type = getattr(info, "media_type", None)  # 1=photo,2=video,8=album
             if media_type == 1:
                 out = self._client.photo_download(self._media_pk, folder=str(dest_dir))
                 return [Path(out)]
             if media_type == 2:
+                # Large reels: stream + resume instead of instagrapi's all-in-one download.
+                url = _http_url(getattr(info, "video_url", None))
+                if url:
+                    dest = dest_dir / _video_filename(info, self._media_pk)
+                    return [download_resumable(url, dest)]
                 out = self._client.video_download(self._media_pk, folder=str(dest_dir))
                 return [Path(out)]
             if media_type == 8:
@@ -51,12 +115,60 @@ class IgItem:
                 return [Path(out)]
 
         if self.kind == "story":
+            try:
+                info = self._client.story_info(self._media_pk)
+            except Exception:
+                info = None
+            if inline_max_bytes > 0:
+                inline = self._fetch_inline(info, inline_max_bytes)
+                if inline:
+                    return inline
+            dest_dir.mkdir(exist_ok=True)
+            url = _http_url(getattr(info, "video_url", None))
+            if url and getattr(info, "media_type", None) == 2:
+                dest = dest_dir / _video_filename(info, self._media_pk)
+                return [download_resumable(url, dest)]
             out = self._client.story_download(self._media_pk, folder=str(dest_dir))
             if isinstance(out, (list, tuple)):
                 return [Path(p) for p in out]
             return [Path(out)]
         raise ValueError(f"Unknown kind: {self.kind}")
 
+    def _fetch_inline(self, info, inline_max_bytes: int) -> list[MediaFile]:
+        sources = _cdn_sources(info, self._media_pk)
+        return [
+            fetch_media(url, name, inline_max_bytes=inline_max_bytes)
+            for url, name in sources
+        ]
+
+
+# Profiles can pin up to 3 posts; they are listed first regardless of age.
+MAX_PINNED_POSTS = 3
+
+
+@dataclass(frozen=True)
+class PostCursor:
+    """Newest post seen so far; the incremental lister stops when it reaches it."""
+
+    pk: Optional[str]
+    ts: float
+
+
+@dataclass(frozen=True)
+class ActivityProbe:
+    """Result of `IgClient.probe_activity`; a change means there may be new items."""
+
+    media_count: Optional[int]
+    latest_story_ts: float
+
+
+def _taken_ts(m) -> float:
+    taken_at = getattr(m, "taken_at", None)
+    try:
+        return float(taken_at.timestamp()) if taken_at is not None else 0.0
+    except Exception:
+        return 0.0
+
 
 class IgClient:
     def __init__(
@@ -80,6 +192,10 @@ class IgClient:
         self._cl.login(username, password)
         self._cl.dump_settings(str(self._session_path))
 
+    def rebind(self, item: IgItem) -> IgItem:
+        """``item`` (e.g. restored from a checkpoint) bound to this session."""
+        return replace(item, _client=self._cl)
+
     def get_user_info_by_username(self, username: str):
         """
         Returns instagrapi User info for a username.
@@ -245,8 +361,111 @@ class IgClient:
             )
         return out
 
-    def get_active_story_items(self) -> list[IgItem]:
-        """Fetch active stories with rate limiting."""
+    def get_new_post_items_after(
+        self,
+        cursor: PostCursor,
+        *,
+        page_size: int = 4,
+        max_pages: int = 25,
+    ) -> tuple[list[IgItem], PostCursor]:
+        """
+        Incremental lister: pages the feed newest-first and stops as soon as it
+        reaches the post recorded in ``cursor``. The usual run is one small
+        request; bursts are covered up to ``page_size * max_pages`` posts.
+        Returns (new posts newest first, updated cursor).
+        """
+        if self._enable_rate_limiting:
+            self._rate_limiter.wait()
+
+        user_id = self._cl.user_id
+        if not user_id:
+            return [], cursor
+
+        out: list[IgItem] = []
+        newest = cursor
+        old_seen = 0
+        end_cursor = ""
+        for page in range(max_pages):
+            if page and self._enable_rate_limiting:
+                self._rate_limiter.wait()
+            medias, end_cursor = self._cl.user_medias_paginated_v1(  # type: ignore[attr-defined]
+                user_id, page_size, end_cursor=end_cursor
+            )
+            done = False
+            for i, m in enumerate(medias or []):
+                pk = str(m.pk)
+                taken_ts = _taken_ts(m)
+                if taken_ts > newest.ts:
+                    newest = PostCursor(pk=pk, ts=taken_ts)
+                if taken_ts > cursor.ts and pk != cursor.pk:
+                    caption = (getattr(m, "caption_text", None) or "").strip()
+                    out.append(
+                        IgItem(
+                            kind="post",
+                            unique_id=f"post:{m.pk}",
+                            title="Post",
+                            caption=caption,
+                            created_ts=taken_ts,
+                            story_is_close_friends=None,
+                            _client=self._cl,
+                            _media_pk=int(m.pk),
+                        )
+                    )
+                    continue
+                # An already-seen post. If something newer follows it on the
+                # same page it is pinned, and the real feed continues below.
+                pinned = any(_taken_ts(x) > taken_ts for x in medias[i + 1 :])
+                if pk == cursor.pk and not pinned:
+                    done = True
+                    break
+                old_seen += 1
+                if old_seen > MAX_PINNED_POSTS:
+                    done = True
+                    break
+            if done or not end_cursor:
+                break
+        out.sort(key=lambda it: it.created_ts, reverse=True)
+        return out, newest
+
+    def probe_activity(self) -> Optional[ActivityProbe]:
+        """
+        Cheap change probe: one user-info request giving the post count and the
+        newest active story time (``latest_reel_media``). Much lighter than
+        listing the feed or the reel. Returns None if the request fails.
+        """
+        if self._enable_rate_limiting:
+            self._rate_limiter.wait()
+
+        user_id = self._cl.user_id
+        if not user_id:
+            return None
+        try:
+            data = self._cl.private_request(f"users/{user_id}/info/")
+            user = (data or {}).get("user") or {}
+            media_count = user.get("media_count")
+            return ActivityProbe(
+                media_count=int(media_count) if media_count is not None else None,
+                latest_story_ts=float(user.get("latest_reel_media") or 0),
+            )
+        except Exception:
+            return None
+
+    def get_latest_story_ts(self) -> Optional[float]:
+        """Unix time of the newest active story (0.0 if none), or None if unknown."""
+        probe = self.probe_activity()
+        return probe.latest_story_ts if probe is not None else None
+
+    def rate_budget_left(self) -> float:
+        """Fraction (0..1) of the hourly request budget still unused."""
+        return self._rate_limiter.budget_left()
+
+    def get_active_story_items(
+        self, *, newer_than: Optional[float] = None
+    ) -> list[IgItem]:
+        """
+        Fetch active stories with rate limiting.
+        With ``newer_than`` (unix seconds), only stories taken after it are returned.
+        """
         if self._enable_rate_limiting:
             self._rate_limiter.wait()
 
@@ -283,6 +502,8 @@ class IgClient:
                 taken_ts = float(taken_at.timestamp()) if taken_at is not None else 0.0
             except Exception:
                 taken_ts = 0.0
+            if newer_than is not None and taken_ts <= newer_than:
+                continue
             items.append(
                 IgItem(
                     kind="story",
@@ -297,6 +518,19 @@ class IgClient:
             )
         return items
 
+    def get_active_story_ids(self) -> set[str]:
+        """
+        unique_ids ("story:<pk>") of the currently active stories.
+        Used to re-check staged stories before delivery.
+        """
+        if self._enable_rate_limiting:
+            self._rate_limiter.wait()
+
+        user_id = self._cl.user_id
+        if not user_id:
+            return set()
+        return {f"story:{s.pk}" for s in (self._cl.user_stories(user_id) or [])}
+
     def get_latest_story(self) -> Optional[IgItem]:
         user_id = self._cl.user_id
         if not user_id:
@@ -0,0 +1,171 @@
+"""Pre-upload image optimization (Pillow).
+
+WhatsApp recompresses every photo it receives, so uploading full-resolution
+originals through the browser only costs upload time. This stage resizes
+JPEG/WebP images to WhatsApp's effective maximum dimension and re-encodes them
+at a target quality, fanning out over a process pool. Results are cached by
+the SHA-256 of the original bytes, so each image is processed once.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from src.media import InlineMedia, MediaFile
+
+CACHE_DIR = Path("media") / ".optimized"
+
+# WhatsApp Web downsizes photos to ~1600px on the long edge before sending.
+WHATSAPP_MAX_DIM = 1600
+DEFAULT_QUALITY = 80
+
+_SUFFIX_TO_FORMAT = {".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WEBP"}
+
+# In-memory cache for inline media (zero-disk mode must not write the disk cache).
+# sha256 key -> optimized bytes, or None if the original was already optimal.
+_inline_cache: dict[str, Optional[bytes]] = {}
+
+
+@dataclass(frozen=True)
+class ImageOptions:
+    max_dim: int = WHATSAPP_MAX_DIM
+    quality: int = DEFAULT_QUALITY
+    workers: int = 0  # 0 = os.cpu_count()
+
+
+def _format_for(name: str) -> Optional[str]:
+    return _SUFFIX_TO_FORMAT.get(Path(name).suffix.lower())
+
+
+def optimize_image_bytes(
+    data: bytes, fmt: str, max_dim: int, quality: int
+) -> Optional[bytes]:
+    """
+    Resize/re-encode one image. Returns None when the original should be kept
+    (undecodable, or re-encoding would not make it smaller).
+
+    Module-level so it can run in a worker process.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            # Bake EXIF orientation into pixels; we drop EXIF on re-encode.
+            img = ImageOps.exif_transpose(im)
+            resized = max(img.size) > max_dim
+            if resized:
+                img.thumbnail((max_dim, max_dim), Image.Resampling.LANCZOS)
+            if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            if fmt == "JPEG":
+                img.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+            else:
+                img.save(out, "WEBP", quality=quality, method=4)
+    except Exception:
+        return None
+    optimized = out.getvalue()
+    if not resized and len(optimized) >= len(data):
+        return None
+    return optimized
+
+
+def _cache_key(data: bytes, opts: ImageOptions) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest}-{opts.max_dim}-{opts.quality}"
+
+
+def optimize_media(
+    files: list[MediaFile],
+    *,
+    opts: ImageOptions = ImageOptions(),
+    cache_dir: Optional[Path] = None,
+) -> list[MediaFile]:
+    """
+    Return ``files`` with JPEG/WebP images replaced by optimized versions.
+    Other media (videos, PNG, HEIC, ...) pass through unchanged, as does any
+    image that fails to optimize. Order is preserved.
+    """
+    cache_dir = cache_dir or CACHE_DIR
+    out: list[MediaFile] = list(files)
+    # index -> (cache key, format, original bytes)
+    todo: dict[int, tuple[str, str, bytes]] = {}
+
+    for i, f in enumerate(files):
+        fmt = _format_for(f.name)
+        if fmt is None:
+            continue
+        try:
+            data = f.data if isinstance(f, InlineMedia) else f.read_bytes()
+        except OSError:
+            continue
+        key = _cache_key(data, opts)
+        ext = Path(f.name).suffix.lower()
+        if isinstance(f, InlineMedia):
+            if key in _inline_cache:
+                cached = _inline_cache[key]
+                if cached is not None:
+                    out[i] = InlineMedia(
+                        name=f.name, mime_type=f.mime_type, data=cached
+                    )
+                continue
+        else:
+            hit = cache_dir / f"{key}{ext}"
+            if hit.exists():
+                out[i] = hit
+                continue
+            if (cache_dir / f"{key}.orig").exists():
+                continue
+        todo[i] = (key, fmt, data)
+
+    if not todo:
+        return out
+
+    jobs = list(todo.items())
+    workers = opts.workers or (os.cpu_count() or 1)
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(
+                pool.map(
+                    optimize_image_bytes,
+                    [d for _, (_, _, d) in jobs],
+                    [fmt for _, (_, fmt, _) in jobs],
+                    [opts.max_dim] * len(jobs),
+                    [opts.quality] * len(jobs),
+                )
+            )
+    else:
+        results = [
+            optimize_image_bytes(d, fmt, opts.max_dim, opts.quality)
+            for _, (_, fmt, d) in jobs
+        ]
+
+    saved = 0
+    for (i, (key, _, data)), optimized in zip(jobs, results):
+        f = files[i]
+        if isinstance(f, InlineMedia):
+            _inline_cache[key] = optimized
+            if optimized is not None:
+                out[i] = InlineMedia(name=f.name, mime_type=f.mime_type, data=optimized)
+                saved += len(data) - len(optimized)
+            continue
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        if optimized is None:
+            # Remember "already optimal" so we don't decode it again next run.
+            (cache_dir / f"{key}.orig").touch()
+            continue
+        dest = cache_dir / f"{key}{Path(f.name).suffix.lower()}"
+        tmp = dest.with_name(dest.name + ".tmp")
+        tmp.write_bytes(optimized)
+        os.replace(tmp, dest)
+        out[i] = dest
+        saved += len(data) - len(optimized)
+
+    print(f"[image_opt] Optimized {len(jobs)} image(s), saved {saved / 1024:.0f} KiB")
+    return out
@@ -1,15 +1,28 @@
 import argparse
 import os
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable
 
 from dotenv import load_dotenv
 
-from src.ig import IgClient, IgItem
-from src.state import load_state, save_state
+from src.checkpoint import (
+    RunCheckpoint,
+    clear_checkpoint,
+    item_from_dict,
+    load_checkpoint,
+    start_checkpoint,
+)
+from src.ig import IgClient, IgItem, PostCursor
+from src.image_opt import ImageOptions, optimize_media
+from src.media import MediaFile, is_spilled
+from src.outbox import Outbox, OutboxJob, drain as drain_due_jobs
+from src.state import State, load_state, save_state
 from src.settings import RecipientSettings, load_settings
-from src.wa import WhatsAppSender
+from src.wa import FanoutJob, WhatsAppSender
+from src.wa_background import BackgroundSender
+from src.wa_daemon import WhatsAppDaemonClient, connect as connect_wa_daemon
 
 # Try to load credentials from keychain first, fall back to .env
 try:
@@ -29,6 +42,32 @@ class Config:
     wa_report_contact_name: str
     wa_report_phone: str
     message_prefix: str
+    # Performance tuning (optional, from env; see .env.example)
+    media_inline_max_bytes: int = 0  # 0 = off; >0 keeps smaller media in memory
+    image_max_dim: int = 0  # 0 = off; >0 resizes JPEG/WebP before upload
+    image_quality: int = 80
+    wa_max_in_flight: int = 1  # >1 overlaps uploads to different recipients
+    wa_lean: bool = False  # block avatars/fonts/previews, low-memory Chromium flags
+    wa_headless: bool = False  # needs wa_profile logged in by a headed run
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _load_tuning() -> dict:
+    """Non-secret performance knobs; read from env for both credential sources."""
+    return {
+        "media_inline_max_bytes": max(0, _env_int("MEDIA_INLINE_MAX_BYTES", 0)),
+        "image_max_dim": max(0, _env_int("IMAGE_MAX_DIM", 0)),
+        "image_quality": min(95, max(30, _env_int("IMAGE_QUALITY", 80))),
+        "wa_max_in_flight": min(8, max(1, _env_int("WA_MAX_IN_FLIGHT", 1))),
+        "wa_lean": _env_int("WA_LEAN", 0) > 0,
+        "wa_headless": _env_int("WA_HEADLESS", 0) > 0,
+    }
 
 
 def load_config() -> Config:
@@ -53,6 +92,7 @@ def load_config() -> Config:
                 wa_report_contact_name=creds["WA_REPORT_CONTACT_NAME"],
                 wa_report_phone=creds["WA_REPORT_PHONE"],
                 message_prefix=creds["MESSAGE_PREFIX"],
+                **_load_tuning(),
             )
         except Exception as e:
             print(f"⚠️  Could not load from keychain: {e}")
@@ -108,6 +148,7 @@ def load_config() -> Config:
         wa_report_contact_name=wa_report_contact_name,
         wa_report_phone=wa_report_phone,
         message_prefix=message_prefix or "New from Instagram:",
+        **_load_tuning(),
     )
 
 
@@ -138,6 +179,37 @@ def _recipient_wants_item(r: RecipientSettings, it: IgItem) -> bool:
     return bool(r.send_stories)
 
 
+def _optimize_downloaded(
+    cfg: Config, downloaded: dict[str, list[MediaFile]]
+) -> dict[str, list[MediaFile]]:
+    """Run the image optimization stage over the whole run in one batch."""
+    if cfg.image_max_dim <= 0:
+        return downloaded
+    flat = [(uid, p) for uid, paths in downloaded.items() for p in paths]
+    optimized = optimize_media(
+        [p for _, p in flat],
+        opts=ImageOptions(max_dim=cfg.image_max_dim, quality=cfg.image_quality),
+    )
+    out: dict[str, list[MediaFile]] = {uid: [] for uid in downloaded}
+    for (uid, _), p in zip(flat, optimized):
+        out[uid].append(p)
+    return out
+
+
+def open_wa_sender(
+    *, lean: bool = False, headless: bool = False
+) -> WhatsAppSender | WhatsAppDaemonClient:
+    """
+    Sender for this process: the running WhatsApp daemon if one answers
+    (already logged in, no browser launch), else a local browser.
+    """
+    client = connect_wa_daemon()
+    if client is not None:
+        print("Using running WhatsApp daemon.")
+        return client
+    return WhatsAppSender(profile_dir=Path("wa_profile"), lean=lean, headless=headless)
+
+
 def resend_last(*, cfg: Config, max_files: int = 0) -> None:
     state = load_state()
     files = [Path(p) for p in state.last_run_files]
@@ -160,7 +232,7 @@ def resend_last(*, cfg: Config, max_files: int = 0) -> None:
     if max_files and max_files > 0:
         files = files[:max_files]
 
-    wa = WhatsAppSender(profile_dir=Path("wa_profile"))
+    wa = open_wa_sender(lean=cfg.wa_lean, headless=cfg.wa_headless)
     print("Opening WhatsApp Web (scan QR if asked)...")
     wa.start()
     print("WhatsApp Web ready.")
@@ -173,38 +245,85 @@ def resend_last(*, cfg: Config, max_files: int = 0) -> None:
     print("Done: re-sent last batch (state unchanged).")
 
 
-def run_once(
-    *,
+# Stories expire after 24h; older posts are treated as stale as well.
+ITEM_MAX_AGE_S = 24 * 60 * 60
+
+
+@dataclass
+class StagedRun:
+    """
+    The Instagram half of a run: what each recipient should get, already
+    downloaded. `stage_run` can produce this ahead of a scheduled slot so
+    only WhatsApp sending is left at the scheduled minute.
+    """
+
+    ig: IgClient | None  # None when resumed from a checkpoint without IG calls
+    recipients: list[RecipientSettings] = field(default_factory=list)
+    items_by_recipient: dict[str, list[IgItem]] = field(default_factory=dict)
+    downloaded: dict[str, list[MediaFile]] = field(default_factory=dict)
+    run_files: list[Path] = field(default_factory=list)
+    spilled: list[Path] = field(default_factory=list)
+    force_resend_current: bool = False
+    listed_ts: float = 0.0  # when IG was listed; becomes state.last_run_ts
+    post_cursor: PostCursor | None = None  # newest post seen while listing
+    story_mark: float | None = None  # newest story ts probed while listing
+    note: str = ""  # why there is nothing to send, if empty
+    touch_last_run: bool = True  # whether an empty result updates last_run_ts
+    checkpoint: RunCheckpoint | None = None  # journal for resuming after a crash
+
+    @property
+    def empty(self) -> bool:
+        return not self.items_by_recipient
+
+
+def _login_ig(cfg: Config) -> IgClient:
+    ig = IgClient(session_path=Path("ig_session.json"))
+    print("Logging into Instagram...")
+    ig.login(cfg.ig_username, cfg.ig_password)
+    print("Instagram login OK.")
+    return ig
+
+
+def stage_run(
     cfg: Config,
-    force_resend_current: bool = False,
-    dry_run: bool = False,
+    *,
+    ig: IgClient | None = None,
     recipient_id: str | None = None,
-) -> None:
+    force_resend_current: bool = False,
+    posts_since_ts: float | None = None,
+    on_items: Callable[[], None] | None = None,
+) -> StagedRun:
+    """
+    List, filter and download everything the selected recipients should get.
+    Does not touch WhatsApp and does not record anything as sent.
+
+    ``posts_since_ts`` lists posts back to that time instead of from the stored
+    cursor (catch-up for a recipient that skipped runs; dedupe drops repeats).
+    ``on_items`` is called once filtering found something to send, before the
+    downloads (`run_once` starts WhatsApp there).
+
+    Progress is journaled in ``run_checkpoint.json`` (see `src.checkpoint`). If
+    an earlier run for the same scope died before finishing, its listing and
+    downloaded files are reused; Instagram is only logged into for files that
+    are missing.
+    """
     media_dir = Path("media")
     media_dir.mkdir(exist_ok=True)
 
-    if dry_run:
-        print("🔍 DRY RUN MODE: No actual messages will be sent")
-
     state = load_state()
     settings = load_settings(
         default_recipient_name=cfg.wa_content_contact_name,
         default_recipient_phone=cfg.wa_content_phone,
     )
-
-    ig = IgClient(session_path=Path("ig_session.json"))
-    print("Logging into Instagram...")
-    ig.login(cfg.ig_username, cfg.ig_password)
-    print("Instagram login OK.")
-
-    wa = None
-    if not dry_run:
-        wa = WhatsAppSender(profile_dir=Path("wa_profile"))
-        print("Opening WhatsApp Web (scan QR if asked)...")
-        wa.start()
-        print("WhatsApp Web ready.")
-    else:
-        print("📵 Dry run: Skipping WhatsApp Web connection")
+    checkpoint = None
+    if posts_since_ts is None:
+        checkpoint = load_checkpoint(
+            recipient_id=recipient_id, force_resend_current=force_resend_current
+        )
+    resumed = checkpoint is not None
+    if ig is None and not resumed:
+        ig = _login_ig(cfg)
+    staged = StagedRun(ig=ig, force_resend_current=force_resend_current)
 
     # Filter recipients: if recipient_id specified, only that one; otherwise all enabled
     all_recipients = [
@@ -215,80 +334,365 @@ def run_once(
     if recipient_id:
         recipients = [r for r in all_recipients if r.id == recipient_id]
         if not recipients:
-            if wa:
-                wa.stop()
-            print(f"Done: recipient '{recipient_id}' not found or not enabled.")
-            return
+            staged.note = f"recipient '{recipient_id}' not found or not enabled."
+            staged.touch_last_run = False
+            return staged
     else:
         recipients = all_recipients
     if not recipients:
-        if wa:
-            wa.stop()
-        print("Done: no enabled recipients configured in settings.json.")
-        state.last_run_ts = time.time()
-        save_state(state)
-        return
+        staged.note = "no enabled recipients configured in settings.json."
+        return staged
+    staged.recipients = recipients
 
+    if resumed:
+        print("Resuming the interrupted run from its checkpoint...")
+        _restore_listing(staged, checkpoint)
+    else:
+        _list_items(ig, state, staged, posts_since_ts)
+    if staged.empty:
+        return staged
+    if checkpoint is None:
+        checkpoint = start_checkpoint(
+            recipient_id=recipient_id,
+            force_resend_current=force_resend_current,
+            listed_ts=staged.listed_ts,
+        )
+        checkpoint.record_listing(
+            staged.items_by_recipient, staged.post_cursor, staged.story_mark
+        )
+    staged.checkpoint = checkpoint
+    if on_items is not None:
+        on_items()
+
+    # Download each needed item once (then send to multiple recipients).
+    unique_needed = {
+        it.unique_id: it for lst in staged.items_by_recipient.values() for it in lst
+    }
+    for uid, it in unique_needed.items():
+        paths = checkpoint.reusable_files(uid)
+        if paths is not None:
+            print(f"Reusing {len(paths)} downloaded file(s) for {uid}.")
+        else:
+            if staged.ig is None:
+                staged.ig = _login_ig(cfg)
+            if resumed:
+                it = staged.ig.rebind(it)
+            print(f"Downloading {uid}...")
+            paths = it.download(media_dir, inline_max_bytes=cfg.media_inline_max_bytes)
+            checkpoint.record_download(uid, paths)
+        staged.downloaded[uid] = paths
+        # Only media/ files are kept for --resend-last; in-memory/tmpfs ones are not.
+        staged.run_files.extend(
+            p for p in paths if isinstance(p, Path) and not is_spilled(p)
+        )
+        staged.spilled.extend(p for p in paths if isinstance(p, Path) and is_spilled(p))
+    staged.downloaded = _optimize_downloaded(cfg, staged.downloaded)
+    return staged
+
+
+def _list_items(
+    ig: IgClient,
+    state: State,
+    staged: StagedRun,
+    posts_since_ts: float | None,
+) -> None:
+    """List IG and select what each of ``staged.recipients`` should get."""
     # Collect items for this run:
     # - posts since last run (or just latest post on first run)
-    # - all active stories
+    # - active stories newer than the recipients' story watermark
+    staged.listed_ts = time.time()
     items: list[IgItem] = []
-    if state.last_run_ts is None:
-        items.extend(ig.get_latest_post_items())
+    if posts_since_ts is not None:
+        posts, staged.post_cursor = ig.get_new_post_items_after(
+            PostCursor(pk=None, ts=posts_since_ts)
+        )
+        items.extend(posts)
+    elif state.last_run_ts is None:
+        latest = ig.get_latest_post_items()
+        items.extend(latest)
+        if latest:
+            staged.post_cursor = PostCursor(
+                pk=latest[0].unique_id.split(":", 1)[1], ts=latest[0].created_ts
+            )
     else:
-        items.extend(ig.get_new_post_items_since(state.last_run_ts, max_posts=12))
-    items.extend(ig.get_active_story_items())
+        # Page newest-first until the last post we saw (not a fixed window).
+        cursor = PostCursor(
+            pk=state.last_seen_post_pk,
+            ts=(
+                state.last_seen_post_ts
+                if state.last_seen_post_ts is not None
+                else state.last_run_ts
+            ),
+        )
+        posts, staged.post_cursor = ig.get_new_post_items_after(cursor)
+        items.extend(posts)
+    items.extend(_list_new_stories(ig, state, staged.recipients, staged))
 
-    cutoff_ts = time.time() - 24 * 60 * 60
+    cutoff_ts = time.time() - ITEM_MAX_AGE_S
     items = [it for it in items if (it.created_ts or 0.0) >= cutoff_ts]
 
     if not items:
-        if wa:
-            wa.stop()
-        print("Done: nothing new to send.")
-        state.last_run_ts = time.time()
-        save_state(state)
+        staged.note = "nothing new to send."
         return
 
     # Decide which items each recipient should receive (content-type filtering + per-recipient dedupe).
-    items_by_recipient: dict[str, list[IgItem]] = {}
-    for r in recipients:
+    for r in staged.recipients:
         rid = r.id
         already = state.sent_ids_by_recipient.get(rid, set())
         selected: list[IgItem] = []
         for it in items:
             if not _recipient_wants_item(r, it):
                 continue
-            if not force_resend_current and it.unique_id in already:
+            if not staged.force_resend_current and it.unique_id in already:
                 continue
             selected.append(it)
         if selected:
-            items_by_recipient[rid] = selected
+            staged.items_by_recipient[rid] = selected
+
+    if staged.empty:
+        staged.note = "nothing new to send (after filtering/dedupe)."
+
+
+def _restore_listing(staged: StagedRun, checkpoint: RunCheckpoint) -> None:
+    """
+    Take the listing of an interrupted run, minus what it already sent (which
+    matters with ``--force``, where state.json does not dedupe), expired items
+    and recipients no longer selected.
+    """
+    staged.listed_ts = checkpoint.listed_ts
+    staged.post_cursor = checkpoint.cursor()
+    staged.story_mark = checkpoint.story_mark
+    cutoff_ts = time.time() - ITEM_MAX_AGE_S
+    items = {uid: item_from_dict(d) for uid, d in checkpoint.items.items()}
+    for r in staged.recipients:
+        sent = set(checkpoint.sent.get(r.id, []))
+        selected = [
+            items[uid]
+            for uid in checkpoint.items_by_recipient.get(r.id, [])
+            if uid in items
+            and uid not in sent
+            and (items[uid].created_ts or 0.0) >= cutoff_ts
+        ]
+        if selected:
+            staged.items_by_recipient[r.id] = selected
+    if staged.empty:
+        staged.note = "nothing left from the interrupted run (sent or expired)."
+
+
+def _list_new_stories(
+    ig: IgClient,
+    state: State,
+    recipients: list[RecipientSettings],
+    staged: StagedRun,
+) -> list[IgItem]:
+    """
+    Probe the newest story timestamp first and only list the reel when there
+    is something newer than every selected recipient has already handled.
+    """
+    staged.story_mark = ig.get_latest_story_ts()
+    marks = [state.story_watermark_by_recipient.get(r.id) for r in recipients]
+    floor = (
+        None
+        if staged.force_resend_current or any(m is None for m in marks)
+        else min(marks)
+    )
+    if staged.story_mark is not None and (
+        staged.story_mark == 0 or (floor is not None and staged.story_mark <= floor)
+    ):
+        print("No new stories since last check; skipping story fetch.")
+        return []
+    stories = ig.get_active_story_items(newer_than=floor)
+    if staged.story_mark is None:
+        staged.story_mark = max((it.created_ts or 0.0 for it in stories), default=None)
+    return stories
+
+
+def _revalidate_staged(staged: StagedRun) -> StagedRun:
+    """
+    Drop staged items that can no longer be sent: anything past the 24h window,
+    and stories deleted on Instagram since staging.
+    """
+    cutoff_ts = time.time() - ITEM_MAX_AGE_S
+    has_stories = any(
+        it.kind == "story" for lst in staged.items_by_recipient.values() for it in lst
+    )
+    active_story_ids: set[str] | None = None
+    if has_stories and staged.ig is not None:
+        try:
+            active_story_ids = staged.ig.get_active_story_ids()
+        except Exception as e:  # noqa: BLE001 - best-effort; expiry check still applies
+            print(f"Could not re-check active stories ({e}); using expiry only.")
+
+    dropped: set[str] = set()
+    for rid in list(staged.items_by_recipient):
+        keep: list[IgItem] = []
+        for it in staged.items_by_recipient[rid]:
+            gone = (it.created_ts or 0.0) < cutoff_ts or (
+                it.kind == "story"
+                and active_story_ids is not None
+                and it.unique_id not in active_story_ids
+            )
+            if gone:
+                dropped.add(it.unique_id)
+            else:
+                keep.append(it)
+        if keep:
+            staged.items_by_recipient[rid] = keep
+        else:
+            del staged.items_by_recipient[rid]
+
+    if dropped:
+        print(f"Skipping {len(dropped)} staged item(s) that expired or were deleted.")
+    if staged.empty and not staged.note:
+        staged.note = "staged items expired or were deleted before delivery."
+    return staged
 
-    if not items_by_recipient:
+
+def run_once(
+    *,
+    cfg: Config,
+    force_resend_current: bool = False,
+    dry_run: bool = False,
+    recipient_id: str | None = None,
+    staged: StagedRun | None = None,
+) -> None:
+    """
+    Full run: stage (IG login, list, download) then deliver via WhatsApp.
+    Pass ``staged`` from an earlier `stage_run` to only do the delivery half.
+    The run's checkpoint is removed once it has been delivered.
+    """
+    if dry_run:
+        print("🔍 DRY RUN MODE: No actual messages will be sent")
+
+    wa = None
+    if not dry_run:
+        # Launched in the background once there is something to send, so it
+        # overlaps the downloads; never launched for an empty run.
+        wa = BackgroundSender(
+            lambda: open_wa_sender(lean=cfg.wa_lean, headless=cfg.wa_headless)
+        )
+    else:
+        print("📵 Dry run: Skipping WhatsApp Web connection")
+
+    try:
+        if staged is None:
+            staged = stage_run(
+                cfg,
+                recipient_id=recipient_id,
+                force_resend_current=force_resend_current,
+                on_items=wa.begin if wa else None,
+            )
+        else:
+            staged = _revalidate_staged(staged)
+
+        # Retries of earlier failed sends go out with this run.
+        outbox = Outbox()
+        due = bool(wa) and bool(outbox.due())
+        if staged.empty:
+            print(f"Done: {staged.note}")
+            if staged.touch_last_run:
+                state = load_state()
+                _record_listing(state, staged)
+                save_state(state)
+            clear_checkpoint()
+            if not due:
+                return
+
+        if wa:
+            wa.start()
+            print("WhatsApp Web ready.")
+        if due:
+            print(f"Retrying {len(outbox.due())} queued message(s) from the outbox...")
+            _drain_outbox_with(wa)
+            outbox = Outbox()
+        if not staged.empty:
+            _deliver(cfg, staged, wa=wa, dry_run=dry_run, outbox=outbox)
+            clear_checkpoint()
+    finally:
         if wa:
             wa.stop()
-        print("Done: nothing new to send (after filtering/dedupe).")
-        state.last_run_ts = time.time()
-        save_state(state)
-        return
 
-    # Download each needed item once (then send to multiple recipients).
-    unique_needed = {
-        it.unique_id: it for lst in items_by_recipient.values() for it in lst
-    }
-    downloaded: dict[str, list[Path]] = {}
-    run_files: list[Path] = []
-    for uid, it in unique_needed.items():
-        print(f"Downloading {uid}...")
-        paths = it.download(media_dir)
-        downloaded[uid] = paths
-        run_files.extend(paths)
+
+def _record_listing(state: State, staged: StagedRun) -> None:
+    # Use the listing time, not "now": posts made between staging and
+    # delivery must still count as new on the next run.
+    state.last_run_ts = staged.listed_ts or time.time()
+    if (
+        staged.post_cursor is not None
+        and staged.post_cursor.pk
+        and staged.post_cursor.ts >= (state.last_seen_post_ts or 0.0)
+    ):
+        state.last_seen_post_pk = staged.post_cursor.pk
+        state.last_seen_post_ts = staged.post_cursor.ts
+    if staged.story_mark:
+        for r in staged.recipients:
+            prev = state.story_watermark_by_recipient.get(r.id, 0.0)
+            state.story_watermark_by_recipient[r.id] = max(prev, staged.story_mark)
+
+
+# WhatsApp accepts at most this many files in one send.
+WA_MAX_FILES_PER_SEND = 30
+
+
+def _message_groups(
+    r: RecipientSettings,
+    items: list[IgItem],
+    downloaded: dict[str, list[MediaFile]],
+) -> list[list[IgItem]]:
+    """
+    Items that go out together as one WhatsApp message. Normally one item per
+    message; with ``send_as_album`` as few albums as the per-send file limit allows.
+    Items without downloaded files are dropped.
+    """
+    items = [it for it in items if downloaded.get(it.unique_id)]
+    if not r.send_as_album:
+        return [[it] for it in items]
+    groups: list[list[IgItem]] = []
+    count = 0
+    for it in items:
+        n = len(downloaded[it.unique_id])
+        if groups and count + n <= WA_MAX_FILES_PER_SEND:
+            groups[-1].append(it)
+            count += n
+        else:
+            groups.append([it])
+            count = n
+    return groups
+
+
+def _deliver(
+    cfg: Config,
+    staged: StagedRun,
+    *,
+    wa: WhatsAppSender | WhatsAppDaemonClient | BackgroundSender | None,
+    dry_run: bool,
+    outbox: Outbox | None = None,
+) -> None:
+    """
+    Send the staged items. A message that fails to send is queued in the
+    outbox for its own retry; the other messages still go out.
+    """
+    # Reload: a staged run may be delivered a while after it was prepared.
+    state = load_state()
+    downloaded = staged.downloaded
+    if outbox is None:
+        outbox = Outbox()
+
+    sequential = staged.recipients
+    if (
+        not dry_run
+        and cfg.wa_max_in_flight > 1
+        and len(staged.recipients) > 1
+        and callable(getattr(wa, "send_fanout", None))
+    ):
+        # The daemon client has no fan-out; it keeps the sequential path.
+        _deliver_fanout(cfg, staged, state, wa, outbox)
+        sequential = []
 
     # Send per-recipient, and persist state after each item to avoid duplicates on crashes.
-    for r in recipients:
+    for r in sequential:
         rid = r.id
-        to_send = items_by_recipient.get(rid, [])
+        to_send = _unsent_items(staged, state, outbox, rid)
         if not to_send:
             continue
         print(
@@ -312,36 +716,51 @@ def run_once(
             continue
 
         # Real sending (non-dry-run)
+        contact_name = r.wa_contact_name or r.display_name
+        chat_error: Exception | None = None
         if wa:
-            wa.open_chat(
-                contact_name=r.wa_contact_name or r.display_name, phone=r.wa_phone
-            )
-        sent_set = state.sent_ids_by_recipient.setdefault(rid, set())
-        for it in to_send:
-            paths = downloaded.get(it.unique_id) or []
-            if not paths:
-                continue
-            caption = _format_run_caption(cfg.message_prefix, [it])
-            print(f"Sending {len(paths)} file(s) for {it.unique_id}...")
-            if wa:
-                wa.send_media_batch(
-                    r.wa_contact_name or r.display_name,
-                    paths,
-                    phone=r.wa_phone,
-                    caption=caption,
+            try:
+                wa.open_chat(contact_name=contact_name, phone=r.wa_phone)
+            except Exception as e:  # noqa: BLE001 - every message goes to the outbox
+                chat_error = e
+        for group in _message_groups(r, to_send, downloaded):
+            paths = [p for it in group for p in downloaded[it.unique_id]]
+            caption = _format_run_caption(cfg.message_prefix, group)
+            ids = ", ".join(it.unique_id for it in group)
+            print(f"Sending {len(paths)} file(s) for {ids}...")
+            try:
+                if chat_error is not None:
+                    raise chat_error
+                if wa:
+                    wa.send_media_batch(
+                        contact_name, paths, phone=r.wa_phone, caption=caption
+                    )
+            except Exception as e:  # noqa: BLE001 - retried from the outbox
+                _defer_message(
+                    outbox, rid, contact_name, r.wa_phone, group, paths, caption, e
                 )
-            sent_set.add(it.unique_id)
-            state.sent_ids.add(it.unique_id)  # legacy/global dedupe
-            save_state(state)
+                continue
+            # One message (or album) -> all of its items are sent together.
+            _mark_sent(state, staged, rid, group)
 
-    if wa:
-        wa.stop()
+    # Zero-disk mode: large files spilled to tmpfs are only needed until sent.
+    for p in staged.spilled:
+        try:
+            p.unlink()
+        except Exception:
+            pass
 
     if not dry_run:
-        state.last_run_ts = time.time()
-        state.last_run_files = [str(p) for p in run_files]
+        _record_listing(state, staged)
+        state.last_run_files = [str(p) for p in staged.run_files]
         # Save a generic caption for the run (using the union of items).
-        union_items = list(unique_needed.values())
+        union_items = list(
+            {
+                it.unique_id: it
+                for lst in staged.items_by_recipient.values()
+                for it in lst
+            }.values()
+        )
         state.last_run_caption = _format_run_caption(cfg.message_prefix, union_items)
         save_state(state)
         print("Done: sent new items (no duplicates).")
@@ -349,6 +768,145 @@ def run_once(
         print("✅ Dry run complete: No messages sent, no state updated")
 
 
+def _unsent_items(
+    staged: StagedRun, state: State, outbox: Outbox, rid: str
+) -> list[IgItem]:
+    """Staged items for ``rid`` minus those already sent or queued in the outbox."""
+    queued = outbox.queued_item_ids(rid)
+    already = (
+        set() if staged.force_resend_current else state.sent_ids_by_recipient.get(rid)
+    ) or set()
+    return [
+        it
+        for it in staged.items_by_recipient.get(rid, [])
+        if it.unique_id not in already and it.unique_id not in queued
+    ]
+
+
+def _mark_sent(state: State, staged: StagedRun, rid: str, items: list[IgItem]) -> None:
+    sent_set = state.sent_ids_by_recipient.setdefault(rid, set())
+    for it in items:
+        sent_set.add(it.unique_id)
+        state.sent_ids.add(it.unique_id)  # legacy/global dedupe
+    save_state(state)
+    if staged.checkpoint is not None:
+        staged.checkpoint.mark_sent(rid, [it.unique_id for it in items])
+
+
+def _defer_message(
+    outbox: Outbox,
+    rid: str,
+    contact_name: str,
+    phone: str,
+    group: list[IgItem],
+    files: list[MediaFile],
+    caption: str,
+    error: Exception,
+) -> None:
+    job = outbox.defer(
+        recipient_id=rid,
+        contact_name=contact_name,
+        phone=phone,
+        item_ids=[it.unique_id for it in group],
+        files=files,
+        caption=caption,
+        error=error,
+    )
+    print(
+        f"Send to {contact_name or phone} failed ({error}); "
+        f"queued in outbox ({job.status}, attempt {job.attempts})."
+    )
+
+
+def _mark_job_sent(state: State, job: OutboxJob) -> None:
+    sent_set = state.sent_ids_by_recipient.setdefault(job.recipient_id, set())
+    for uid in job.item_ids:
+        sent_set.add(uid)
+        state.sent_ids.add(uid)  # legacy/global dedupe
+    save_state(state)
+
+
+def _drain_outbox_with(wa) -> int:
+    """Deliver the outbox jobs that are due through an already started ``wa``."""
+    state = load_state()
+    return drain_due_jobs(Outbox(), wa, on_sent=lambda job: _mark_job_sent(state, job))
+
+
+def drain_outbox(cfg: Config) -> int:
+    """Open WhatsApp only if outbox jobs are due, and deliver them."""
+    if not Outbox().due():
+        return 0
+    wa = open_wa_sender(lean=cfg.wa_lean, headless=cfg.wa_headless)
+    wa.start()
+    try:
+        return _drain_outbox_with(wa)
+    finally:
+        wa.stop()
+
+
+def _deliver_fanout(
+    cfg: Config,
+    staged: StagedRun,
+    state: State,
+    wa: WhatsAppSender,
+    outbox: Outbox,
+) -> None:
+    """
+    Send to all recipients with overlapping uploads (see `WhatsAppSender.send_fanout`).
+    Each item is marked sent, and state saved, as soon as its upload is confirmed;
+    messages of a failed recipient that were not confirmed go to the outbox.
+    """
+    jobs: list[FanoutJob] = []
+    groups_by_job: dict[str, list[list[IgItem]]] = {}
+    for r in staged.recipients:
+        to_send = _unsent_items(staged, state, outbox, r.id)
+        if not to_send:
+            continue
+        print(f"Sending to {r.display_name} ({len(to_send)} item(s))...")
+        groups = _message_groups(r, to_send, staged.downloaded)
+        if not groups:
+            continue
+        groups_by_job[r.id] = groups
+        jobs.append(
+            FanoutJob(
+                key=r.id,
+                contact_name=r.wa_contact_name,
+                phone=r.wa_phone,
+                parts=[
+                    (
+                        [p for it in g for p in staged.downloaded[it.unique_id]],
+                        _format_run_caption(cfg.message_prefix, g),
+                    )
+                    for g in groups
+                ],
+            )
+        )
+
+    confirmed: dict[str, set[int]] = {}
+
+    def _on_sent(job: FanoutJob, idx: int) -> None:
+        confirmed.setdefault(job.key, set()).add(idx)
+        _mark_sent(state, staged, job.key, groups_by_job[job.key][idx])
+
+    failures = wa.send_fanout(
+        jobs, max_in_flight=cfg.wa_max_in_flight, on_sent=_on_sent
+    )
+    for job, err in failures:
+        for idx, (files, caption) in enumerate(job.parts):
+            if idx in confirmed.get(job.key, set()):
+                continue
+            _defer_message(
+                outbox,
+                job.key,
+                job.contact_name,
+                job.phone,
+                groups_by_job[job.key][idx],
+                files,
+                caption,
+                err,
+            )
+
+
 def main() -> None:
     cfg = load_config()
     ap = argparse.ArgumentParser()
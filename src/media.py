@@ -0,0 +1,94 @@
+"""Media handles passed from the Instagram download step to WhatsApp upload.
+
+A downloaded file is either a ``Path`` on disk (the classic ``media/`` flow) or
+an ``InlineMedia`` kept in memory for the optional zero-disk mode. Playwright's
+``set_input_files`` accepts both, but refuses a mix of paths and buffers in one
+call, so ``upload_files_arg`` reconciles a batch before it reaches the browser.
+"""
+
+from __future__ import annotations
+
+import mimetypes
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Union
+
+
+@dataclass(frozen=True)
+class InlineMedia:
+    """A downloaded media file held in memory (never written to disk)."""
+
+    name: str
+    mime_type: str
+    data: bytes
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def to_file_payload(self) -> dict:
+        """Shape expected by Playwright's ``set_input_files``."""
+        return {"name": self.name, "mimeType": self.mime_type, "buffer": self.data}
+
+
+MediaFile = Union[Path, InlineMedia]
+
+
+def guess_mime_type(name: str) -> str:
+    mt, _ = mimetypes.guess_type(name)
+    return mt or "application/octet-stream"
+
+
+def spill_dir() -> Path:
+    """
+    Directory for files too large to keep inline. Prefers tmpfs (/dev/shm) so
+    spilled media still never touch the real disk.
+    """
+    shm = Path("/dev/shm")
+    base = (
+        shm if shm.is_dir() and os.access(shm, os.W_OK) else Path(tempfile.gettempdir())
+    )
+    d = base / "instabridge"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def is_spilled(p: MediaFile) -> bool:
+    if not isinstance(p, Path):
+        return False
+    try:
+        return p.resolve().is_relative_to(spill_dir().resolve())
+    except Exception:
+        return False
+
+
+def media_size(f: MediaFile) -> int:
+    if isinstance(f, InlineMedia):
+        return f.size
+    try:
+        return f.stat().st_size
+    except OSError:
+        return 0
+
+
+def materialize(f: MediaFile) -> Path:
+    """Return a path for ``f``, writing inline bytes to the spill dir if needed."""
+    if isinstance(f, Path):
+        return f
+    out = spill_dir() / f.name
+    out.write_bytes(f.data)
+    return out
+
+
+def upload_files_arg(files: list[MediaFile]) -> list:
+    """
+    Build the ``set_input_files`` argument for a batch.
+
+    All-inline batches go as buffers. Mixed batches are turned into paths
+    (inline ones land in the tmpfs spill dir), since Playwright can't mix both.
+    """
+    if files and all(isinstance(f, InlineMedia) for f in files):
+        return [f.to_file_payload() for f in files]  # type: ignore[union-attr]
+    return [str(materialize(f)) for f in files]
@@ -0,0 +1,251 @@
+"""Durable outbox for WhatsApp sends that failed.
+
+A run used to raise on the first failed send, and the scheduler then re-ran the
+whole pipeline (IG login, listing, downloads) a minute later. Now each message
+that fails (recipient, items, files, caption) becomes a job in ``outbox.json``
+and the rest of the run continues. Jobs are retried on their own once due, with
+the delay taken from `TransientError.retry_after_seconds` (exponential backoff
+for other errors). A `PermanentError`, or too many attempts, parks the job as
+``failed`` for inspection instead of retrying it.
+
+Files that only existed in memory or in the tmpfs spill dir are copied to
+``media/outbox/`` so the retry does not depend on this process.
+
+    python -m src.outbox          # list jobs
+    python -m src.outbox --drain  # send everything that is due now
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import shutil
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from src.exceptions import PermanentError, TransientError
+from src.media import MediaFile, is_spilled
+
+OUTBOX_PATH = Path("outbox.json")
+OUTBOX_MEDIA_DIR = Path("media") / "outbox"
+
+DEFAULT_RETRY_S = 60  # first retry for errors without retry_after_seconds
+MAX_RETRY_S = 3600
+MAX_ATTEMPTS = 6
+
+PENDING = "pending"  # waiting for next_attempt_ts
+FAILED = "failed"  # gave up; kept for inspection
+
+
+@dataclass
+class OutboxJob:
+    """One WhatsApp message to one recipient."""
+
+    id: str
+    recipient_id: str
+    contact_name: str
+    phone: str
+    item_ids: list[str]
+    files: list[str]
+    caption: str
+    status: str = PENDING
+    attempts: int = 0
+    next_attempt_ts: float = 0.0
+    last_error: str = ""
+    created_ts: float = field(default_factory=time.time)
+
+
+def job_id(recipient_id: str, item_ids: list[str]) -> str:
+    return f"{recipient_id}|{'+'.join(item_ids)}"
+
+
+def retry_after(error: Exception, attempts: int) -> float:
+    """Delay before the next attempt, honouring the error's own hint."""
+    if isinstance(error, TransientError):
+        return float(error.retry_after_seconds)
+    return float(min(MAX_RETRY_S, DEFAULT_RETRY_S * 2 ** max(0, attempts - 1)))
+
+
+class Outbox:
+    """The jobs in ``outbox.json``; every change is saved immediately."""
+
+    def __init__(self, path: Path = OUTBOX_PATH) -> None:
+        self._path = path
+        self.jobs: list[OutboxJob] = self._load()
+
+    def _load(self) -> list[OutboxJob]:
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except Exception:
+            return []
+        jobs: list[OutboxJob] = []
+        for raw in data.get("jobs", []) if isinstance(data, dict) else []:
+            try:
+                jobs.append(OutboxJob(**raw))
+            except TypeError:
+                continue
+        return jobs
+
+    def save(self) -> None:
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        tmp.write_text(
+            json.dumps(
+                {"jobs": [asdict(j) for j in self.jobs]}, indent=2, ensure_ascii=False
+            )
+            + "\n",
+            encoding="utf-8",
+        )
+        os.replace(tmp, self._path)
+
+    def due(self, now: float | None = None) -> list[OutboxJob]:
+        now = time.time() if now is None else now
+        return [
+            j for j in self.jobs if j.status == PENDING and j.next_attempt_ts <= now
+        ]
+
+    def next_due_ts(self) -> float | None:
+        pending = [j.next_attempt_ts for j in self.jobs if j.status == PENDING]
+        return min(pending) if pending else None
+
+    def queued_item_ids(self, recipient_id: str) -> set[str]:
+        """Items awaiting a retry for ``recipient_id`` (a run must not send them too)."""
+        return {
+            uid
+            for j in self.jobs
+            if j.recipient_id == recipient_id and j.status == PENDING
+            for uid in j.item_ids
+        }
+
+    def defer(
+        self,
+        *,
+        recipient_id: str,
+        contact_name: str,
+        phone: str,
+        item_ids: list[str],
+        files: list[MediaFile],
+        caption: str,
+        error: Exception,
+        now: float | None = None,
+    ) -> OutboxJob:
+        """Queue a message whose first send failed with ``error``."""
+        jid = job_id(recipient_id, item_ids)
+        job = OutboxJob(
+            id=jid,
+            recipient_id=recipient_id,
+            contact_name=contact_name,
+            phone=phone,
+            item_ids=list(item_ids),
+            files=_persist_files(jid, files),
+            caption=caption,
+        )
+        self.jobs = [j for j in self.jobs if j.id != jid] + [job]
+        self.record_failure(job, error, now=now)
+        return job
+
+    def record_failure(
+        self, job: OutboxJob, error: Exception, *, now: float | None = None
+    ) -> None:
+        now = time.time() if now is None else now
+        job.attempts += 1
+        job.last_error = f"{type(error).__name__}: {error}"
+        if isinstance(error, PermanentError) or job.attempts >= MAX_ATTEMPTS:
+            job.status = FAILED
+        else:
+            job.next_attempt_ts = now + retry_after(error, job.attempts)
+        self.save()
+
+    def complete(self, job: OutboxJob) -> None:
+        """Drop a sent job and the files copied for it."""
+        self.jobs = [j for j in self.jobs if j.id != job.id]
+        shutil.rmtree(_job_media_dir(job.id), ignore_errors=True)
+        self.save()
+
+
+def _job_media_dir(jid: str) -> Path:
+    return OUTBOX_MEDIA_DIR / re.sub(r"[^A-Za-z0-9_.-]+", "_", jid)
+
+
+def _persist_files(jid: str, files: list[MediaFile]) -> list[str]:
+    """Paths that outlive this process: media/ files as-is, others copied."""
+    out: list[str] = []
+    for f in files:
+        if isinstance(f, Path) and not is_spilled(f):
+            out.append(str(f))
+            continue
+        dest_dir = _job_media_dir(jid)
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        dest = dest_dir / f.name
+        if isinstance(f, Path):
+            shutil.copyfile(f, dest)
+        else:
+            dest.write_bytes(f.data)
+        out.append(str(dest))
+    return out
+
+
+def drain(
+    outbox: Outbox,
+    wa,
+    *,
+    on_sent: Callable[[OutboxJob], None],
+    now: float | None = None,
+) -> int:
+    """
+    Send every due job through ``wa``; failures are rescheduled (or parked).
+    ``on_sent`` records a delivered job (e.g. marks its items as sent).
+    Returns the number of jobs delivered.
+    """
+    sent = 0
+    for job in outbox.due(now):
+        files = [Path(p) for p in job.files]
+        missing = [p for p in files if not p.exists()]
+        if missing:
+            outbox.record_failure(
+                job, PermanentError(f"files missing: {', '.join(map(str, missing))}")
+            )
+            print(f"[outbox] {job.id}: files missing; giving up.")
+            continue
+        try:
+            wa.send_media_batch(
+                job.contact_name, files, phone=job.phone, caption=job.caption
+            )
+        except Exception as e:  # noqa: BLE001 - rescheduled per its retry contract
+            outbox.record_failure(job, e)
+            print(f"[outbox] {job.id}: attempt {job.attempts} failed ({e})")
+            continue
+        on_sent(job)
+        outbox.complete(job)
+        sent += 1
+        print(f"[outbox] {job.id}: delivered")
+    return sent
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Inspect or drain the WhatsApp outbox.")
+    ap.add_argument("--drain", action="store_true", help="Send all due jobs now")
+    args = ap.parse_args()
+
+    if args.drain:
+        from src.main import drain_outbox, load_config
+
+        print(f"[outbox] Delivered {drain_outbox(load_config())} job(s).")
+        return
+    outbox = Outbox()
+    if not outbox.jobs:
+        print("[outbox] Empty.")
+    now = time.time()
+    for j in outbox.jobs:
+        when = (
+            "due" if j.next_attempt_ts <= now else f"in {j.next_attempt_ts - now:.0f}s"
+        )
+        status = j.status if j.status == FAILED else f"{j.status}, {when}"
+        print(f"{j.id}: {status}, attempts={j.attempts}, last error: {j.last_error}")
+
+
+if __name__ == "__main__":
+    main()
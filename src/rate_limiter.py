@@ -78,6 +78,12 @@ class RateLimiter:
 
         return actual_delay
 
+    def budget_left(self) -> float:
+        """Fraction (0..1) of the hourly request limit not yet used."""
+        hour_ago = time.time() - 3600
+        used = sum(1 for t in self.request_times if t > hour_ago)
+        return max(0.0, 1.0 - used / self.requests_per_hour)
+
     def __call__(self, func: F) -> F:
         """Decorator to rate-limit a function."""
 
@@ -2,7 +2,8 @@ import time
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
-from src.main import load_config, run_once
+from src.main import drain_outbox, load_config, run_once, stage_run
+from src.outbox import Outbox
 from src.settings import RecipientSettings, ScheduleSettings, load_settings
 
 
@@ -97,13 +98,44 @@ def main() -> None:
         recipient_schedules.sort(key=lambda x: x[1])  # Sort by next run time
         next_recipient, next_time, next_tz, next_tz_name = recipient_schedules[0]
 
-        # Sleep until next run, checking for changes
+        # Sleep until next run, checking for changes. `lead_s` before the slot,
+        # stage the run (IG fetch + downloads) so only sending is left at the slot.
+        lead_s = max(0, int(st.schedule.prefetch_lead_min or 0)) * 60
+        staged = None
+        staging_done = lead_s == 0
         while True:
             now = datetime.now(next_tz)
             remaining = (next_time - now).total_seconds()
             if remaining <= 0:
                 break
-            chunk = min(60.0, max(1.0, remaining))
+            if not staging_done and remaining <= lead_s:
+                staging_done = True
+                try:
+                    print(
+                        f"[scheduler] Staging for {next_recipient.display_name} ({remaining:.0f}s before slot)..."
+                    )
+                    staged = stage_run(cfg, recipient_id=next_recipient.id)
+                except Exception as e:  # noqa: BLE001
+                    # Fall back to a full run at the slot.
+                    print(
+                        f"[scheduler] Staging failed for {next_recipient.display_name}: {e}"
+                    )
+                    staged = None
+                continue
+            # Failed sends queued in the outbox are retried when due, not at the slot.
+            retry_ts = Outbox().next_due_ts()
+            if retry_ts is not None and retry_ts <= time.time():
+                try:
+                    n = drain_outbox(cfg)
+                    print(f"[scheduler] Outbox: delivered {n} queued send(s).")
+                except Exception as e:  # noqa: BLE001
+                    print(f"[scheduler] Outbox retry failed: {e}")
+                    time.sleep(60)
+                continue
+            until_next_step = remaining if staging_done else remaining - lead_s
+            chunk = min(60.0, max(1.0, until_next_step))
+            if retry_ts is not None:
+                chunk = min(chunk, max(1.0, retry_ts - time.time()))
             print(
                 f"[scheduler] Next: {next_recipient.display_name} at {next_time.isoformat()} ({next_tz_name}) | Sleeping {chunk:.0f}s"
             )
@@ -119,7 +151,7 @@ def main() -> None:
 
         try:
             print(f"[scheduler] Running for {next_recipient.display_name}...")
-            run_once(cfg=cfg, recipient_id=next_recipient.id)
+            run_once(cfg=cfg, recipient_id=next_recipient.id, staged=staged)
         except Exception as e:  # noqa: BLE001
             print(f"[scheduler] Run failed for {next_recipient.display_name}: {e}")
             # backoff to avoid hot loops on repeated failures
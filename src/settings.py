@@ -27,6 +27,8 @@ class RecipientSettings:
     send_posts: bool = True
     send_stories: bool = True
     send_close_friends_stories: bool = False
+    # Send all of a run's items as one album (one preview, combined caption)
+    send_as_album: bool = False
 
     # Per-recipient schedule (if None, uses global schedule)
     schedule_enabled: bool | None = None  # None = use global, True/False = override
@@ -43,6 +45,8 @@ class ScheduleSettings:
     enabled: bool = True
     tz: str = "Europe/Berlin"
     time_hhmm: str = "19:00"
+    # Fetch + download this many minutes before each slot (0 = at the slot).
+    prefetch_lead_min: int = 5
 
 
 @dataclass
@@ -65,6 +69,14 @@ def _coerce_str(x: Any, default: str = "") -> str:
     return str(x)
 
 
+def _coerce_lead_min(x: Any, default: int = 5) -> int:
+    try:
+        v = int(x)
+    except (TypeError, ValueError):
+        return default
+    return min(120, max(0, v))
+
+
 def _normalize_phone(x: str) -> str:
     # keep digits only; WhatsApp deep-link expects digits
     return "".join(ch for ch in (x or "") if ch.isdigit())
@@ -111,6 +123,7 @@ def load_settings(
         time_hhmm=_validate_time_hhmm(
             _coerce_str(sched_raw.get("time_hhmm") or "19:00", "19:00")
         ),
+        prefetch_lead_min=_coerce_lead_min(sched_raw.get("prefetch_lead_min", 5)),
     )
 
     recipients: list[RecipientSettings] = []
@@ -152,6 +165,7 @@ def load_settings(
                     send_close_friends_stories=_coerce_bool(
                         r.get("send_close_friends_stories"), False
                     ),
+                    send_as_album=_coerce_bool(r.get("send_as_album"), False),
                     schedule_enabled=sched_enabled,
                     schedule_tz=sched_tz,
                     schedule_time_hhmm=sched_time,
@@ -218,6 +232,7 @@ def settings_from_public_dict(data: dict) -> AppSettings:
         time_hhmm=_validate_time_hhmm(
             _coerce_str(sched.get("time_hhmm") or "19:00", "19:00")
         ),
+        prefetch_lead_min=_coerce_lead_min(sched.get("prefetch_lead_min", 5)),
     )
 
     recipients_in = data.get("recipients", [])
@@ -264,6 +279,7 @@ def settings_from_public_dict(data: dict) -> AppSettings:
                 send_close_friends_stories=_coerce_bool(
                     r.get("send_close_friends_stories"), False
                 ),
+                send_as_album=_coerce_bool(r.get("send_as_album"), False),
                 schedule_enabled=sched_enabled,
                 schedule_tz=sched_tz,
                 schedule_time_hhmm=sched_time,
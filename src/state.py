@@ -14,6 +14,11 @@ class State:
     last_run_ts: Optional[float] = None  # unix seconds
     last_run_files: list[str] = field(default_factory=list)
     last_run_caption: str = ""
+    # Incremental post cursor: newest post seen (pk + taken_at unix seconds).
+    last_seen_post_pk: Optional[str] = None
+    last_seen_post_ts: Optional[float] = None
+    # Newest story timestamp already handled, per recipient (story change probe).
+    story_watermark_by_recipient: dict[str, float] = field(default_factory=dict)
 
 
 def load_state() -> State:
@@ -43,12 +48,32 @@ def load_state() -> State:
         last_run_files = []
     last_run_files = [str(x) for x in last_run_files]
     last_run_caption = str(data.get("last_run_caption", "") or "")
+    last_seen_post_pk = data.get("last_seen_post_pk", None)
+    last_seen_post_pk = str(last_seen_post_pk) if last_seen_post_pk else None
+    last_seen_post_ts = data.get("last_seen_post_ts", None)
+    try:
+        last_seen_post_ts = (
+            float(last_seen_post_ts) if last_seen_post_ts is not None else None
+        )
+    except Exception:
+        last_seen_post_ts = None
+    story_marks: dict[str, float] = {}
+    raw_marks = data.get("story_watermark_by_recipient", {}) or {}
+    if isinstance(raw_marks, dict):
+        for k, v in raw_marks.items():
+            try:
+                story_marks[str(k)] = float(v)
+            except Exception:
+                continue
     return State(
         sent_ids=sent,
         sent_ids_by_recipient=sent_by_recipient,
         last_run_ts=last_run_ts,
         last_run_files=last_run_files,
         last_run_caption=last_run_caption,
+        last_seen_post_pk=last_seen_post_pk,
+        last_seen_post_ts=last_seen_post_ts,
+        story_watermark_by_recipient=story_marks,
     )
 
 
@@ -61,6 +86,9 @@ def save_state(state: State) -> None:
         "last_run_ts": state.last_run_ts,
         "last_run_files": list(state.last_run_files),
         "last_run_caption": state.last_run_caption,
+        "last_seen_post_pk": state.last_seen_post_pk,
+        "last_seen_post_ts": state.last_seen_post_ts,
+        "story_watermark_by_recipient": dict(state.story_watermark_by_recipient or {}),
     }
     STATE_PATH.write_text(
         json.dumps(payload, indent=2, ensure_ascii=False) + "\n", encoding="utf-8"
@@ -5,8 +5,7 @@ from pathlib import Path
 
 from src.ig import IgClient
 from src.insights import get_not_following_back_usernames
-from src.main import load_config
-from src.wa import WhatsAppSender
+from src.main import load_config, open_wa_sender
 
 SNAPSHOT_PATH = Path("unfollow_state.json")
 
@@ -57,7 +56,7 @@ def check_unfollows_and_update(*, notify: bool) -> list[str]:
     )
 
     if notify and unfollowed_usernames:
-        wa = WhatsAppSender(profile_dir=Path("wa_profile"))
+        wa = open_wa_sender(lean=cfg.wa_lean, headless=cfg.wa_headless)
         wa.start()
         msg = "Unfollow alert:\n" + "\n".join(f"- {u}" for u in unfollowed_usernames)
         wa.send_text(cfg.wa_report_contact_name, msg, phone=cfg.wa_report_phone)
@@ -1,14 +1,269 @@
 from __future__ import annotations
 
+import json
 import re
 import platform
 import subprocess
 import time
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Callable
 
 from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
 from playwright.sync_api import sync_playwright
 
+from src.browser import (
+    LEAN_CHROMIUM_ARGS,
+    desktop_user_agent,
+    install_lean_routing,
+    process_tree_rss,
+)
+from src.exceptions import WhatsAppLoggedOutError
+from src.media import MediaFile, media_size, upload_files_arg
+from src.wa_chats import VIA_ROW, VIA_SEARCH, ChatDirectory, chat_key
+from src.wa_selectors import SelectorRanking, race_selectors
+
+# Send confirmation: wait for the new outgoing bubble to leave the pending
+# (clock) state. The bound grows with the upload size, assuming a slow uplink.
+BASE_CONFIRM_S = 10.0
+MIN_UPLINK_BYTES_PER_S = 200_000
+MAX_CONFIRM_S = 600.0
+
+# Outgoing message ids currently rendered in the open chat.
+_OUTGOING_IDS_JS = """
+() => [...document.querySelectorAll('#main div.message-out')].map(
+  el => (el.closest('[data-id]') || el).getAttribute('data-id') || '')
+"""
+
+# True once a bubble not in `before` exists and none of the new ones is pending.
+_SENT_JS = """
+(before) => {
+  const seen = new Set(before);
+  const fresh = [...document.querySelectorAll('#main div.message-out')].filter(
+    el => !seen.has((el.closest('[data-id]') || el).getAttribute('data-id') || ''));
+  if (!fresh.length) return false;
+  return fresh.every(el => !el.querySelector('span[data-icon="msg-time"]'));
+}
+"""
+
+
+# Which screen WhatsApp Web shows: the app ("in"), the QR login page ("out"),
+# or neither yet ("loading").
+_LOGIN_STATE_JS = """
+() => {
+  if (document.querySelector(
+      '#pane-side, footer div[role="textbox"][contenteditable="true"]')) return 'in';
+  if (document.querySelector(
+      'div[data-ref] canvas, canvas[aria-label*="scan" i], canvas[aria-label*="QR" i]'))
+    return 'out';
+  return 'loading';
+}
+"""
+
+# The QR page must be seen this long before a headless start gives up; it can
+# flash briefly while a valid session is restored.
+LOGGED_OUT_CONFIRM_S = 3.0
+
+
+# Paste text into a contenteditable the way a user's Ctrl+V would; WhatsApp's
+# editor handles it in one step and keeps line breaks and emoji.
+_PASTE_JS = """
+(el, text) => {
+  el.focus();
+  const dt = new DataTransfer();
+  dt.setData('text/plain', text);
+  el.dispatchEvent(new ClipboardEvent('paste', {
+    clipboardData: dt, bubbles: true, cancelable: true }));
+}
+"""
+
+
+def _text_lines(text: str) -> list[str]:
+    """Non-empty lines, whitespace-normalized (editors render blank lines differently)."""
+    text = (text or "").replace("\r\n", "\n").replace("\u00a0", " ")
+    return [ln.strip() for ln in text.split("\n") if ln.strip()]
+
+
+# True once a bubble not in `before` exists (pending or not): the send went out.
+_BUBBLE_JS = """
+(before) => {
+  const seen = new Set(before);
+  return [...document.querySelectorAll('#main div.message-out')].some(
+    el => !seen.has((el.closest('[data-id]') || el).getAttribute('data-id') || ''));
+}
+"""
+
+# True once the chat-list row titled `name` shows no pending (clock) icon.
+_ROW_SENT_JS = """
+(name) => {
+  const t = [...document.querySelectorAll('#pane-side span[title]')].find(
+    s => s.getAttribute('title') === name);
+  if (!t) return false;
+  const row = t.closest('[role="listitem"],[role="row"],[role="gridcell"]')
+    || t.parentElement;
+  return !row.querySelector('span[data-icon="msg-time"]');
+}
+"""
+
+# Title of the open chat, from its header ("" if none is open).
+_HEADER_TITLE_JS = """
+() => {
+  const h = document.querySelector('#main header');
+  if (!h) return '';
+  const s = h.querySelector('span[title]') || h.querySelector('span[dir="auto"]');
+  return s ? (s.getAttribute('title') || s.textContent || '').trim() : '';
+}
+"""
+
+# Budget for an in-app chat switch before falling back to another route.
+CHAT_SWITCH_TIMEOUT_MS = 5_000
+
+_COMPOSER = 'footer div[role="textbox"][contenteditable="true"]'
+_MULTI_INPUT = (
+    'input[type="file"][multiple][accept*="image"], '
+    'input[type="file"][multiple][accept*="video"]'
+)
+
+# Candidate selectors per UI action (raced; see `race_selectors`). Shared with
+# the async sender in src/wa_async.py.
+_ATTACH_SELECTORS = [
+    'button[aria-label="Attach"]',
+    'button[title="Attach"]',
+    'span[data-icon="plus"]',
+    'span[data-icon="clip"]',
+]
+_PHOTOS_VIDEOS_LABELS = [
+    # English
+    "Photos & videos",
+    "Photos and videos",
+    # Turkish (common)
+    "Fotoğraflar ve videolar",
+    "Fotoğraflar ve Videolar",
+]
+# Prefer clicking the actual menu-row button; all labels/row types at once.
+_PHOTOS_VIDEOS_SELECTORS = [
+    f'{tag}:has-text("{lab}")'
+    for lab in _PHOTOS_VIDEOS_LABELS
+    for tag in ('div[role="button"]', "button", "li")
+]
+_PREVIEW_SEND_SELECTORS = [
+    # Common in current WA builds (matches the screenshot)
+    'div[role="button"][aria-label="Send"]',
+    'div[role="button"][aria-label="Gönder"]',
+    'div[aria-label="Send"]',
+    'div[aria-label="Gönder"]',
+    'button[aria-label="Send"]',
+    'button[aria-label="Gönder"]',
+    # Icon variants
+    'div[role="button"]:has(span[data-icon="wds-ic-send-filled"])',
+    'button:has(span[data-icon="wds-ic-send-filled"])',
+    'span[data-icon="wds-ic-send-filled"]',
+    'div[role="button"]:has(span[data-icon^="send"])',
+    'button:has(span[data-icon^="send"])',
+    'span[data-icon^="send"]',
+]
+_BATCH_SEND_SELECTORS = [
+    'div[role="dialog"] div[aria-label="Send"]',
+    'div[role="dialog"] div[aria-label="Gönder"]',
+    'div[aria-label="Send"]',
+    'div[aria-label="Gönder"]',
+    'div[role="dialog"] button:has(span[data-icon="wds-ic-send-filled"])',
+    'div[role="dialog"] div[role="button"]:has(span[data-icon="wds-ic-send-filled"])',
+    'button:has(span[data-icon="wds-ic-send-filled"])',
+    'span[data-icon="wds-ic-send-filled"]',
+    'div[role="dialog"] button:has(span[data-icon^="send"])',
+    'div[role="dialog"] div[role="button"]:has(span[data-icon^="send"])',
+    'button:has(span[data-icon^="send"])',
+    'span[data-icon^="send"]',
+]
+_MEDIA_INPUT_SELECTORS = [
+    'input[type="file"][accept*="image"]',
+    'input[type="file"][accept*="video"]',
+    'input[type="file"][accept*="image"][multiple]',
+    'input[type="file"][accept*="video"][multiple]',
+    # Fallbacks
+    'input[type="file"][multiple]',
+    'input[type="file"]',
+]
+# Known-ish aria-labels (localized UIs) before generic contenteditable matches.
+_SEARCH_BOX_SELECTORS = [
+    'div[role="textbox"][contenteditable="true"][aria-label*="Search"]',
+    'div[role="textbox"][contenteditable="true"][aria-label*="Ara"]',
+    'div[role="textbox"][contenteditable="true"][title*="Search"]',
+    'div[role="textbox"][contenteditable="true"][title*="Ara"]',
+    # Fallbacks (less safe; might match other textboxes)
+    'div[role="textbox"][contenteditable="true"][data-tab]',
+    'div[role="textbox"][contenteditable="true"]',
+]
+
+# Scores every file input for "Photos & videos" (and against the sticker one);
+# returns the best index plus the top candidates for logging.
+_SCORE_FILE_INPUTS_JS = """
+(els, wantMultiple) => {
+  let best = { score: -1e9, idx: 0, accept: "", meta: "" };
+  const scored = [];
+  els.forEach((el, i) => {
+    const accept = (el.getAttribute('accept') || '').toLowerCase();
+    const dt = (el.getAttribute('data-testid') || '').toLowerCase();
+    const id = (el.id || '').toLowerCase();
+    const cls = (el.className || '').toString().toLowerCase();
+    const name = (el.getAttribute('name') || '').toLowerCase();
+    const meta = [accept, dt, id, cls, name].join(' ');
+
+    let score = 0;
+    if (accept.includes('image') || accept.includes('video')) score += 50;
+    if (accept.includes('video')) score += 40;  // prefer real media input over sticker-like image-only
+    if (accept.includes('jpeg') || accept.includes('png') || accept.includes('mp4')) score += 10;
+    if (el.hasAttribute('multiple')) score += 8;
+    if (wantMultiple && el.hasAttribute('multiple')) score += 8;
+    if (wantMultiple && !el.hasAttribute('multiple')) score -= 3;
+
+    // Strongly avoid sticker-related inputs
+    if (meta.includes('sticker')) score -= 200;
+    // Avoid "document" style inputs that take anything
+    if (accept.includes('*/*') || accept.trim() === '') score -= 20;
+
+    if (score > best.score) best = { score, idx: i, accept, meta };
+    scored.push({ i, score, accept, meta });
+  });
+  scored.sort((a,b) => b.score - a.score);
+  return { count: els.length, best, top: scored.slice(0, 8) };
+}
+"""
+
+
+@dataclass
+class FanoutJob:
+    """One recipient's sends for `WhatsAppSender.send_fanout`."""
+
+    key: str  # caller's id, e.g. the recipient id
+    contact_name: str
+    phone: str = ""
+    # (files, caption) per message, sent in this order
+    parts: list[tuple[list[MediaFile], str]] = field(default_factory=list)
+
+
+def send_timeout_s(total_bytes: int) -> float:
+    """Upper bound for confirming a send of ``total_bytes`` of media."""
+    return min(MAX_CONFIRM_S, BASE_CONFIRM_S + total_bytes / MIN_UPLINK_BYTES_PER_S)
+
+
+def is_stale_profile_lock(err: Exception) -> bool:
+    """If the script previously crashed, Chromium can leave stale Singleton* files."""
+    msg = str(err)
+    return "ProcessSingleton" in msg or "SingletonLock" in msg
+
+
+def clear_profile_locks(profile_dir: Path) -> None:
+    for name in ("SingletonLock", "SingletonCookie", "SingletonSocket"):
+        p = profile_dir / name
+        try:
+            if p.exists():
+                p.unlink()
+        except Exception:
+            # Best-effort cleanup; we'll retry regardless.
+            pass
+
 
 class WhatsAppSender:
     """
@@ -17,42 +272,57 @@ class WhatsAppSender:
     - Searches the contact by name and sends an image with caption.
     """
 
-    def __init__(self, *, profile_dir: Path) -> None:
+    def __init__(
+        self, *, profile_dir: Path, lean: bool = False, headless: bool = False
+    ) -> None:
         self._profile_dir = profile_dir
+        self._lean = lean  # block avatars/fonts/media previews, trim Chromium
+        # Needs a profile logged in by an earlier headed run (no QR to scan).
+        self._headless = headless
         self._pw = None
         self._context = None
         self._page = None
+        self.last_send_s: float | None = None  # latency of the last send call
+        self.ready_s: float | None = None  # launch -> logged-in UI, last start()
+        self._selectors = SelectorRanking()
+        self._chats = ChatDirectory()
 
     def start(self) -> None:
+        started = time.monotonic()
         self._pw = sync_playwright().start()
         self._profile_dir.mkdir(parents=True, exist_ok=True)
 
         def _launch():
             return self._pw.chromium.launch_persistent_context(
                 user_data_dir=str(self._profile_dir),
-                headless=False,
+                headless=self._headless,
+                args=list(LEAN_CHROMIUM_ARGS) if self._lean else [],
             )
 
         try:
             self._context = _launch()
         except Exception as e:  # noqa: BLE001 - retry for common stale-lock issue
-            msg = str(e)
-            # If the script previously crashed, Chromium can leave stale Singleton* files.
-            if "ProcessSingleton" in msg or "SingletonLock" in msg:
-                for name in ("SingletonLock", "SingletonCookie", "SingletonSocket"):
-                    p = self._profile_dir / name
-                    try:
-                        if p.exists():
-                            p.unlink()
-                    except Exception:
-                        # Best-effort cleanup; we'll retry regardless.
-                        pass
+            if is_stale_profile_lock(e):
+                clear_profile_locks(self._profile_dir)
                 self._context = _launch()
             else:
                 raise
+        if self._lean:
+            install_lean_routing(self._context)
         self._page = self._context.new_page()
+        if self._headless:
+            self._spoof_desktop_user_agent()
         self._page.goto("https://web.whatsapp.com/", wait_until="domcontentloaded")
         self._wait_until_logged_in()
+        self.ready_s = time.monotonic() - started
+        rss_mib = process_tree_rss() >> 20
+        mode = ("lean" if self._lean else "default") + (
+            ", headless" if self._headless else ""
+        )
+        print(
+            f"[wa] WhatsApp Web ready in {self.ready_s:.1f}s "
+            f"({mode} mode, browser RSS {rss_mib} MiB)"
+        )
 
     def stop(self) -> None:
         try:
@@ -65,48 +335,296 @@ class WhatsAppSender:
         self._context = None
         self._page = None
 
+    def is_alive(self) -> bool:
+        """True while the browser page is open (used by the long-lived daemon)."""
+        try:
+            return self._page is not None and not self._page.is_closed()
+        except Exception:
+            return False
+
+    def _spoof_desktop_user_agent(self) -> None:
+        """Apply `desktop_user_agent` to requests and ``navigator`` before loading."""
+        assert self._page is not None and self._context is not None
+        ua = self._page.evaluate("() => navigator.userAgent")
+        fixed = desktop_user_agent(ua)
+        if fixed == ua:
+            return
+        self._context.set_extra_http_headers({"User-Agent": fixed})
+        self._context.add_init_script(
+            "Object.defineProperty(Navigator.prototype, 'userAgent', "
+            f"{{get: () => {json.dumps(fixed)}}});"
+        )
+
+    def _login_state(self) -> str:
+        """``"in"``, ``"out"`` (QR login page) or ``"loading"``."""
+        assert self._page is not None
+        try:
+            return self._page.evaluate(_LOGIN_STATE_JS)
+        except Exception:  # noqa: BLE001 - page still navigating
+            return "loading"
+
     def _wait_until_logged_in(self, timeout_s: int = 120) -> None:
+        """
+        Wait for the logged-in UI (chat list or an open chat's composer).
+
+        If the QR login page shows instead, a headless start raises
+        `WhatsAppLoggedOutError` after `LOGGED_OUT_CONFIRM_S`; a headed one
+        keeps waiting for the QR code to be scanned.
+        """
         assert self._page is not None
-        # Logged-in UI includes either:
-        # - left-pane search box, or
-        # - message composer in footer (if a chat is already open)
         deadline = time.time() + timeout_s
-        last_error: Exception | None = None
+        out_since: float | None = None
         while time.time() < deadline:
+            state = self._login_state()
+            if state == "in":
+                return
+            if state == "out":
+                now = time.time()
+                if out_since is None:
+                    out_since = now
+                    if not self._headless:
+                        print("[wa] Logged out: scan the QR code in the browser.")
+                elif self._headless and now - out_since >= LOGGED_OUT_CONFIRM_S:
+                    raise WhatsAppLoggedOutError(
+                        f"WhatsApp Web is logged out in {self._profile_dir}; "
+                        "start once without WA_HEADLESS and scan the QR code."
+                    )
+            else:
+                out_since = None
+            time.sleep(0.5)
+        raise TimeoutError("Timed out waiting for WhatsApp Web login")
+
+    def _enter_text(self, box, text: str, *, delay: int = 5) -> None:
+        """
+        Put ``text`` into a contenteditable box without typing it key by key:
+        paste first, then ``insert_text``; per-key typing is the fallback.
+        Each path is checked against the box content before moving on.
+        """
+        assert self._page is not None
+        box.click()
+
+        def _matches() -> bool:
             try:
-                # If a chat is open, footer composer exists.
-                if self._page.locator(
-                    'footer div[role="textbox"][contenteditable="true"]'
-                ).first.is_visible():
-                    return
-                _ = self._get_search_box()
+                return _text_lines(box.inner_text()) == _text_lines(text)
+            except Exception:
+                return False
+
+        def _clear() -> None:
+            select_all = "Meta+A" if platform.system() == "Darwin" else "Control+A"
+            box.press(select_all)
+            box.press("Backspace")
+
+        try:
+            box.evaluate(_PASTE_JS, text)
+            if _matches():
                 return
-            except Exception as e:  # noqa: BLE001 - best-effort probing
-                last_error = e
-                time.sleep(1)
-        raise TimeoutError("Timed out waiting for WhatsApp Web login") from last_error
+            _clear()
+            if "\n" not in text:
+                # Multi-line insert_text can turn into Enter (= send), so single lines only.
+                self._page.keyboard.insert_text(text)
+                if _matches():
+                    return
+                _clear()
+        except Exception:  # noqa: BLE001 - fall through to typing
+            pass
+
+        print("[wa] Fast text entry not accepted; typing instead.")
+        for i, line in enumerate(text.split("\n")):
+            if i:
+                # Plain Enter would send; Shift+Enter is a line break.
+                box.press("Shift+Enter")
+            if line:
+                box.type(line, delay=delay)
+
+    def _outgoing_ids(self) -> list[str]:
+        assert self._page is not None
+        try:
+            return list(self._page.evaluate(_OUTGOING_IDS_JS) or [])
+        except Exception:
+            return []
+
+    def _wait_for_sent(self, before: list[str], *, total_bytes: int = 0) -> bool:
+        """
+        Wait until the message just sent shows up as an outgoing bubble that is
+        no longer pending (single/double tick). Returns False if it is still
+        pending when the size-based bound runs out.
+        """
+        assert self._page is not None
+        timeout_s = send_timeout_s(total_bytes)
+        try:
+            self._page.wait_for_function(
+                _SENT_JS, arg=before, timeout=timeout_s * 1000, polling=250
+            )
+            return True
+        except PlaywrightTimeoutError:
+            print(f"[wa] Send not confirmed after {timeout_s:.0f}s; continuing.")
+            return False
+
+    def _race(self, action: str, selectors: list[str], *, timeout_ms: int, **kw):
+        assert self._page is not None
+        loc, _ = race_selectors(
+            self._page,
+            selectors,
+            timeout_ms=timeout_ms,
+            ranking=self._selectors,
+            action=action,
+            **kw,
+        )
+        return loc
+
+    def _wait_for_bubble(self, before: list[str], *, timeout_s: float = 30.0) -> None:
+        """Wait until the just-sent message has a bubble (it may still be uploading)."""
+        assert self._page is not None
+        try:
+            self._page.wait_for_function(
+                _BUBBLE_JS, arg=before, timeout=timeout_s * 1000, polling=250
+            )
+        except PlaywrightTimeoutError as e:
+            raise RuntimeError("Sent message did not appear in the chat") from e
+
+    def _wait_row_sent(self, name: str, *, deadline: float) -> bool:
+        """Wait until chat ``name`` has no pending message in the chat list."""
+        assert self._page is not None
+        try:
+            self._page.wait_for_function(
+                _ROW_SENT_JS,
+                arg=name,
+                timeout=max(1.0, deadline - time.time()) * 1000,
+                polling=500,
+            )
+            return True
+        except PlaywrightTimeoutError:
+            print(f"[wa] Upload to {name} not confirmed in time; continuing.")
+            return False
+
+    def _fill_caption(self, caption: str) -> None:
+        assert self._page is not None
+        try:
+            # Caption box lives in the media preview dialog; avoid grabbing the left search box.
+            dialog = self._page.locator('div[role="dialog"]').first
+            caption_box = dialog.locator(
+                'div[role="textbox"][contenteditable="true"]'
+            ).last
+            caption_box.wait_for(timeout=15_000)
+            self._enter_text(caption_box, caption, delay=5)
+        except PlaywrightTimeoutError:
+            # Caption selector changes; if we fail, still try sending the media.
+            pass
 
-    def _click_first(self, selectors: list[str], *, timeout_ms: int = 8_000) -> None:
+    def _submit_media(self, files: list[MediaFile], caption: str) -> None:
+        """
+        Upload ``files`` into the open chat and click send, returning once the
+        message bubbles exist (uploads keep running in the page).
+        """
         assert self._page is not None
-        last_err: Exception | None = None
-        for sel in selectors:
+        groups = [files]
+        if len(files) > 1 and self._page.locator(_MULTI_INPUT).first.count() == 0:
+            groups = [[f] for f in files]
+        for i, group in enumerate(groups):
+            before = self._outgoing_ids()
+            self._upload_via_plus_photos_videos(group)
+            if caption and i == 0:
+                self._fill_caption(caption)
             try:
-                loc = self._page.locator(sel).first
-                loc.wait_for(state="visible", timeout=timeout_ms)
+                self._click_send_in_preview()
+            except Exception:
+                self._page.keyboard.press("Enter")
+            self._wait_for_bubble(before)
+
+    def send_fanout(
+        self,
+        jobs: list[FanoutJob],
+        *,
+        max_in_flight: int,
+        on_sent: Callable[[FanoutJob, int], None],
+    ) -> list[tuple[FanoutJob, Exception]]:
+        """
+        Deliver to several chats with their uploads overlapping.
+
+        WhatsApp Web allows one active tab per session, so this pipelines on the
+        single page: each recipient's messages are submitted, then the chat is
+        switched in-app while the uploads continue. Up to ``max_in_flight``
+        recipients may have unconfirmed uploads; completion is read from the
+        pending icon on each chat's row in the chat list.
+
+        ``on_sent(job, part_index)`` runs for every confirmed part, so callers
+        can persist progress as it happens. Chats are switched in-app (see
+        `open_chat`); a recipient only known by phone and never opened before
+        needs a deep-link reload, which would abort running uploads, so it
+        drains the pipeline first and is sent in place. Returns failed jobs with
+        their errors; the remaining jobs still go out.
+        """
+        assert self._page is not None
+        max_in_flight = max(1, max_in_flight)
+        # (job, chat-list title, parts submitted, deadline for their confirmation)
+        in_flight: list[tuple[FanoutJob, str, int, float]] = []
+        failures: list[tuple[FanoutJob, Exception]] = []
+
+        def _drain(keep: int) -> None:
+            while len(in_flight) > keep:
+                job, title, n_parts, deadline = in_flight.pop(0)
+                self._wait_row_sent(title, deadline=deadline)
+                for i in range(n_parts):
+                    on_sent(job, i)
+                print(f"[wa] Delivered to {title} ({n_parts} message(s))")
+
+        for job in jobs:
+            t0 = time.time()
+            key = chat_key(job.contact_name, job.phone)
+            if not (job.contact_name or self._chats.get(key)):
+                _drain(0)
                 try:
-                    loc.scroll_into_view_if_needed(timeout=2_000)
-                except Exception:
-                    pass
-                # Ensure clicks don't hang indefinitely.
+                    for i, (files, caption) in enumerate(job.parts):
+                        self.send_media_batch(
+                            job.contact_name, files, phone=job.phone, caption=caption
+                        )
+                        on_sent(job, i)
+                except Exception as e:  # noqa: BLE001 - reported to the caller
+                    failures.append((job, e))
+                continue
+
+            _drain(max_in_flight - 1)
+            submitted = 0
+            nbytes = 0
+            title = job.contact_name
+            try:
+                title = self._enter_chat(key, job.contact_name)
+                self._page.wait_for_selector(_COMPOSER, timeout=30_000)
+                for files, caption in job.parts:
+                    self._submit_media(files, caption)
+                    submitted += 1
+                    nbytes += sum(media_size(f) for f in files)
+            except Exception as e:  # noqa: BLE001 - reported to the caller
+                failures.append((job, e))
                 try:
-                    loc.click(timeout=timeout_ms)
+                    # Leave any half-open preview so the next chat can open.
+                    self._page.keyboard.press("Escape")
                 except Exception:
-                    loc.click(timeout=timeout_ms, force=True)
-                return
-            except Exception as e:  # noqa: BLE001
-                last_err = e
-                continue
-        raise RuntimeError(f"Could not click any selector: {selectors}") from last_err
+                    pass
+            if submitted:
+                in_flight.append((job, title, submitted, t0 + send_timeout_s(nbytes)))
+                print(f"[wa] Submitted {submitted} message(s) to {title}")
+        _drain(0)
+        return failures
+
+    def _click_first(
+        self, selectors: list[str], *, timeout_ms: int = 8_000, action: str = ""
+    ) -> None:
+        """Click whichever of ``selectors`` shows up first (all raced at once)."""
+        assert self._page is not None
+        try:
+            loc = self._race(action, selectors, timeout_ms=timeout_ms)
+            try:
+                loc.scroll_into_view_if_needed(timeout=2_000)
+            except Exception:
+                pass
+            # Ensure clicks don't hang indefinitely.
+            try:
+                loc.click(timeout=timeout_ms)
+            except Exception:
+                loc.click(timeout=timeout_ms, force=True)
+        except Exception as e:  # noqa: BLE001
+            raise RuntimeError(f"Could not click any selector: {selectors}") from e
 
     def _click_send_in_preview(self) -> None:
         """
@@ -114,23 +632,7 @@ class WhatsAppSender:
         """
         assert self._page is not None
         self._click_first(
-            [
-                # Common in current WA builds (matches the screenshot)
-                'div[role="button"][aria-label="Send"]',
-                'div[role="button"][aria-label="Gönder"]',
-                'div[aria-label="Send"]',
-                'div[aria-label="Gönder"]',
-                'button[aria-label="Send"]',
-                'button[aria-label="Gönder"]',
-                # Icon variants
-                'div[role="button"]:has(span[data-icon="wds-ic-send-filled"])',
-                'button:has(span[data-icon="wds-ic-send-filled"])',
-                'span[data-icon="wds-ic-send-filled"]',
-                'div[role="button"]:has(span[data-icon^="send"])',
-                'button:has(span[data-icon^="send"])',
-                'span[data-icon^="send"]',
-            ],
-            timeout_ms=30_000,
+            _PREVIEW_SEND_SELECTORS, timeout_ms=30_000, action="preview_send"
         )
 
     def _pick_media_file_input(self):
@@ -139,30 +641,23 @@ class WhatsAppSender:
         WhatsApp often uses different inputs; we prefer one with an 'accept' that includes image/video.
         """
         assert self._page is not None
-        candidates = [
-            'input[type="file"][accept*="image"]',
-            'input[type="file"][accept*="video"]',
-            'input[type="file"][accept*="image"][multiple]',
-            'input[type="file"][accept*="video"][multiple]',
-            # Fallbacks
-            'input[type="file"][multiple]',
-            'input[type="file"]',
-        ]
-        for sel in candidates:
-            loc = self._page.locator(sel).first
-            try:
-                if loc.count() > 0:
-                    return loc
-            except Exception:
-                continue
-        return self._page.locator('input[type="file"]').first
+        try:
+            return self._race(
+                "media_input",
+                _MEDIA_INPUT_SELECTORS,
+                timeout_ms=5_000,
+                state="attached",
+            )
+        except PlaywrightTimeoutError:
+            return self._page.locator('input[type="file"]').first
 
-    def _upload_via_plus_photos_videos(self, files: list[Path]) -> None:
+    def _upload_via_plus_photos_videos(self, files: list[MediaFile]) -> None:
         """
         Forces the UI flow:
         Click '+' -> click 'Photos & Videos' -> set files.
 
         This tends to send as normal media (photos/videos) instead of any other attachment type.
+        Files may be on-disk paths or in-memory ``InlineMedia`` (zero-disk mode).
         """
         assert self._page is not None
         if not files:
@@ -170,46 +665,29 @@ class WhatsAppSender:
 
         print(f"[wa] Uploading {len(files)} file(s) via menu...")
         # Click "+" (or attach icon) to open the attachment menu.
-        self._click_first(
-            [
-                'button[aria-label="Attach"]',
-                'button[title="Attach"]',
-                'span[data-icon="plus"]',
-                'span[data-icon="clip"]',
-            ]
-        )
+        self._click_first(_ATTACH_SELECTORS, action="attach")
         print("[wa] Attachment menu opened. Clicking Photos & videos...")
 
-        labels = [
-            # English
-            "Photos & videos",
-            "Photos and videos",
-            # Turkish (common)
-            "Fotoğraflar ve videolar",
-            "Fotoğraflar ve Videolar",
-        ]
+        labels = _PHOTOS_VIDEOS_LABELS
 
         # WhatsApp renders the '+' popover with varying DOM. Prefer clicking by visible text
         # inside common menu containers.
         def _click_photos_videos_menu_item(timeout_ms: int = 5_000) -> None:
             assert self._page is not None
             last_err: Exception | None = None
-            for lab in labels:
-                # Prefer clicking the actual menu-row button (matches your screenshot).
-                for sel in (
-                    f'div[role="button"]:has-text("{lab}")',
-                    f'button:has-text("{lab}")',
-                    f'li:has-text("{lab}")',
-                ):
-                    try:
-                        loc = self._page.locator(sel).first
-                        loc.wait_for(state="visible", timeout=timeout_ms)
-                        loc.click(timeout=timeout_ms)
-                        return
-                    except Exception as e:  # noqa: BLE001
-                        last_err = e
-                        continue
+            # Prefer clicking the actual menu-row button (matches your screenshot);
+            # all labels/row types are raced at once.
+            try:
+                self._click_first(
+                    _PHOTOS_VIDEOS_SELECTORS,
+                    timeout_ms=timeout_ms,
+                    action="photos_videos_item",
+                )
+                return
+            except Exception as e:  # noqa: BLE001
+                last_err = e
 
+            for lab in labels:
                 # Fallback: locate the text, then click its closest role=button ancestor via JS.
                 try:
                     text_loc = self._page.get_by_text(lab, exact=False).first
@@ -232,7 +710,12 @@ class WhatsAppSender:
         # On your WhatsApp build, "Photos & videos" opens a native macOS picker.
         # Element selectors can be flaky; keyboard navigation is more reliable:
         # menu order is typically: Document (1st), Photos & videos (2nd).
-        if platform.system() == "Darwin" and len(files) == 1:
+        # (The native picker needs a real file, so in-memory media skip it.)
+        if (
+            platform.system() == "Darwin"
+            and len(files) == 1
+            and isinstance(files[0], Path)
+        ):
             try:
                 # Ensure focus is on the popover menu.
                 time.sleep(0.2)
@@ -268,38 +751,7 @@ class WhatsAppSender:
         want_multiple = len(files) > 1
         best = self._page.eval_on_selector_all(
             'input[type="file"]',
-            """
-            (els, wantMultiple) => {
-              let best = { score: -1e9, idx: 0, accept: "", meta: "" };
-              const scored = [];
-              els.forEach((el, i) => {
-                const accept = (el.getAttribute('accept') || '').toLowerCase();
-                const dt = (el.getAttribute('data-testid') || '').toLowerCase();
-                const id = (el.id || '').toLowerCase();
-                const cls = (el.className || '').toString().toLowerCase();
-                const name = (el.getAttribute('name') || '').toLowerCase();
-                const meta = [accept, dt, id, cls, name].join(' ');
-
-                let score = 0;
-                if (accept.includes('image') || accept.includes('video')) score += 50;
-                if (accept.includes('video')) score += 40;  // prefer real media input over sticker-like image-only
-                if (accept.includes('jpeg') || accept.includes('png') || accept.includes('mp4')) score += 10;
-                if (el.hasAttribute('multiple')) score += 8;
-                if (wantMultiple && el.hasAttribute('multiple')) score += 8;
-                if (wantMultiple && !el.hasAttribute('multiple')) score -= 3;
-
-                // Strongly avoid sticker-related inputs
-                if (meta.includes('sticker')) score -= 200;
-                // Avoid "document" style inputs that take anything
-                if (accept.includes('*/*') || accept.trim() === '') score -= 20;
-
-                if (score > best.score) best = { score, idx: i, accept, meta };
-                scored.push({ i, score, accept, meta });
-              });
-              scored.sort((a,b) => b.score - a.score);
-              return { count: els.length, best, top: scored.slice(0, 8) };
-            }
-            """,
+            _SCORE_FILE_INPUTS_JS,
             want_multiple,
         )
         try:
@@ -324,9 +776,8 @@ class WhatsAppSender:
         )
 
         file_input = self._page.locator('input[type="file"]').nth(idx)
-        file_input.set_input_files(
-            [str(p) for p in files] if want_multiple else str(files[0])
-        )
+        upload = upload_files_arg(files)
+        file_input.set_input_files(upload if want_multiple else upload[0])
         print("[wa] Files set on photos/videos input.")
 
     def _try_choose_file_in_macos_dialog(self, file_path: Path) -> bool:
@@ -435,44 +886,103 @@ end run
         WhatsApp changes DOM frequently and labels can be localized.
         """
         assert self._page is not None
-        # Try known-ish aria-labels (localized UIs) before generic contenteditable matches.
-        candidates = [
-            'div[role="textbox"][contenteditable="true"][aria-label*="Search"]',
-            'div[role="textbox"][contenteditable="true"][aria-label*="Ara"]',
-            'div[role="textbox"][contenteditable="true"][title*="Search"]',
-            'div[role="textbox"][contenteditable="true"][title*="Ara"]',
-            # Fallbacks (less safe; might match other textboxes)
-            'div[role="textbox"][contenteditable="true"][data-tab]',
-            'div[role="textbox"][contenteditable="true"]',
-        ]
-        for sel in candidates:
-            loc = self._page.locator(sel).first
-            try:
-                loc.wait_for(timeout=5_000)
-                return loc
-            except PlaywrightTimeoutError:
-                continue
-        raise PlaywrightTimeoutError("Could not locate search box")
+        try:
+            return self._race("search_box", _SEARCH_BOX_SELECTORS, timeout_ms=10_000)
+        except PlaywrightTimeoutError as e:
+            raise PlaywrightTimeoutError("Could not locate search box") from e
 
     def open_chat(self, *, contact_name: str, phone: str = "") -> None:
         """
-        Prefer opening by phone number (most reliable). Falls back to searching by contact_name.
+        Open a chat, inside the already-loaded app when possible.
+
+        Chats opened before are switched to in-app by the route remembered in
+        `ChatDirectory`; others are searched by ``contact_name``. A ``phone``
+        deep link (a full page reload) is used the first time a number is
+        opened and when in-app navigation fails.
         """
         assert self._page is not None
         phone = re.sub(r"\D+", "", phone or "")
-        if phone:
-            # Deep link opens the chat directly; avoids search box flakiness.
-            self._page.goto(
-                f"https://web.whatsapp.com/send?phone={phone}",
-                wait_until="domcontentloaded",
-            )
-            # Wait until message composer exists (footer text box)
-            self._page.wait_for_selector(
-                'footer div[role="textbox"][contenteditable="true"]', timeout=30_000
-            )
-            return
+        key = chat_key(contact_name, phone)
+        if self._chats.get(key) or not phone:
+            try:
+                self._enter_chat(key, contact_name)
+                if phone:
+                    self._page.wait_for_selector(_COMPOSER, timeout=10_000)
+                return
+            except Exception as e:  # noqa: BLE001 - the deep link still works
+                if not phone:
+                    raise
+                print(f"[wa] In-app switch failed ({e}); opening via link")
 
+        # Deep link opens the chat directly; avoids search box flakiness.
+        self._page.goto(
+            f"https://web.whatsapp.com/send?phone={phone}",
+            wait_until="domcontentloaded",
+        )
+        # Wait until message composer exists (footer text box)
+        self._page.wait_for_selector(_COMPOSER, timeout=30_000)
+        title = self._current_chat_title()
+        if title:
+            # The chat now has a row in the chat list; next time click that.
+            self._chats.record(key, title, VIA_ROW)
+
+    def _current_chat_title(self) -> str:
+        assert self._page is not None
+        try:
+            title = self._page.evaluate(_HEADER_TITLE_JS)
+        except Exception:
+            return ""
+        return title if isinstance(title, str) else ""
+
+    def _enter_chat(self, key: str, contact_name: str) -> str:
+        """
+        Switch to the chat for ``key`` without reloading the page and return
+        its chat-list title. Uses the remembered route first (forgetting it if
+        it no longer works), then a search for ``contact_name``.
+        """
+        entry = self._chats.get(key)
+        if entry:
+            title = entry["title"]
+            if self._current_chat_title() == title:
+                return title
+            via = self._switch_chat(title, entry["via"])
+            if via:
+                self._chats.record(key, title, via)
+                return title
+            self._chats.forget(key)
+        if not contact_name:
+            raise RuntimeError(f"No in-app route to chat {key}")
         self._open_chat(contact_name)
+        if self._current_chat_title() == contact_name:
+            self._chats.record(key, contact_name, VIA_SEARCH)
+        return contact_name
+
+    def _switch_chat(self, title: str, via: str) -> str:
+        """
+        Open the chat titled ``title`` by clicking its chat-list row or by
+        search, starting with ``via``. Returns the route that worked, or "".
+        """
+        assert self._page is not None
+        routes = [VIA_SEARCH, VIA_ROW] if via == VIA_SEARCH else [VIA_ROW, VIA_SEARCH]
+        quoted = title.replace('"', '\\"')
+        for route in routes:
+            try:
+                if route == VIA_ROW:
+                    row = self._page.locator(f'#pane-side span[title="{quoted}"]').first
+                    if not row.is_visible():
+                        continue
+                    row.click(timeout=CHAT_SWITCH_TIMEOUT_MS)
+                else:
+                    self._open_chat(title)
+                self._page.wait_for_function(
+                    f"(t) => ({_HEADER_TITLE_JS})() === t",
+                    arg=title,
+                    timeout=CHAT_SWITCH_TIMEOUT_MS,
+                )
+                return route
+            except Exception:  # noqa: BLE001 - try the next route
+                continue
+        return ""
 
     def send_text(self, contact_name: str, text: str, *, phone: str = "") -> None:
         assert self._page is not None
@@ -481,10 +991,13 @@ end run
             'footer div[role="textbox"][contenteditable="true"]'
         ).first
         composer.wait_for(state="visible", timeout=30_000)
-        composer.click()
-        composer.type(text, delay=2)
+        t0 = time.time()
+        before = self._outgoing_ids()
+        self._enter_text(composer, text, delay=2)
         self._page.keyboard.press("Enter")
-        time.sleep(1)
+        self._wait_for_sent(before)
+        self.last_send_s = time.time() - t0
+        print(f"[wa] Text sent in {self.last_send_s:.1f}s")
 
     def _open_chat(self, contact_name: str) -> None:
         assert self._page is not None
@@ -508,29 +1021,25 @@ end run
             pass
 
     def send_media(
-        self, contact_name: str, media_path: Path, *, phone: str = "", caption: str = ""
+        self,
+        contact_name: str,
+        media_path: MediaFile,
+        *,
+        phone: str = "",
+        caption: str = "",
     ) -> None:
         assert self._page is not None
+        t0 = time.time()
         print(f"[wa] Opening chat (phone={'yes' if phone else 'no'})...")
         self.open_chat(contact_name=contact_name, phone=phone)
+        before = self._outgoing_ids()
         print("[wa] Chat opened. Uploading via + -> Photos & Videos...")
         self._upload_via_plus_photos_videos([media_path])
         print("[wa] File selected. Adding caption (if any)...")
 
         # Optional caption box before sending
         if caption:
-            try:
-                # Caption box lives in the media preview dialog; avoid grabbing the left search box.
-                dialog = self._page.locator('div[role="dialog"]').first
-                caption_box = dialog.locator(
-                    'div[role="textbox"][contenteditable="true"]'
-                ).last
-                caption_box.wait_for(timeout=15_000)
-                caption_box.click()
-                caption_box.type(caption, delay=5)
-            except PlaywrightTimeoutError:
-                # Caption selector changes; if we fail, still try sending the media.
-                pass
+            self._fill_caption(caption)
         print("[wa] Clicking send...")
 
         try:
@@ -538,21 +1047,21 @@ end run
         except Exception:
             # Fallback: in some WhatsApp builds the send button is hard to select,
             # but Enter triggers send in the preview.
-            try:
-                self._page.keyboard.press("Enter")
-                time.sleep(1)
-            except Exception:
-                raise
+            self._page.keyboard.press("Enter")
         print("[wa] Send clicked. Waiting for upload...")
 
-        # Give WhatsApp time to upload before closing context.
-        time.sleep(8)
-        print("[wa] Done.")
+        # Must finish uploading before the context may be closed.
+        confirmed = self._wait_for_sent(before, total_bytes=media_size(media_path))
+        self.last_send_s = time.time() - t0
+        print(
+            f"[wa] Done in {self.last_send_s:.1f}s"
+            + ("" if confirmed else " (unconfirmed)")
+        )
 
     def send_media_batch(
         self,
         contact_name: str,
-        media_paths: list[Path],
+        media_paths: list[MediaFile],
         *,
         phone: str = "",
         caption: str = "",
@@ -569,8 +1078,11 @@ end run
             return
 
         assert self._page is not None
+        t0 = time.time()
+        total_bytes = sum(media_size(p) for p in media_paths)
         print(f"[wa] Opening chat for batch (count={len(media_paths)})...")
         self.open_chat(contact_name=contact_name, phone=phone)
+        before = self._outgoing_ids()
         print("[wa] Chat opened. Checking for multi-select upload...")
 
         # Try multi-select via '+' -> 'Photos & Videos' and detect a multiple input.
@@ -582,40 +1094,22 @@ end run
                 print("[wa] Multi-select input found. Uploading all at once...")
                 self._upload_via_plus_photos_videos(media_paths)
                 if caption:
-                    try:
-                        dialog = self._page.locator('div[role="dialog"]').first
-                        caption_box = dialog.locator(
-                            'div[role="textbox"][contenteditable="true"]'
-                        ).last
-                        caption_box.wait_for(timeout=15_000)
-                        caption_box.click()
-                        caption_box.type(caption, delay=5)
-                    except PlaywrightTimeoutError:
-                        pass
+                    self._fill_caption(caption)
                 # Send
                 try:
                     self._click_first(
-                        [
-                            'div[role="dialog"] div[aria-label="Send"]',
-                            'div[role="dialog"] div[aria-label="Gönder"]',
-                            'div[aria-label="Send"]',
-                            'div[aria-label="Gönder"]',
-                            'div[role="dialog"] button:has(span[data-icon="wds-ic-send-filled"])',
-                            'div[role="dialog"] div[role="button"]:has(span[data-icon="wds-ic-send-filled"])',
-                            'button:has(span[data-icon="wds-ic-send-filled"])',
-                            'span[data-icon="wds-ic-send-filled"]',
-                            'div[role="dialog"] button:has(span[data-icon^="send"])',
-                            'div[role="dialog"] div[role="button"]:has(span[data-icon^="send"])',
-                            'button:has(span[data-icon^="send"])',
-                            'span[data-icon^="send"]',
-                        ],
+                        _BATCH_SEND_SELECTORS,
                         timeout_ms=8_000,
+                        action="batch_send",
                     )
                 except Exception:
                     self._page.keyboard.press("Enter")
-                    time.sleep(1)
-                time.sleep(12)
-                print("[wa] Batch send done.")
+                confirmed = self._wait_for_sent(before, total_bytes=total_bytes)
+                self.last_send_s = time.time() - t0
+                print(
+                    f"[wa] Batch send done in {self.last_send_s:.1f}s"
+                    + ("" if confirmed else " (unconfirmed)")
+                )
                 return
         except Exception:
             pass
@@ -648,28 +1142,22 @@ end run
                     raise RuntimeError(
                         f"Failed while sending {p.name} ({idx}/{len(media_paths)}): {e}"
                     ) from e
-            time.sleep(2)
-            print(f"[wa] Sent {idx}/{len(media_paths)}")
-        print("[wa] Sequential batch done.")
+            print(
+                f"[wa] Sent {idx}/{len(media_paths)} ({time.time() - t0:.1f}s elapsed)"
+            )
+        self.last_send_s = time.time() - t0
+        print(f"[wa] Sequential batch done in {self.last_send_s:.1f}s.")
 
-    def _send_in_open_chat(self, media_path: Path, *, caption: str = "") -> None:
+    def _send_in_open_chat(self, media_path: MediaFile, *, caption: str = "") -> None:
         """
         Assumes a chat is already open.
         """
         assert self._page is not None
+        before = self._outgoing_ids()
         self._upload_via_plus_photos_videos([media_path])
 
         if caption:
-            try:
-                dialog = self._page.locator('div[role="dialog"]').first
-                caption_box = dialog.locator(
-                    'div[role="textbox"][contenteditable="true"]'
-                ).last
-                caption_box.wait_for(timeout=15_000)
-                caption_box.click()
-                caption_box.type(caption, delay=5)
-            except PlaywrightTimeoutError:
-                pass
+            self._fill_caption(caption)
 
         # Send using preview-send button (more stable in current UI).
         try:
@@ -677,5 +1165,4 @@ end run
         except Exception:
             # If clicking fails, try Enter (only if page is still alive).
             self._page.keyboard.press("Enter")
-            time.sleep(1)
-        time.sleep(6)
+        self._wait_for_sent(before, total_bytes=media_size(media_path))
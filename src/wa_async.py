@@ -0,0 +1,454 @@
+"""asyncio-native WhatsApp Web sender on ``playwright.async_api``.
+
+`AsyncWhatsAppSender` offers the operations of `WhatsAppSender` (``start``,
+``stop``, ``open_chat``, ``send_text``, ``send_media``, ``send_media_batch``)
+as coroutines with awaitable waits instead of ``time.sleep``. A daemon, the web
+app or a polling loop can then run sends on the same event loop as other I/O,
+and drive several profiles/pages concurrently without threads.
+
+Selectors, page scripts, the learned selector ranking and remembered chat routes
+are shared with the sync sender. The macOS native file-picker path is not
+available here; files are always set on the DOM file input.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import platform
+import re
+import time
+from pathlib import Path
+
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import async_playwright
+
+from src.browser import (
+    LEAN_CHROMIUM_ARGS,
+    desktop_user_agent,
+    install_lean_routing_async,
+)
+from src.exceptions import WhatsAppLoggedOutError
+from src.media import MediaFile, media_size, upload_files_arg
+from src.wa import (
+    _ATTACH_SELECTORS,
+    _BATCH_SEND_SELECTORS,
+    _COMPOSER,
+    _HEADER_TITLE_JS,
+    _LOGIN_STATE_JS,
+    _MEDIA_INPUT_SELECTORS,
+    _MULTI_INPUT,
+    _OUTGOING_IDS_JS,
+    _PASTE_JS,
+    _PHOTOS_VIDEOS_SELECTORS,
+    _PREVIEW_SEND_SELECTORS,
+    _SCORE_FILE_INPUTS_JS,
+    _SEARCH_BOX_SELECTORS,
+    _SENT_JS,
+    CHAT_SWITCH_TIMEOUT_MS,
+    LOGGED_OUT_CONFIRM_S,
+    _text_lines,
+    clear_profile_locks,
+    is_stale_profile_lock,
+    send_timeout_s,
+)
+from src.wa_chats import VIA_ROW, VIA_SEARCH, ChatDirectory, chat_key
+from src.wa_selectors import SelectorRanking, race_selectors_async
+
+
+class AsyncWhatsAppSender:
+    """
+    WhatsApp Web automation for asyncio code; see `WhatsAppSender` for the
+    flows. Use one instance per browser profile.
+    """
+
+    def __init__(
+        self, *, profile_dir: Path, lean: bool = False, headless: bool = False
+    ) -> None:
+        self._profile_dir = profile_dir
+        self._lean = lean
+        self._headless = headless
+        self._pw = None
+        self._context = None
+        self._page = None
+        self.last_send_s: float | None = None
+        self.ready_s: float | None = None
+        self._selectors = SelectorRanking()
+        self._chats = ChatDirectory()
+
+    async def start(self) -> None:
+        started = time.monotonic()
+        self._pw = await async_playwright().start()
+        self._profile_dir.mkdir(parents=True, exist_ok=True)
+
+        async def _launch():
+            return await self._pw.chromium.launch_persistent_context(
+                user_data_dir=str(self._profile_dir),
+                headless=self._headless,
+                args=list(LEAN_CHROMIUM_ARGS) if self._lean else [],
+            )
+
+        try:
+            self._context = await _launch()
+        except Exception as e:  # noqa: BLE001 - retry for common stale-lock issue
+            if not is_stale_profile_lock(e):
+                raise
+            clear_profile_locks(self._profile_dir)
+            self._context = await _launch()
+        if self._lean:
+            await install_lean_routing_async(self._context)
+        self._page = await self._context.new_page()
+        if self._headless:
+            ua = await self._page.evaluate("() => navigator.userAgent")
+            fixed = desktop_user_agent(ua)
+            if fixed != ua:
+                await self._context.set_extra_http_headers({"User-Agent": fixed})
+                await self._context.add_init_script(
+                    "Object.defineProperty(Navigator.prototype, 'userAgent', "
+                    f"{{get: () => {json.dumps(fixed)}}});"
+                )
+        await self._page.goto(
+            "https://web.whatsapp.com/", wait_until="domcontentloaded"
+        )
+        await self._wait_until_logged_in()
+        self.ready_s = time.monotonic() - started
+        print(f"[wa-async] WhatsApp Web ready in {self.ready_s:.1f}s")
+
+    async def stop(self) -> None:
+        try:
+            if self._context is not None:
+                await self._context.close()
+        finally:
+            if self._pw is not None:
+                await self._pw.stop()
+        self._pw = None
+        self._context = None
+        self._page = None
+
+    async def _wait_until_logged_in(self, timeout_s: int = 120) -> None:
+        """Same rules as `WhatsAppSender._wait_until_logged_in`."""
+        assert self._page is not None
+        deadline = time.time() + timeout_s
+        out_since: float | None = None
+        while time.time() < deadline:
+            try:
+                state = await self._page.evaluate(_LOGIN_STATE_JS)
+            except Exception:  # noqa: BLE001 - page still navigating
+                state = "loading"
+            if state == "in":
+                return
+            if state == "out":
+                now = time.time()
+                if out_since is None:
+                    out_since = now
+                    if not self._headless:
+                        print("[wa-async] Logged out: scan the QR code in the browser.")
+                elif self._headless and now - out_since >= LOGGED_OUT_CONFIRM_S:
+                    raise WhatsAppLoggedOutError(
+                        f"WhatsApp Web is logged out in {self._profile_dir}; "
+                        "start once without WA_HEADLESS and scan the QR code."
+                    )
+            else:
+                out_since = None
+            await asyncio.sleep(0.5)
+        raise TimeoutError("Timed out waiting for WhatsApp Web login")
+
+    async def _race(self, action: str, selectors: list[str], *, timeout_ms: int, **kw):
+        assert self._page is not None
+        loc, _ = await race_selectors_async(
+            self._page,
+            selectors,
+            timeout_ms=timeout_ms,
+            ranking=self._selectors,
+            action=action,
+            **kw,
+        )
+        return loc
+
+    async def _click_first(
+        self, selectors: list[str], *, timeout_ms: int = 8_000, action: str = ""
+    ) -> None:
+        try:
+            loc = await self._race(action, selectors, timeout_ms=timeout_ms)
+            try:
+                await loc.click(timeout=timeout_ms)
+            except Exception:
+                await loc.click(timeout=timeout_ms, force=True)
+        except Exception as e:  # noqa: BLE001
+            raise RuntimeError(f"Could not click any selector: {selectors}") from e
+
+    async def _enter_text(self, box, text: str, *, delay: int = 5) -> None:
+        """Paste, then ``insert_text`` (single lines), then per-key typing."""
+        assert self._page is not None
+        await box.click()
+
+        async def _matches() -> bool:
+            try:
+                return _text_lines(await box.inner_text()) == _text_lines(text)
+            except Exception:
+                return False
+
+        async def _clear() -> None:
+            select_all = "Meta+A" if platform.system() == "Darwin" else "Control+A"
+            await box.press(select_all)
+            await box.press("Backspace")
+
+        try:
+            await box.evaluate(_PASTE_JS, text)
+            if await _matches():
+                return
+            await _clear()
+            if "\n" not in text:
+                await self._page.keyboard.insert_text(text)
+                if await _matches():
+                    return
+                await _clear()
+        except Exception:  # noqa: BLE001 - fall through to typing
+            pass
+
+        print("[wa-async] Fast text entry not accepted; typing instead.")
+        for i, line in enumerate(text.split("\n")):
+            if i:
+                await box.press("Shift+Enter")
+            if line:
+                await box.type(line, delay=delay)
+
+    async def _outgoing_ids(self) -> list[str]:
+        assert self._page is not None
+        try:
+            return list(await self._page.evaluate(_OUTGOING_IDS_JS) or [])
+        except Exception:
+            return []
+
+    async def _wait_for_sent(self, before: list[str], *, total_bytes: int = 0) -> bool:
+        assert self._page is not None
+        timeout_s = send_timeout_s(total_bytes)
+        try:
+            await self._page.wait_for_function(
+                _SENT_JS, arg=before, timeout=timeout_s * 1000, polling=250
+            )
+            return True
+        except PlaywrightTimeoutError:
+            print(f"[wa-async] Send not confirmed after {timeout_s:.0f}s; continuing.")
+            return False
+
+    async def _current_chat_title(self) -> str:
+        assert self._page is not None
+        try:
+            title = await self._page.evaluate(_HEADER_TITLE_JS)
+        except Exception:
+            return ""
+        return title if isinstance(title, str) else ""
+
+    async def _search_chat(self, contact_name: str) -> None:
+        assert self._page is not None
+        try:
+            search = await self._race(
+                "search_box", _SEARCH_BOX_SELECTORS, timeout_ms=10_000
+            )
+        except PlaywrightTimeoutError as e:
+            raise PlaywrightTimeoutError("Could not locate search box") from e
+        await search.click()
+        select_all = "Meta+A" if platform.system() == "Darwin" else "Control+A"
+        await search.press(select_all)
+        await search.press("Backspace")
+        await search.type(contact_name, delay=20)
+        await search.press("Enter")
+        try:
+            result = self._page.locator(f'span[title="{contact_name}"]').first
+            await result.wait_for(timeout=8_000)
+            await result.click()
+        except PlaywrightTimeoutError:
+            # If Enter opened the chat directly, we can continue.
+            pass
+
+    async def _switch_chat(self, title: str, via: str) -> str:
+        """Open ``title`` by chat-list row or search; the route that worked or ""."""
+        assert self._page is not None
+        routes = [VIA_SEARCH, VIA_ROW] if via == VIA_SEARCH else [VIA_ROW, VIA_SEARCH]
+        quoted = title.replace('"', '\\"')
+        for route in routes:
+            try:
+                if route == VIA_ROW:
+                    row = self._page.locator(f'#pane-side span[title="{quoted}"]').first
+                    if not await row.is_visible():
+                        continue
+                    await row.click(timeout=CHAT_SWITCH_TIMEOUT_MS)
+                else:
+                    await self._search_chat(title)
+                await self._page.wait_for_function(
+                    f"(t) => ({_HEADER_TITLE_JS})() === t",
+                    arg=title,
+                    timeout=CHAT_SWITCH_TIMEOUT_MS,
+                )
+                return route
+            except Exception:  # noqa: BLE001 - try the next route
+                continue
+        return ""
+
+    async def _enter_chat(self, key: str, contact_name: str) -> str:
+        entry = self._chats.get(key)
+        if entry:
+            title = entry["title"]
+            if await self._current_chat_title() == title:
+                return title
+            via = await self._switch_chat(title, entry["via"])
+            if via:
+                self._chats.record(key, title, via)
+                return title
+            self._chats.forget(key)
+        if not contact_name:
+            raise RuntimeError(f"No in-app route to chat {key}")
+        await self._search_chat(contact_name)
+        if await self._current_chat_title() == contact_name:
+            self._chats.record(key, contact_name, VIA_SEARCH)
+        return contact_name
+
+    async def open_chat(self, *, contact_name: str, phone: str = "") -> None:
+        """In-app switch by remembered route or search; ``phone`` deep link otherwise."""
+        assert self._page is not None
+        phone = re.sub(r"\D+", "", phone or "")
+        key = chat_key(contact_name, phone)
+        if self._chats.get(key) or not phone:
+            try:
+                await self._enter_chat(key, contact_name)
+                if phone:
+                    await self._page.wait_for_selector(_COMPOSER, timeout=10_000)
+                return
+            except Exception as e:  # noqa: BLE001 - the deep link still works
+                if not phone:
+                    raise
+                print(f"[wa-async] In-app switch failed ({e}); opening via link")
+
+        await self._page.goto(
+            f"https://web.whatsapp.com/send?phone={phone}",
+            wait_until="domcontentloaded",
+        )
+        await self._page.wait_for_selector(_COMPOSER, timeout=30_000)
+        title = await self._current_chat_title()
+        if title:
+            self._chats.record(key, title, VIA_ROW)
+
+    async def send_text(self, contact_name: str, text: str, *, phone: str = "") -> None:
+        assert self._page is not None
+        await self.open_chat(contact_name=contact_name, phone=phone)
+        composer = self._page.locator(_COMPOSER).first
+        await composer.wait_for(state="visible", timeout=30_000)
+        t0 = time.time()
+        before = await self._outgoing_ids()
+        await self._enter_text(composer, text, delay=2)
+        await self._page.keyboard.press("Enter")
+        await self._wait_for_sent(before)
+        self.last_send_s = time.time() - t0
+        print(f"[wa-async] Text sent in {self.last_send_s:.1f}s")
+
+    async def _upload(self, files: list[MediaFile]) -> None:
+        """'+' -> 'Photos & videos' -> set ``files`` on the best file input."""
+        assert self._page is not None
+        await self._click_first(_ATTACH_SELECTORS, action="attach")
+        try:
+            await self._click_first(
+                _PHOTOS_VIDEOS_SELECTORS,
+                timeout_ms=2_500,
+                action="photos_videos_item",
+            )
+        except Exception:
+            pass
+        # The menu click attaches the matching input; wait for it, not a fixed delay.
+        try:
+            await self._race(
+                "media_input",
+                _MEDIA_INPUT_SELECTORS,
+                timeout_ms=5_000,
+                state="attached",
+            )
+        except PlaywrightTimeoutError:
+            pass
+        want_multiple = len(files) > 1
+        best = await self._page.eval_on_selector_all(
+            'input[type="file"]', _SCORE_FILE_INPUTS_JS, want_multiple
+        )
+        try:
+            idx = int(best.get("best", {}).get("idx", 0))
+        except Exception:
+            idx = 0
+        upload = upload_files_arg(files)
+        await self._page.locator('input[type="file"]').nth(idx).set_input_files(
+            upload if want_multiple else upload[0]
+        )
+
+    async def _fill_caption(self, caption: str) -> None:
+        assert self._page is not None
+        try:
+            dialog = self._page.locator('div[role="dialog"]').first
+            box = dialog.locator('div[role="textbox"][contenteditable="true"]').last
+            await box.wait_for(timeout=15_000)
+            await self._enter_text(box, caption, delay=5)
+        except PlaywrightTimeoutError:
+            # Caption selector changes; if we fail, still try sending the media.
+            pass
+
+    async def _send_files(
+        self, files: list[MediaFile], caption: str, *, batch: bool = False
+    ) -> bool:
+        """Upload ``files`` as one message into the open chat; True if confirmed."""
+        assert self._page is not None
+        before = await self._outgoing_ids()
+        await self._upload(files)
+        if caption:
+            await self._fill_caption(caption)
+        try:
+            if batch:
+                await self._click_first(
+                    _BATCH_SEND_SELECTORS, timeout_ms=8_000, action="batch_send"
+                )
+            else:
+                await self._click_first(
+                    _PREVIEW_SEND_SELECTORS, timeout_ms=30_000, action="preview_send"
+                )
+        except Exception:
+            await self._page.keyboard.press("Enter")
+        return await self._wait_for_sent(
+            before, total_bytes=sum(media_size(f) for f in files)
+        )
+
+    async def send_media(
+        self,
+        contact_name: str,
+        media_path: MediaFile,
+        *,
+        phone: str = "",
+        caption: str = "",
+    ) -> None:
+        await self.send_media_batch(
+            contact_name, [media_path], phone=phone, caption=caption
+        )
+
+    async def send_media_batch(
+        self,
+        contact_name: str,
+        media_paths: list[MediaFile],
+        *,
+        phone: str = "",
+        caption: str = "",
+    ) -> None:
+        """All files in one message if the input allows multi-select, else one by one."""
+        if not media_paths:
+            return
+        assert self._page is not None
+        t0 = time.time()
+        await self.open_chat(contact_name=contact_name, phone=phone)
+        if len(media_paths) == 1:
+            confirmed = await self._send_files(media_paths, caption)
+        elif await self._page.locator(_MULTI_INPUT).first.count() > 0:
+            confirmed = await self._send_files(media_paths, caption, batch=True)
+        else:
+            confirmed = True
+            for idx, p in enumerate(media_paths):
+                ok = await self._send_files([p], caption if idx == 0 else "")
+                confirmed = confirmed and ok
+        self.last_send_s = time.time() - t0
+        print(
+            f"[wa-async] Sent {len(media_paths)} file(s) in {self.last_send_s:.1f}s"
+            + ("" if confirmed else " (unconfirmed)")
+        )
@@ -0,0 +1,97 @@
+"""WhatsApp startup in the background while Instagram work runs.
+
+Launching Chromium, loading WhatsApp Web and waiting for its chat sync is
+mostly network wait, as are Instagram listing and downloads. `BackgroundSender`
+starts the sender on its own thread as soon as a run knows it has something to
+send, and `start()` then only waits for whatever startup time is left.
+
+Playwright's sync API is bound to the thread that started it, so every call is
+executed on that same thread; callers use the object like a regular sender.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future
+from queue import Queue
+from typing import Any, Callable
+
+
+class BackgroundSender:
+    """
+    Sender proxy that owns a WhatsApp sender on a dedicated thread.
+
+    ``factory`` builds the sender (a `WhatsAppSender` or daemon client) on
+    that thread. Nothing is launched until `begin` (or `start`) is called.
+    """
+
+    def __init__(self, factory: Callable[[], Any]) -> None:
+        self._factory = factory
+        self._sender: Any = None
+        self._calls: Queue = Queue()
+        self._ready: Future = Future()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def begun(self) -> bool:
+        return self._thread is not None
+
+    def begin(self) -> None:
+        """Start launching the sender in the background (idempotent)."""
+        if self._thread is not None:
+            return
+        print("Opening WhatsApp Web in the background (scan QR if asked)...")
+        self._thread = threading.Thread(target=self._run, name="wa-sender", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        try:
+            self._sender = self._factory()
+            self._sender.start()
+        except BaseException as e:  # noqa: BLE001 - re-raised in start()
+            self._ready.set_exception(e)
+            return
+        self._ready.set_result(None)
+        while True:
+            item = self._calls.get()
+            if item is None:
+                return
+            fut, fn, args, kwargs = item
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(fn(*args, **kwargs))
+            except BaseException as e:  # noqa: BLE001 - re-raised in the caller
+                fut.set_exception(e)
+
+    def start(self) -> None:
+        """Wait until the sender is ready, beginning startup if not done yet."""
+        self.begin()
+        self._ready.result()
+
+    def _call(self, fn: Callable, *args, **kwargs) -> Any:
+        fut: Future = Future()
+        self._calls.put((fut, fn, args, kwargs))
+        return fut.result()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for sender operations (open_chat, send_media_batch, ...).
+        if name.startswith("_"):
+            raise AttributeError(name)
+        self.start()
+        attr = getattr(self._sender, name)
+        if not callable(attr):
+            return attr
+        return lambda *args, **kwargs: self._call(attr, *args, **kwargs)
+
+    def stop(self) -> None:
+        """Stop the sender (if it was ever begun) and end its thread."""
+        if self._thread is None:
+            return
+        try:
+            if self._ready.exception() is None:
+                self._call(self._sender.stop)
+        finally:
+            self._calls.put(None)
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,81 @@
+"""Remembered routes to WhatsApp Web chats.
+
+Opening a chat through a ``/send?phone=`` deep link reloads the whole web app
+(JS bootstrap, chat-list sync). Once a chat has been opened, its chat-list title
+and how it was reached in-app (clicking its row in the chat list, or searching)
+are stored in ``wa_chats.json``; later opens switch chats inside the loaded app
+and only fall back to the deep link when that fails.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from pathlib import Path
+
+CHATS_PATH = Path("wa_chats.json")
+
+# How a chat is reached without reloading the page.
+VIA_ROW = "row"  # visible row in the chat list
+VIA_SEARCH = "search"  # typed into the chat search box
+
+
+def chat_key(contact_name: str, phone: str = "") -> str:
+    """Stable cache key: the phone number if known, else the contact name."""
+    digits = re.sub(r"\D+", "", phone or "")
+    return f"phone:{digits}" if digits else f"name:{contact_name}"
+
+
+class ChatDirectory:
+    """Chat key -> ``{"title": chat-list title, "via": VIA_ROW | VIA_SEARCH}``."""
+
+    def __init__(self, path: Path = CHATS_PATH) -> None:
+        self._path = path
+        self._chats: dict[str, dict[str, str]] = self._load()
+
+    def _load(self) -> dict[str, dict[str, str]]:
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {
+            str(k): {"title": str(v["title"]), "via": str(v.get("via", VIA_ROW))}
+            for k, v in data.items()
+            if isinstance(v, dict) and v.get("title")
+        }
+
+    def get(self, key: str) -> dict[str, str] | None:
+        return self._chats.get(key)
+
+    def title(self, key: str) -> str:
+        """Remembered chat-list title for ``key`` ("" if never opened)."""
+        entry = self._chats.get(key)
+        return entry["title"] if entry else ""
+
+    def record(self, key: str, title: str, via: str) -> None:
+        """Remember how ``key`` was reached; persist if that changed anything."""
+        entry = {"title": title, "via": via}
+        if not title or self._chats.get(key) == entry:
+            return
+        self._chats[key] = entry
+        self.save()
+
+    def forget(self, key: str) -> None:
+        """Drop a route that no longer works (chat renamed, archived, ...)."""
+        if self._chats.pop(key, None) is not None:
+            self.save()
+
+    def save(self) -> None:
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        try:
+            tmp.write_text(
+                json.dumps(self._chats, indent=2, ensure_ascii=False) + "\n",
+                encoding="utf-8",
+            )
+            os.replace(tmp, self._path)
+        except OSError:
+            # Routes are only an optimization; never fail a send over them.
+            pass
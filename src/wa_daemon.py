@@ -0,0 +1,396 @@
+"""Long-lived WhatsApp Web sender with a local HTTP API.
+
+Launching Chromium and waiting for WhatsApp Web's initial sync is the slowest
+part of every run. The daemon owns one persistent browser context, stays
+logged in, and executes send jobs submitted over HTTP on 127.0.0.1:
+
+    GET  /health            -> {"ok": true, "busy": false, "queued": 0, ...}
+    POST /send_text         {"contact_name", "text", "phone"}
+    POST /send_media_batch  {"contact_name", "paths", "phone", "caption"}
+
+Playwright's sync API is bound to the thread that started it, so HTTP handler
+threads only enqueue jobs; the main thread runs them one at a time. Between
+jobs the browser is recycled once it grows past ``--max-rss-mib`` or its
+profile caches past ``--max-cache-mib`` (see `src.wa_lifecycle`).
+
+`connect()` returns a `WhatsAppDaemonClient` (same interface as
+`WhatsAppSender`) when a daemon is up, so the CLI, scheduler and unfollow
+checker use it transparently and fall back to their own browser otherwise.
+
+Usage:
+    python -m src.wa_daemon [--port 8765]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Optional
+
+from src.exceptions import WhatsAppConnectionError, WhatsAppSendError
+from src.media import MediaFile, materialize
+from src.wa import WhatsAppSender
+from src.wa_lifecycle import (
+    DEFAULT_MAX_CACHE_MIB,
+    DEFAULT_MAX_RSS_MIB,
+    BrowserLifecycle,
+)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Upper bound for a single job (a batch of large videos can take minutes).
+JOB_TIMEOUT_S = 900
+# How often an idle daemon checks that the page is still alive.
+IDLE_CHECK_S = 300
+
+
+def daemon_url() -> str:
+    return os.getenv("WA_DAEMON_URL", f"http://{DEFAULT_HOST}:{DEFAULT_PORT}").rstrip(
+        "/"
+    )
+
+
+@dataclass
+class _Job:
+    action: str
+    payload: dict
+    done: threading.Event = field(default_factory=threading.Event)
+    error: Optional[str] = None
+
+
+class WhatsAppDaemon:
+    """Runs queued send jobs against one long-lived `WhatsAppSender`."""
+
+    def __init__(
+        self,
+        sender: Any,
+        *,
+        host: str = DEFAULT_HOST,
+        port: int = DEFAULT_PORT,
+        lifecycle: BrowserLifecycle | None = None,
+    ) -> None:
+        self._sender = sender
+        self._lifecycle = lifecycle
+        self._jobs: queue.Queue[_Job | None] = queue.Queue()
+        self._busy = False
+        self._started_ts = time.time()
+        self._sent = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return int(self._server.server_address[1])
+
+    def health(self) -> dict:
+        h = {
+            "ok": True,
+            "busy": self._busy,
+            "queued": self._jobs.qsize(),
+            "jobs_done": self._sent,
+            "uptime_s": round(time.time() - self._started_ts, 1),
+        }
+        if self._lifecycle is not None:
+            h.update(self._lifecycle.usage())
+        return h
+
+    def submit(self, action: str, payload: dict) -> _Job:
+        job = _Job(action=action, payload=payload)
+        self._jobs.put(job)
+        return job
+
+    def start_http(self) -> None:
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def shutdown(self) -> None:
+        self._jobs.put(None)  # wakes and ends run_jobs
+        self._server.shutdown()
+        self._server.server_close()
+
+    def run_jobs(self) -> None:
+        """Job loop; must run on the thread that started the sender."""
+        while True:
+            try:
+                job = self._jobs.get(timeout=IDLE_CHECK_S)
+            except queue.Empty:
+                self._ensure_alive()
+                self._check_limits()
+                continue
+            if job is None:
+                return
+            self._busy = True
+            try:
+                self._run(job)
+            finally:
+                self._busy = False
+                job.done.set()
+            self._check_limits()
+
+    def _check_limits(self) -> None:
+        if self._lifecycle is None:
+            return
+        try:
+            self._lifecycle.between_jobs()
+        except Exception as e:  # noqa: BLE001 - next job's restart path retries
+            print(f"[wa_daemon] Recycling WhatsApp Web failed: {e}")
+
+    def _run(self, job: _Job) -> None:
+        for attempt in (1, 2):
+            try:
+                self._execute(job)
+                self._sent += 1
+                job.error = None
+                return
+            except Exception as e:  # noqa: BLE001 - reported back to the client
+                job.error = f"{type(e).__name__}: {e}"
+                msg = str(e)
+                closed = "Target page" in msg or "has been closed" in msg
+                if attempt == 1 and closed:
+                    print("[wa_daemon] Page closed; restarting WhatsApp Web...")
+                    self._restart()
+                    continue
+                print(f"[wa_daemon] {job.action} failed: {job.error}")
+                return
+
+    def _execute(self, job: _Job) -> None:
+        p = job.payload
+        if job.action == "send_text":
+            self._sender.send_text(
+                p["contact_name"], p["text"], phone=p.get("phone", "")
+            )
+        elif job.action == "send_media_batch":
+            self._sender.send_media_batch(
+                p["contact_name"],
+                [Path(x) for x in p["paths"]],
+                phone=p.get("phone", ""),
+                caption=p.get("caption", ""),
+            )
+        else:
+            raise ValueError(f"unknown action {job.action!r}")
+
+    def _ensure_alive(self) -> None:
+        try:
+            alive = self._sender.is_alive()
+        except Exception:  # noqa: BLE001
+            alive = False
+        if not alive:
+            print("[wa_daemon] Browser is gone; restarting WhatsApp Web...")
+            self._restart()
+
+    def _restart(self) -> None:
+        if self._lifecycle is not None:
+            self._lifecycle.recycle()
+            return
+        try:
+            self._sender.stop()
+        except Exception:  # noqa: BLE001 - best-effort
+            pass
+        self._sender.start()
+
+    def _handler_class(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):  # noqa: A002 - quiet access log
+                pass
+
+            def _reply(self, code: int, body: dict) -> None:
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):  # noqa: N802
+                if self.path == "/health":
+                    self._reply(200, daemon.health())
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):  # noqa: N802
+                action = self.path.strip("/")
+                if action not in ("send_text", "send_media_batch"):
+                    self._reply(404, {"error": "not found"})
+                    return
+                try:
+                    n = int(self.headers.get("Content-Length") or 0)
+                    payload = json.loads(self.rfile.read(n) or b"{}")
+                except Exception:  # noqa: BLE001
+                    self._reply(400, {"error": "invalid JSON body"})
+                    return
+                job = daemon.submit(action, payload)
+                if not job.done.wait(JOB_TIMEOUT_S):
+                    self._reply(504, {"error": "job timed out"})
+                elif job.error:
+                    self._reply(500, {"error": job.error})
+                else:
+                    self._reply(200, {"ok": True})
+
+        return Handler
+
+
+class WhatsAppDaemonClient:
+    """Drop-in for `WhatsAppSender` that submits jobs to a running daemon."""
+
+    def __init__(self, url: str) -> None:
+        self._url = url.rstrip("/")
+
+    def _request(self, path: str, payload: dict | None = None, *, timeout: float):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        req = urllib.request.Request(
+            self._url + path,
+            data=data,
+            headers={"Content-Type": "application/json"},
+            method="POST" if data is not None else "GET",
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                return json.loads(resp.read() or b"{}")
+        except urllib.error.HTTPError as e:
+            try:
+                err = json.loads(e.read() or b"{}").get("error", "")
+            except Exception:  # noqa: BLE001
+                err = ""
+            raise WhatsAppSendError(f"WhatsApp daemon: {err or e}") from e
+        except OSError as e:
+            raise WhatsAppConnectionError(f"WhatsApp daemon unreachable: {e}") from e
+
+    def health(self, *, timeout: float = 2.0) -> dict:
+        return self._request("/health", timeout=timeout)
+
+    # The daemon owns the browser; start/stop/open_chat are no-ops here.
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def open_chat(self, *, contact_name: str, phone: str = "") -> None:
+        pass
+
+    def send_text(self, contact_name: str, text: str, *, phone: str = "") -> None:
+        self._request(
+            "/send_text",
+            {"contact_name": contact_name, "text": text, "phone": phone},
+            timeout=JOB_TIMEOUT_S + 30,
+        )
+
+    def send_media(
+        self,
+        contact_name: str,
+        media_path: MediaFile,
+        *,
+        phone: str = "",
+        caption: str = "",
+    ) -> None:
+        self.send_media_batch(contact_name, [media_path], phone=phone, caption=caption)
+
+    def send_media_batch(
+        self,
+        contact_name: str,
+        media_paths: list[MediaFile],
+        *,
+        phone: str = "",
+        caption: str = "",
+    ) -> None:
+        if not media_paths:
+            return
+        # The daemon reads files itself; in-memory media go through the tmpfs spill dir.
+        paths = [str(materialize(f).resolve()) for f in media_paths]
+        self._request(
+            "/send_media_batch",
+            {
+                "contact_name": contact_name,
+                "paths": paths,
+                "phone": phone,
+                "caption": caption,
+            },
+            timeout=JOB_TIMEOUT_S + 30,
+        )
+
+
+def connect(url: str | None = None) -> WhatsAppDaemonClient | None:
+    """Client for a running daemon, or None if none answers."""
+    client = WhatsAppDaemonClient(url or daemon_url())
+    try:
+        client.health(timeout=1.0)
+    except Exception:  # noqa: BLE001 - no daemon; caller launches its own browser
+        return None
+    return client
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        return default
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default=DEFAULT_HOST)
+    ap.add_argument("--port", type=int, default=DEFAULT_PORT)
+    ap.add_argument(
+        "--lean",
+        action="store_true",
+        default=os.getenv("WA_LEAN", "0").strip() not in ("", "0"),
+        help="Block avatars/fonts/previews and use low-memory Chromium flags",
+    )
+    ap.add_argument(
+        "--headless",
+        action="store_true",
+        default=os.getenv("WA_HEADLESS", "0").strip() not in ("", "0"),
+        help="No browser window; wa_profile must already be logged in",
+    )
+    ap.add_argument(
+        "--max-rss-mib",
+        type=int,
+        default=_env_int("WA_MAX_RSS_MIB", DEFAULT_MAX_RSS_MIB),
+        help="Recycle the browser between jobs above this RSS (0 = never)",
+    )
+    ap.add_argument(
+        "--max-cache-mib",
+        type=int,
+        default=_env_int("WA_MAX_CACHE_MIB", DEFAULT_MAX_CACHE_MIB),
+        help="Recycle and prune profile caches above this size (0 = never)",
+    )
+    args = ap.parse_args()
+
+    profile_dir = Path("wa_profile")
+    sender = WhatsAppSender(
+        profile_dir=profile_dir, lean=args.lean, headless=args.headless
+    )
+    lifecycle = BrowserLifecycle(
+        sender,
+        profile_dir,
+        max_rss_mib=max(0, args.max_rss_mib),
+        max_cache_mib=max(0, args.max_cache_mib),
+    )
+    lifecycle.prune_if_needed()
+    print("[wa_daemon] Opening WhatsApp Web (scan QR if asked)...")
+    sender.start()
+    daemon = WhatsAppDaemon(sender, host=args.host, port=args.port, lifecycle=lifecycle)
+    daemon.start_http()
+    print(f"[wa_daemon] Ready on http://{args.host}:{daemon.port}")
+    try:
+        daemon.run_jobs()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.shutdown()
+        sender.stop()
+
+
+if __name__ == "__main__":
+    main()
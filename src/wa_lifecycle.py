@@ -0,0 +1,159 @@
+"""Memory-bounded lifecycle for a long-lived WhatsApp Web browser.
+
+WhatsApp Web's single-page app keeps growing while it stays open (gigabytes
+after a few days), and Chromium's caches in ``wa_profile`` grow without bound.
+`BrowserLifecycle` checks the browser's resident memory and the size of the
+profile's re-creatable caches between jobs; once a threshold is crossed it
+closes the browser context, prunes those caches if they are too big, and starts
+a fresh one. It is never called while a send is running.
+
+Only caches Chromium rebuilds on its own are pruned (HTTP, code and GPU caches,
+the service worker's asset cache). Cookies, Local Storage and IndexedDB, which
+hold the WhatsApp login, are left alone.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from src.browser import process_tree_rss
+
+# Relative to the profile dir (``user_data_dir``).
+PRUNABLE_PROFILE_DIRS = (
+    "Default/Cache",
+    "Default/Code Cache",
+    "Default/GPUCache",
+    "Default/DawnCache",
+    "Default/Service Worker/CacheStorage",
+    "GrShaderCache",
+    "ShaderCache",
+    "GraphiteDawnCache",
+)
+
+DEFAULT_MAX_RSS_MIB = 1536
+DEFAULT_MAX_CACHE_MIB = 512
+# Walking the profile is slower than reading /proc; size it at most this often.
+CACHE_CHECK_INTERVAL_S = 600
+
+
+def dir_size(path: Path) -> int:
+    """Total size in bytes of the files under ``path`` (0 if missing)."""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def profile_cache_size(profile_dir: Path) -> int:
+    return sum(dir_size(profile_dir / rel) for rel in PRUNABLE_PROFILE_DIRS)
+
+
+def prune_profile_caches(profile_dir: Path) -> int:
+    """
+    Delete the re-creatable caches of ``profile_dir``; returns the bytes freed.
+    The browser using the profile must be closed.
+    """
+    freed = 0
+    for rel in PRUNABLE_PROFILE_DIRS:
+        p = profile_dir / rel
+        if not p.exists():
+            continue
+        size = dir_size(p)
+        shutil.rmtree(p, ignore_errors=True)
+        freed += size - dir_size(p)
+    return freed
+
+
+class BrowserLifecycle:
+    """
+    Recycles ``sender`` (anything with ``start``/``stop``) when its browser
+    uses more than ``max_rss_mib`` or its profile caches exceed
+    ``max_cache_mib``. A limit of 0 disables that check.
+    """
+
+    def __init__(
+        self,
+        sender: Any,
+        profile_dir: Path,
+        *,
+        max_rss_mib: int = DEFAULT_MAX_RSS_MIB,
+        max_cache_mib: int = DEFAULT_MAX_CACHE_MIB,
+        rss: Callable[[], int] = process_tree_rss,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._sender = sender
+        self._profile_dir = profile_dir
+        self._max_rss = max_rss_mib << 20
+        self._max_cache = max_cache_mib << 20
+        self._rss = rss
+        self._clock = clock
+        self._cache_bytes = 0
+        self._cache_checked: float | None = None
+        self.recycles = 0
+
+    def _cache_size(self, *, fresh: bool = False) -> int:
+        now = self._clock()
+        if (
+            fresh
+            or self._cache_checked is None
+            or now - self._cache_checked >= CACHE_CHECK_INTERVAL_S
+        ):
+            self._cache_bytes = profile_cache_size(self._profile_dir)
+            self._cache_checked = now
+        return self._cache_bytes
+
+    def usage(self) -> dict:
+        """Last measured browser RSS and profile cache size, in MiB."""
+        return {
+            "rss_mib": self._rss() >> 20,
+            "cache_mib": self._cache_bytes >> 20,
+            "recycles": self.recycles,
+        }
+
+    def over_limit(self) -> str:
+        """Why the browser should be recycled now ("" if it should not)."""
+        if self._max_rss:
+            rss = self._rss()
+            if rss > self._max_rss:
+                return f"browser RSS {rss >> 20} MiB > {self._max_rss >> 20} MiB"
+        if self._max_cache:
+            cache = self._cache_size()
+            if cache > self._max_cache:
+                return f"profile caches {cache >> 20} MiB > {self._max_cache >> 20} MiB"
+        return ""
+
+    def between_jobs(self) -> bool:
+        """Recycle the browser if a limit is crossed; call only while idle."""
+        reason = self.over_limit()
+        if not reason:
+            return False
+        print(f"[wa_lifecycle] Recycling WhatsApp Web: {reason}")
+        self.recycle()
+        return True
+
+    def recycle(self) -> None:
+        """Stop the browser, prune oversized caches, start it again."""
+        try:
+            self._sender.stop()
+        except Exception:  # noqa: BLE001 - best-effort; a fresh start follows
+            pass
+        self.prune_if_needed()
+        self._sender.start()
+        self.recycles += 1
+
+    def prune_if_needed(self) -> int:
+        """Prune the profile caches if over the limit; the browser must be closed."""
+        if not self._max_cache or self._cache_size(fresh=True) <= self._max_cache:
+            return 0
+        freed = prune_profile_caches(self._profile_dir)
+        self._cache_bytes = profile_cache_size(self._profile_dir)
+        print(f"[wa_lifecycle] Pruned {freed >> 20} MiB of profile caches.")
+        return freed
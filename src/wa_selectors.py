@@ -0,0 +1,130 @@
+"""Selector racing with a learned ranking for WhatsApp Web UI actions.
+
+WhatsApp changes its DOM often, so each UI action has a list of candidate
+selectors. Trying them one after another with multi-second timeouts can burn
+minutes on a stale selector. Instead, all candidates are combined into one
+locator (``a.or_(b).or_(c)``) and awaited once; the first candidate that
+actually matches is used.
+
+The winner for each action is remembered in ``wa_selectors.json`` and tried
+first next time, so among several matches the known-good one is picked.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+
+SELECTORS_PATH = Path("wa_selectors.json")
+
+
+class SelectorRanking:
+    """Per-action candidate order, most recent winner first."""
+
+    def __init__(self, path: Path = SELECTORS_PATH) -> None:
+        self._path = path
+        self._order: dict[str, list[str]] = self._load()
+
+    def _load(self) -> dict[str, list[str]]:
+        try:
+            data = json.loads(self._path.read_text(encoding="utf-8"))
+        except Exception:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        return {
+            str(k): [str(x) for x in v] for k, v in data.items() if isinstance(v, list)
+        }
+
+    def order(self, action: str, selectors: list[str]) -> list[str]:
+        """``selectors`` with previously winning ones first (most recent first)."""
+        learned = [s for s in self._order.get(action, []) if s in selectors]
+        return learned + [s for s in selectors if s not in learned]
+
+    def record(self, action: str, selector: str) -> None:
+        """Move ``selector`` to the front for ``action``; persist if that changed it."""
+        if not action:
+            return
+        current = self._order.get(action, [])
+        if current and current[0] == selector:
+            return
+        self._order[action] = [selector] + [s for s in current if s != selector]
+        self.save()
+
+    def save(self) -> None:
+        tmp = self._path.with_name(self._path.name + ".tmp")
+        try:
+            tmp.write_text(
+                json.dumps(self._order, indent=2, ensure_ascii=False) + "\n",
+                encoding="utf-8",
+            )
+            os.replace(tmp, self._path)
+        except OSError:
+            # Ranking is only an optimization; never fail a send over it.
+            pass
+
+
+def race_selectors(
+    page,
+    selectors: list[str],
+    *,
+    timeout_ms: int,
+    state: str = "visible",
+    ranking: SelectorRanking | None = None,
+    action: str = "",
+):
+    """
+    Wait once for any of ``selectors`` and return ``(locator, selector)`` for
+    the best-ranked candidate that matches. Raises Playwright's TimeoutError
+    if none appears within ``timeout_ms``.
+    """
+    ordered = ranking.order(action, selectors) if ranking else list(selectors)
+    combined = page.locator(ordered[0])
+    for sel in ordered[1:]:
+        combined = combined.or_(page.locator(sel))
+    combined.first.wait_for(state=state, timeout=timeout_ms)
+
+    for sel in ordered:
+        loc = page.locator(sel).first
+        try:
+            hit = loc.count() > 0 if state == "attached" else loc.is_visible()
+        except Exception:
+            continue
+        if hit:
+            if ranking:
+                ranking.record(action, sel)
+            return loc, sel
+    # Matched element vanished between the wait and the check; use the combined one.
+    return combined.first, ""
+
+
+async def race_selectors_async(
+    page,
+    selectors: list[str],
+    *,
+    timeout_ms: int,
+    state: str = "visible",
+    ranking: SelectorRanking | None = None,
+    action: str = "",
+):
+    """`race_selectors` for a ``playwright.async_api`` page."""
+    ordered = ranking.order(action, selectors) if ranking else list(selectors)
+    combined = page.locator(ordered[0])
+    for sel in ordered[1:]:
+        combined = combined.or_(page.locator(sel))
+    await combined.first.wait_for(state=state, timeout=timeout_ms)
+
+    for sel in ordered:
+        loc = page.locator(sel).first
+        try:
+            hit = (
+                await loc.count() > 0 if state == "attached" else await loc.is_visible()
+            )
+        except Exception:
+            continue
+        if hit:
+            if ranking:
+                ranking.record(action, sel)
+            return loc, sel
+    return combined.first, ""
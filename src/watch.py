@@ -0,0 +1,224 @@
+"""Watch mode: forward new posts and stories within minutes instead of daily.
+
+Polls one cheap user-info probe (post count + newest story time) and only runs
+the full list/download/send pipeline when it changes. The poll interval adapts:
+it drops to the minimum right after activity, backs off while the account is
+quiet, stays short in hours that were active before, and stretches when the
+hourly Instagram request budget runs low.
+
+Recipients with a schedule enabled keep it as a delivery window: they receive
+forwards from their slot until ``--window-min`` later, and get a catch-up run
+for the last 24h when the window opens. Recipients without a schedule get
+every forward live.
+
+Usage:
+    python -m src.watch
+    python -m src.watch --min-interval 120 --max-interval 1800 --window-min 60
+"""
+
+import argparse
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from src.ig import ActivityProbe, IgClient
+from src.main import (
+    ITEM_MAX_AGE_S,
+    Config,
+    _login_ig,
+    load_config,
+    run_once,
+    stage_run,
+)
+from src.scheduler import _get_recipient_schedule, _parse_hhmm
+from src.settings import RecipientSettings, ScheduleSettings, load_settings
+
+DEFAULT_MIN_INTERVAL_S = 120
+DEFAULT_MAX_INTERVAL_S = 1800
+DEFAULT_WINDOW_MIN = 60
+
+# Below this fraction of the hourly request budget, polling slows down.
+LOW_BUDGET_FRAC = 0.25
+
+
+@dataclass
+class AdaptiveInterval:
+    """Poll interval that follows the account's observed posting pattern."""
+
+    min_s: float = DEFAULT_MIN_INTERVAL_S
+    max_s: float = DEFAULT_MAX_INTERVAL_S
+    backoff: float = 1.5
+    current: float = DEFAULT_MIN_INTERVAL_S
+    # hour of day -> number of polls that found new activity
+    active_hours: Counter = field(default_factory=Counter)
+
+    def on_activity(self, now: datetime) -> None:
+        self.active_hours[now.hour] += 1
+        self.current = self.min_s
+
+    def on_quiet(self) -> None:
+        self.current = min(self.max_s, self.current * self.backoff)
+
+    def next_delay(self, now: datetime, *, budget_left: float = 1.0) -> float:
+        delay = self.current
+        if self.active_hours[now.hour] >= 2:
+            # Historically busy hour: don't drift far from the minimum.
+            delay = min(delay, self.min_s * 2)
+        if budget_left < LOW_BUDGET_FRAC:
+            delay /= max(budget_left / LOW_BUDGET_FRAC, 0.1)
+        return max(self.min_s, min(self.max_s, delay))
+
+
+def in_delivery_window(
+    recipient: RecipientSettings,
+    global_schedule: ScheduleSettings,
+    now: datetime,
+    *,
+    window_min: int,
+) -> bool:
+    """True if ``recipient`` may receive forwards at ``now`` (tz-aware)."""
+    enabled, tz_name, time_hhmm = _get_recipient_schedule(recipient, global_schedule)
+    if not enabled:
+        return True
+    try:
+        tz = ZoneInfo(tz_name)
+    except Exception:
+        tz = ZoneInfo("Europe/Berlin")
+    local = now.astimezone(tz)
+    hh, mm = _parse_hhmm(time_hhmm)
+    slot = local.replace(hour=hh, minute=mm, second=0, microsecond=0)
+    if local < slot:
+        slot -= timedelta(days=1)
+    return local < slot + timedelta(minutes=window_min)
+
+
+def _changed(prev: ActivityProbe | None, cur: ActivityProbe | None) -> bool:
+    if prev is None or cur is None:
+        return True
+    return cur != prev
+
+
+def _forward(
+    cfg: Config,
+    ig: IgClient,
+    recipient_ids: list[str],
+    *,
+    all_enabled: bool,
+    posts_since_ts: float | None = None,
+) -> None:
+    if all_enabled and posts_since_ts is None:
+        # One listing and one download pass for everyone.
+        run_once(cfg=cfg, staged=stage_run(cfg, ig=ig))
+        return
+    for rid in recipient_ids:
+        staged = stage_run(cfg, ig=ig, recipient_id=rid, posts_since_ts=posts_since_ts)
+        run_once(cfg=cfg, recipient_id=rid, staged=staged)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument(
+        "--min-interval",
+        type=int,
+        default=DEFAULT_MIN_INTERVAL_S,
+        help=f"Shortest poll interval in seconds (default {DEFAULT_MIN_INTERVAL_S})",
+    )
+    ap.add_argument(
+        "--max-interval",
+        type=int,
+        default=DEFAULT_MAX_INTERVAL_S,
+        help=f"Longest poll interval in seconds (default {DEFAULT_MAX_INTERVAL_S})",
+    )
+    ap.add_argument(
+        "--window-min",
+        type=int,
+        default=DEFAULT_WINDOW_MIN,
+        help="Delivery window length for scheduled recipients "
+        f"(default {DEFAULT_WINDOW_MIN})",
+    )
+    args = ap.parse_args()
+
+    cfg = load_config()
+    interval = AdaptiveInterval(
+        min_s=max(30, args.min_interval),
+        max_s=max(args.min_interval, args.max_interval),
+        current=max(30, args.min_interval),
+    )
+    ig: IgClient | None = None
+    last_probe: ActivityProbe | None = None
+    pending: set[str] = set()  # recipients with undelivered changes
+    open_windows: set[str] = set()  # windowed recipients already caught up
+
+    while True:
+        now = datetime.now().astimezone()
+        try:
+            if ig is None:
+                ig = _login_ig(cfg)
+            st = load_settings(
+                default_recipient_name=cfg.wa_content_contact_name,
+                default_recipient_phone=cfg.wa_content_phone,
+            )
+            recipients = [
+                r
+                for r in (st.recipients or [])
+                if r.enabled and (r.wa_contact_name or r.wa_phone)
+            ]
+            probe = ig.probe_activity()
+            if _changed(last_probe, probe):
+                if last_probe is not None:
+                    interval.on_activity(now)
+                pending |= {r.id for r in recipients}
+            else:
+                interval.on_quiet()
+            last_probe = probe
+
+            live: list[str] = []
+            catch_up: list[str] = []
+            for r in recipients:
+                windowed, _, _ = _get_recipient_schedule(r, st.schedule)
+                if not in_delivery_window(
+                    r, st.schedule, now, window_min=args.window_min
+                ):
+                    open_windows.discard(r.id)
+                    continue
+                if windowed and r.id not in open_windows:
+                    catch_up.append(r.id)
+                elif r.id in pending:
+                    live.append(r.id)
+
+            if catch_up:
+                print(f"[watch] Delivery window opened for {', '.join(catch_up)}")
+                _forward(
+                    cfg,
+                    ig,
+                    catch_up,
+                    all_enabled=False,
+                    posts_since_ts=time.time() - ITEM_MAX_AGE_S,
+                )
+                open_windows.update(catch_up)
+                pending.difference_update(catch_up)
+            if live:
+                print(f"[watch] New activity; forwarding to {', '.join(live)}")
+                _forward(
+                    cfg,
+                    ig,
+                    live,
+                    all_enabled=len(live) == len(recipients) and not catch_up,
+                )
+                pending.difference_update(live)
+        except Exception as e:  # noqa: BLE001
+            # Session may have expired; log in again on the next poll.
+            print(f"[watch] Poll failed: {e}")
+            ig = None
+            interval.on_quiet()
+
+        budget = ig.rate_budget_left() if ig is not None else 1.0
+        delay = interval.next_delay(now, budget_left=budget)
+        print(f"[watch] Sleeping {delay:.0f}s (budget left {budget:.0%})")
+        time.sleep(delay)
+
+
+if __name__ == "__main__":
+    main()
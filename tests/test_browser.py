@@ -0,0 +1,69 @@
+"""Tests for lean-mode request blocking and process RSS measurement."""
+
+import os
+import subprocess
+import sys
+from unittest.mock import MagicMock
+
+from src.browser import install_lean_routing, process_tree_rss, should_block
+
+
+class TestShouldBlock:
+    """Test which requests lean mode drops."""
+
+    def test_blocks_fonts_and_avatars(self):
+        """Test fonts and profile pictures are blocked."""
+        assert should_block("https://web.whatsapp.com/x.woff2", "font")
+        assert should_block("https://pps.whatsapp.net/v/t61/abc.jpg", "image")
+
+    def test_media_downloads_blocked_uploads_pass(self):
+        """Test media CDN GETs are blocked but upload POSTs pass."""
+        url = "https://mmg.whatsapp.net/v/t62/abc.enc"
+        assert should_block(url, "fetch", "GET")
+        assert not should_block(url, "fetch", "POST")
+
+    def test_app_and_emoji_pass(self):
+        """Test the app bundle and same-origin images still load."""
+        assert not should_block("https://web.whatsapp.com/app.js", "script")
+        assert not should_block("https://web.whatsapp.com/emoji/1.png", "image")
+        assert not should_block("blob:https://web.whatsapp.com/123", "image")
+
+
+class TestInstallLeanRouting:
+    """Test the route handler aborts or continues per request."""
+
+    def test_handler(self):
+        """Test blocked requests are aborted and others continued."""
+        context = MagicMock()
+        install_lean_routing(context)
+        pattern, handler = context.route.call_args[0]
+        assert pattern == "**/*"
+
+        route, req = MagicMock(), MagicMock()
+        req.url, req.resource_type, req.method = "https://x/f.woff", "font", "GET"
+        handler(route, req)
+        route.abort.assert_called_once()
+
+        route, req = MagicMock(), MagicMock()
+        req.url, req.resource_type, req.method = "https://x/app.js", "script", "GET"
+        handler(route, req)
+        route.continue_.assert_called_once()
+
+
+class TestProcessTreeRss:
+    """Test RSS is summed over child processes via /proc."""
+
+    def test_counts_child(self):
+        """Test a running child process contributes memory."""
+        if not os.path.isdir("/proc"):
+            return
+        child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(5)"])
+        try:
+            assert process_tree_rss() > 0
+        finally:
+            child.kill()
+            child.wait()
+
+    def test_no_children(self):
+        """Test a process without children reports zero."""
+        assert process_tree_rss(root_pid=2**22 + 1) == 0
@@ -0,0 +1,112 @@
+"""Tests for the crash-resumable run checkpoint."""
+
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from src.checkpoint import (
+    CHECKPOINT_PATH,
+    MAX_CHECKPOINT_AGE_S,
+    clear_checkpoint,
+    item_from_dict,
+    item_to_dict,
+    load_checkpoint,
+    start_checkpoint,
+)
+from src.ig import IgItem, PostCursor
+from src.media import InlineMedia
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def _item(pk=1, kind="story"):
+    return IgItem(
+        kind=kind,
+        unique_id=f"{kind}:{pk}",
+        title=kind,
+        caption="hello",
+        created_ts=1000.0,
+        _client=Mock(),
+        _media_pk=pk,
+        story_is_close_friends=True,
+    )
+
+
+def _listed(now=1000.0, recipient_id=None, force=False):
+    cp = start_checkpoint(
+        recipient_id=recipient_id, force_resend_current=force, listed_ts=now
+    )
+    cp.record_listing({"r1": [_item()]}, PostCursor(pk="9", ts=900.0), 950.0)
+    return cp
+
+
+class TestRunCheckpoint:
+    """Test journaling and reloading a run."""
+
+    def test_round_trip(self):
+        """Test the listing, downloads and sends survive a reload."""
+        f = Path("a.jpg")
+        f.write_bytes(b"x")
+        cp = _listed()
+        cp.record_download("story:1", [f])
+        cp.mark_sent("r1", ["story:1"])
+
+        loaded = load_checkpoint(
+            recipient_id=None, force_resend_current=False, now=1060.0
+        )
+
+        assert loaded.items_by_recipient == {"r1": ["story:1"]}
+        assert loaded.cursor() == PostCursor(pk="9", ts=900.0)
+        assert loaded.story_mark == 950.0
+        assert loaded.reusable_files("story:1") == [f]
+        assert loaded.sent == {"r1": ["story:1"]}
+
+    def test_item_fields_survive_without_client(self):
+        """Test a restored item keeps its fields but has no IG client."""
+        restored = item_from_dict(item_to_dict(_item(7)))
+
+        assert restored.unique_id == "story:7"
+        assert restored._media_pk == 7
+        assert restored.story_is_close_friends is True
+        assert restored._client is None
+
+    def test_ignores_other_scope_and_stale_journal(self):
+        """Test a journal is only resumed for the same scope and while fresh."""
+        _listed(recipient_id="r1")
+
+        assert load_checkpoint(recipient_id=None, force_resend_current=False) is None
+        assert (
+            load_checkpoint(recipient_id="r1", force_resend_current=True, now=1000.0)
+            is None
+        )
+        assert (
+            load_checkpoint(
+                recipient_id="r1",
+                force_resend_current=False,
+                now=1001.0 + MAX_CHECKPOINT_AGE_S,
+            )
+            is None
+        )
+
+    def test_missing_or_inline_files_are_not_reused(self):
+        """Test only complete on-disk downloads are reused."""
+        f = Path("a.jpg")
+        f.write_bytes(b"x")
+        cp = _listed()
+        cp.record_download("story:1", [f, Path("gone.mp4")])
+        cp.record_download("story:2", [InlineMedia("b.jpg", "image/jpeg", b"y")])
+
+        assert cp.reusable_files("story:1") is None
+        assert cp.reusable_files("story:2") is None
+
+    def test_clear(self):
+        """Test clearing removes the journal and tolerates none."""
+        _listed()
+        clear_checkpoint()
+        clear_checkpoint()
+
+        assert not CHECKPOINT_PATH.exists()
@@ -0,0 +1,186 @@
+"""Tests for resumable media downloads."""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.downloader import download_resumable, fetch_media, part_path_for
+from src.exceptions import MediaDownloadError, TransientError
+from src.media import InlineMedia
+
+PAYLOAD = bytes(range(256)) * 64  # 16 KiB
+
+
+class _CdnStandIn(BaseHTTPRequestHandler):
+    """Minimal CDN stand-in that honours Range and can misbehave on demand."""
+
+    # Per-server knobs (set on the server object by the fixture/test).
+    def do_GET(self):  # noqa: N802 - http.server API
+        srv = self.server
+        srv.requests.append(dict(self.headers))
+        body = srv.payload
+        rng = self.headers.get("Range")
+
+        if rng and not srv.ignore_range:
+            start = int(rng.split("=", 1)[1].rstrip("-"))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.end_headers()
+                return
+            chunk = body[start:]
+            self.send_response(206)
+            self.send_header(
+                "Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}"
+            )
+        else:
+            start = 0
+            chunk = body
+            self.send_response(200)
+
+        self.send_header("Content-Length", str(len(chunk)))
+        self.end_headers()
+        if srv.truncate_next is not None:
+            # Announce the full length but drop the connection early.
+            self.wfile.write(chunk[: srv.truncate_next])
+            srv.truncate_next = None
+            self.close_connection = True
+            return
+        self.wfile.write(chunk)
+
+    def log_message(self, *args):  # keep pytest output quiet
+        pass
+
+
+@pytest.fixture
+def cdn():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _CdnStandIn)
+    srv.payload = PAYLOAD
+    srv.requests = []
+    srv.ignore_range = False
+    srv.truncate_next = None
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+def _url(srv) -> str:
+    host, port = srv.server_address[:2]
+    return f"http://{host}:{port}/video.mp4"
+
+
+class TestDownloadResumable:
+    """Test chunked, resumable downloads against a local HTTP server."""
+
+    def test_full_download(self, cdn, tmp_path):
+        """Test a clean download lands at dest with no .part left behind."""
+        dest = tmp_path / "video.mp4"
+
+        out = download_resumable(_url(cdn), dest, chunk_size=1000)
+
+        assert out == dest
+        assert dest.read_bytes() == PAYLOAD
+        assert not part_path_for(dest).exists()
+        assert "Range" not in cdn.requests[0]
+
+    def test_resumes_from_partial_file(self, cdn, tmp_path):
+        """Test an existing .part file is resumed with a Range request."""
+        dest = tmp_path / "video.mp4"
+        part_path_for(dest).write_bytes(PAYLOAD[:5000])
+
+        download_resumable(_url(cdn), dest, chunk_size=1000)
+
+        assert dest.read_bytes() == PAYLOAD
+        assert cdn.requests[0]["Range"] == "bytes=5000-"
+
+    def test_dropped_connection_is_resumed(self, cdn, tmp_path):
+        """Test a truncated response is picked up where it stopped."""
+        dest = tmp_path / "video.mp4"
+        cdn.truncate_next = 3000
+
+        download_resumable(_url(cdn), dest, chunk_size=512, retry_delay_s=0)
+
+        assert dest.read_bytes() == PAYLOAD
+        assert len(cdn.requests) == 2
+        assert cdn.requests[1]["Range"].startswith("bytes=")
+        assert cdn.requests[1]["Range"] != "bytes=0-"
+
+    def test_server_ignoring_range_restarts(self, cdn, tmp_path):
+        """Test a 200 reply to a Range request rewrites the file from zero."""
+        dest = tmp_path / "video.mp4"
+        part_path_for(dest).write_bytes(b"garbage" * 10)
+        cdn.ignore_range = True
+
+        download_resumable(_url(cdn), dest)
+
+        assert dest.read_bytes() == PAYLOAD
+
+    def test_already_complete_partial(self, cdn, tmp_path):
+        """Test a .part holding every byte is finalized via the 416 reply."""
+        dest = tmp_path / "video.mp4"
+        part_path_for(dest).write_bytes(PAYLOAD)
+
+        download_resumable(_url(cdn), dest)
+
+        assert dest.read_bytes() == PAYLOAD
+
+    def test_expected_size_mismatch_keeps_part(self, cdn, tmp_path):
+        """Test a length mismatch never produces dest and raises transient."""
+        dest = tmp_path / "video.mp4"
+
+        with pytest.raises(MediaDownloadError) as exc_info:
+            download_resumable(
+                _url(cdn),
+                dest,
+                expected_size=len(PAYLOAD) + 10,
+                max_attempts=2,
+                retry_delay_s=0,
+            )
+
+        assert isinstance(exc_info.value, TransientError)
+        assert not dest.exists()
+
+    def test_http_404_is_not_retried(self, cdn, tmp_path):
+        """Test an expired CDN URL fails fast."""
+        dest = tmp_path / "video.mp4"
+        host, port = cdn.server_address[:2]
+
+        class _NotFound(_CdnStandIn):
+            def do_GET(self):  # noqa: N802
+                self.server.requests.append(dict(self.headers))
+                self.send_response(404)
+                self.end_headers()
+
+        cdn.RequestHandlerClass = _NotFound
+
+        with pytest.raises(MediaDownloadError):
+            download_resumable(f"http://{host}:{port}/gone.mp4", dest)
+
+        assert len(cdn.requests) == 1
+
+
+class TestFetchMedia:
+    """Test the zero-disk fetch used for inline media."""
+
+    def test_small_file_stays_in_memory(self, cdn, tmp_path, monkeypatch):
+        """Test a response under the threshold is returned as bytes."""
+        monkeypatch.setattr("src.downloader.spill_dir", lambda: tmp_path)
+
+        out = fetch_media(_url(cdn), "story.mp4", inline_max_bytes=len(PAYLOAD))
+
+        assert isinstance(out, InlineMedia)
+        assert out.data == PAYLOAD
+        assert out.mime_type == "video/mp4"
+        assert list(tmp_path.iterdir()) == []
+
+    def test_large_file_spills_to_disk(self, cdn, tmp_path, monkeypatch):
+        """Test a response over the threshold spills to the spill dir."""
+        monkeypatch.setattr("src.downloader.spill_dir", lambda: tmp_path)
+
+        out = fetch_media(_url(cdn), "reel.mp4", inline_max_bytes=1024)
+
+        assert out == tmp_path / "reel.mp4"
+        assert out.read_bytes() == PAYLOAD
@@ -4,7 +4,7 @@ from pathlib import Path
 from unittest.mock import Mock, patch
 import pytest
 
-from src.ig import IgClient, IgItem
+from src.ig import IgClient, IgItem, PostCursor
 
 
 class TestIgClient:
@@ -146,6 +146,76 @@ class TestIgClient:
         assert items[0].unique_id == "post:2"
         assert items[1].unique_id == "post:1"
 
+    @staticmethod
+    def _media(pk, ts):
+        m = Mock()
+        m.pk = pk
+        m.caption_text = f"Post {pk}"
+        m.taken_at = Mock()
+        m.taken_at.timestamp.return_value = float(ts)
+        return m
+
+    @patch("src.ig.Client")
+    def test_get_new_post_items_after_stops_at_cursor(self, mock_client_class):
+        """Test the incremental lister stops on the last seen post."""
+        mock_client = Mock()
+        mock_client.user_id = 123456
+        mock_client_class.return_value = mock_client
+        mock_client.user_medias_paginated_v1.return_value = (
+            [self._media(3, 3000), self._media(2, 2000), self._media(1, 1000)],
+            "next",
+        )
+
+        client = IgClient(session_path=Path("test.json"), enable_rate_limiting=False)
+        items, cursor = client.get_new_post_items_after(PostCursor(pk="2", ts=2000.0))
+
+        assert [it.unique_id for it in items] == ["post:3"]
+        assert cursor == PostCursor(pk="3", ts=3000.0)
+        mock_client.user_medias_paginated_v1.assert_called_once()
+
+    @patch("src.ig.Client")
+    def test_get_new_post_items_after_pages_through_bursts(self, mock_client_class):
+        """Test more new posts than one page are all returned."""
+        mock_client = Mock()
+        mock_client.user_id = 123456
+        mock_client_class.return_value = mock_client
+        mock_client.user_medias_paginated_v1.side_effect = [
+            ([self._media(6, 6000), self._media(5, 5000)], "c1"),
+            ([self._media(4, 4000), self._media(3, 3000)], "c2"),
+            ([self._media(2, 2000), self._media(1, 1000)], "c3"),
+        ]
+
+        client = IgClient(session_path=Path("test.json"), enable_rate_limiting=False)
+        items, cursor = client.get_new_post_items_after(
+            PostCursor(pk="2", ts=2000.0), page_size=2
+        )
+
+        assert [it.unique_id for it in items] == [
+            "post:6",
+            "post:5",
+            "post:4",
+            "post:3",
+        ]
+        assert cursor.pk == "6"
+        assert mock_client.user_medias_paginated_v1.call_count == 3
+
+    @patch("src.ig.Client")
+    def test_get_new_post_items_after_skips_pinned(self, mock_client_class):
+        """Test an old pinned post at the top does not end the listing."""
+        mock_client = Mock()
+        mock_client.user_id = 123456
+        mock_client_class.return_value = mock_client
+        # Post 2 was the newest last time and has since been pinned.
+        mock_client.user_medias_paginated_v1.return_value = (
+            [self._media(2, 2000), self._media(3, 3000), self._media(1, 1000)],
+            "",
+        )
+
+        client = IgClient(session_path=Path("test.json"), enable_rate_limiting=False)
+        items, _ = client.get_new_post_items_after(PostCursor(pk="2", ts=2000.0))
+
+        assert [it.unique_id for it in items] == ["post:3"]
+
     @patch("src.ig.Client")
     def test_get_active_story_items(self, mock_client_class):
         """Test fetching active stories."""
@@ -179,6 +249,21 @@ class TestIgClient:
         assert items[1].unique_id == "story:222"
         assert items[1].story_is_close_friends is True
 
+    @patch("src.ig.Client")
+    def test_get_latest_story_ts(self, mock_client_class):
+        """Test the story probe reads latest_reel_media from user info."""
+        mock_client = Mock()
+        mock_client.user_id = 123456
+        mock_client.private_request.return_value = {"user": {"latest_reel_media": 1700}}
+        mock_client_class.return_value = mock_client
+
+        client = IgClient(session_path=Path("test.json"))
+
+        assert client.get_latest_story_ts() == 1700.0
+        mock_client.private_request.assert_called_once_with("users/123456/info/")
+        mock_client.private_request.side_effect = Exception("boom")
+        assert client.get_latest_story_ts() is None
+
     @patch("src.ig.Client")
     def test_get_followers_map(self, mock_client_class):
         """Test fetching followers map."""
@@ -322,6 +407,40 @@ class TestIgItem:
         assert paths[0].name == "video.mp4"
         mock_client.video_download.assert_called_once()
 
+    @patch("src.ig.download_resumable")
+    @patch("src.ig.Client")
+    def test_download_video_streams_cdn_url(
+        self, mock_client_class, mock_download, tmp_path
+    ):
+        """Test videos with a CDN URL use the resumable downloader."""
+        mock_client = Mock()
+        mock_client_class.return_value = mock_client
+
+        mock_info = Mock()
+        mock_info.media_type = 2
+        mock_info.video_url = "https://cdn.example/v.mp4"
+        mock_info.user.username = "me"
+        mock_client.media_info.return_value = mock_info
+        mock_download.side_effect = lambda url, dest: dest
+
+        item = IgItem(
+            kind="post",
+            unique_id="post:456",
+            title="Video",
+            caption="",
+            created_ts=2000.0,
+            _client=mock_client,
+            _media_pk=456,
+        )
+
+        paths = item.download(tmp_path)
+
+        assert paths == [tmp_path / "me_456.mp4"]
+        mock_download.assert_called_once_with(
+            "https://cdn.example/v.mp4", tmp_path / "me_456.mp4"
+        )
+        mock_client.video_download.assert_not_called()
+
     @patch("src.ig.Client")
     def test_download_album(self, mock_client_class, tmp_path):
         """Test downloading an album/carousel."""
@@ -0,0 +1,85 @@
+"""Tests for the pre-upload image optimization stage."""
+
+import io
+
+from PIL import Image
+
+from src.image_opt import ImageOptions, optimize_media
+from src.media import InlineMedia
+
+
+def _jpeg_bytes(size=(3000, 2000)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buf, "JPEG", quality=100)
+    return buf.getvalue()
+
+
+class TestOptimizeMedia:
+    """Test resize/re-encode and the content-hash cache."""
+
+    def test_resizes_large_jpeg(self, tmp_path):
+        """Test a large photo is resized to max_dim on the long edge."""
+        src = tmp_path / "photo.jpg"
+        src.write_bytes(_jpeg_bytes())
+        cache = tmp_path / "cache"
+
+        out = optimize_media(
+            [src], opts=ImageOptions(max_dim=800, workers=1), cache_dir=cache
+        )
+
+        assert out[0] != src
+        assert out[0].parent == cache
+        with Image.open(out[0]) as im:
+            assert max(im.size) == 800
+
+    def test_cache_hit_skips_processing(self, tmp_path, monkeypatch):
+        """Test the same image content is only processed once."""
+        src = tmp_path / "photo.jpg"
+        src.write_bytes(_jpeg_bytes())
+        cache = tmp_path / "cache"
+        opts = ImageOptions(max_dim=800, workers=1)
+        first = optimize_media([src], opts=opts, cache_dir=cache)
+
+        def _boom(*args, **kwargs):
+            raise AssertionError("should have hit the cache")
+
+        monkeypatch.setattr("src.image_opt.optimize_image_bytes", _boom)
+        copy = tmp_path / "copy.jpg"
+        copy.write_bytes(src.read_bytes())
+
+        assert optimize_media([copy], opts=opts, cache_dir=cache) == first
+
+    def test_non_images_pass_through(self, tmp_path):
+        """Test videos and unknown formats are returned unchanged."""
+        video = tmp_path / "clip.mp4"
+        video.write_bytes(b"\x00" * 10)
+
+        assert optimize_media([video], cache_dir=tmp_path / "c") == [video]
+
+    def test_inline_media_stays_inline(self, tmp_path):
+        """Test zero-disk media are optimized in memory, not via the disk cache."""
+        media = InlineMedia(name="s.jpg", mime_type="image/jpeg", data=_jpeg_bytes())
+        cache = tmp_path / "cache"
+
+        out = optimize_media(
+            [media], opts=ImageOptions(max_dim=640, workers=1), cache_dir=cache
+        )
+
+        assert isinstance(out[0], InlineMedia)
+        assert len(out[0].data) < len(media.data)
+        assert not cache.exists()
+
+    def test_process_pool_batch(self, tmp_path):
+        """Test several images are optimized across worker processes."""
+        files = []
+        for i in range(3):
+            p = tmp_path / f"p{i}.jpg"
+            p.write_bytes(_jpeg_bytes(size=(2000 + i, 1500)))
+            files.append(p)
+
+        out = optimize_media(
+            files, opts=ImageOptions(max_dim=500, workers=2), cache_dir=tmp_path / "c"
+        )
+
+        assert len(out) == 3
+        assert all(o.parent == tmp_path / "c" for o in out)
@@ -419,10 +419,9 @@ class TestRunOnce:
         config = load_config()
         run_once(cfg=config, force_resend_current=False)
 
-        # Should login and start WA, but not send anything
+        # Should login, but not even launch WA when there is nothing to send
         mock_ig.login.assert_called_once()
-        mock_wa.start.assert_called_once()
-        mock_wa.stop.assert_called_once()
+        mock_wa_class.assert_not_called()
         mock_wa.send_media_batch.assert_not_called()
 
     @patch("src.main.load_state")
@@ -449,6 +448,7 @@ class TestRunOnce:
         mock_state.last_run_ts = time.time()
         mock_state.sent_ids = set()
         mock_state.sent_ids_by_recipient = {}
+        mock_state.story_watermark_by_recipient = {}
         mock_load_state.return_value = mock_state
 
         # Mock settings with enabled recipient
@@ -466,7 +466,8 @@ class TestRunOnce:
 
         # Mock IG client - no new content
         mock_ig = Mock()
-        mock_ig.get_new_post_items_since.return_value = []
+        mock_ig.get_new_post_items_after.return_value = ([], None)
+        mock_ig.get_latest_story_ts.return_value = None
         mock_ig.get_active_story_items.return_value = []
         mock_ig_class.return_value = mock_ig
 
@@ -478,6 +479,411 @@ class TestRunOnce:
         run_once(cfg=config, force_resend_current=False)
 
         # Should check for content but not send
-        mock_ig.get_new_post_items_since.assert_called_once()
+        mock_ig.get_new_post_items_after.assert_called_once()
         mock_ig.get_active_story_items.assert_called_once()
+        mock_wa_class.assert_not_called()
+        mock_wa.send_media_batch.assert_not_called()
+
+
+class TestStoryProbe:
+    """Test the cheap story change probe in front of the full story listing."""
+
+    def _stage(self, state, probe_ts, monkeypatch):
+        monkeypatch.setenv("IG_USERNAME", "test")
+        monkeypatch.setenv("IG_PASSWORD", "test")
+        monkeypatch.setenv("WA_CONTENT_CONTACT_NAME", "Friend")
+        from src.main import stage_run
+
+        settings = Mock()
+        settings.recipients = [
+            RecipientSettings(id="r1", display_name="Friend", wa_contact_name="F")
+        ]
+        ig = Mock()
+        ig.get_new_post_items_after.return_value = ([], None)
+        ig.get_active_story_items.return_value = []
+        ig.get_latest_story_ts.return_value = probe_ts
+        with patch("src.main.load_state", return_value=state), patch(
+            "src.main.load_settings", return_value=settings
+        ):
+            staged = stage_run(load_config(), ig=ig)
+        return ig, staged
+
+    def test_skips_story_fetch_when_nothing_new(self, monkeypatch):
+        """Test the reel is not listed when the probe is at the watermark."""
+        from src.state import State
+
+        state = State(
+            last_run_ts=time.time(), story_watermark_by_recipient={"r1": 500.0}
+        )
+        ig, _ = self._stage(state, 500.0, monkeypatch)
+
+        ig.get_active_story_items.assert_not_called()
+
+    def test_lists_only_newer_stories(self, monkeypatch):
+        """Test a newer probe lists stories past the watermark and records it."""
+        from src.main import _record_listing
+        from src.state import State
+
+        state = State(
+            last_run_ts=time.time(), story_watermark_by_recipient={"r1": 500.0}
+        )
+        ig, staged = self._stage(state, 900.0, monkeypatch)
+
+        ig.get_active_story_items.assert_called_once_with(newer_than=500.0)
+        _record_listing(state, staged)
+        assert state.story_watermark_by_recipient["r1"] == 900.0
+
+
+class TestStagedRun:
+    """Test delivery of runs staged ahead of the scheduled slot."""
+
+    def _item(self, kind, pk, created_ts):
+        return IgItem(
+            kind=kind,
+            unique_id=f"{kind}:{pk}",
+            title=kind,
+            caption="",
+            created_ts=created_ts,
+            _client=Mock(),
+            _media_pk=pk,
+        )
+
+    @patch("src.main.load_state")
+    @patch("src.main.save_state")
+    @patch("src.main.WhatsAppSender")
+    def test_staged_run_skips_expired_and_deleted_stories(
+        self, mock_wa_class, mock_save_state, mock_load_state, monkeypatch, tmp_path
+    ):
+        """Test only still-valid staged items are sent at the slot."""
+        monkeypatch.setenv("IG_USERNAME", "test")
+        monkeypatch.setenv("IG_PASSWORD", "test")
+        monkeypatch.setenv("WA_CONTENT_CONTACT_NAME", "Friend")
+        from src.main import StagedRun
+        from src.state import State
+
+        mock_load_state.return_value = State()
+        mock_wa = Mock()
+        mock_wa_class.return_value = mock_wa
+
+        now = time.time()
+        live = self._item("story", 1, now - 60)
+        deleted = self._item("story", 2, now - 60)
+        expired = self._item("story", 3, now - 25 * 3600)
+        f = tmp_path / "a.jpg"
+        f.write_bytes(b"x")
+
+        ig = Mock()
+        ig.get_active_story_ids.return_value = {"story:1", "story:3"}
+        recipient = RecipientSettings(id="r1", display_name="Friend")
+        staged = StagedRun(
+            ig=ig,
+            recipients=[recipient],
+            items_by_recipient={"r1": [live, deleted, expired]},
+            downloaded={"story:1": [f], "story:2": [f], "story:3": [f]},
+            listed_ts=now - 300,
+        )
+
+        run_once(cfg=load_config(), recipient_id="r1", staged=staged)
+
+        ig.login.assert_not_called()
+        assert mock_wa.send_media_batch.call_count == 1
+        saved = mock_save_state.call_args[0][0]
+        assert saved.sent_ids_by_recipient["r1"] == {"story:1"}
+        # Posts made between staging and delivery must still count as new.
+        assert saved.last_run_ts == now - 300
+
+    @patch("src.main.load_state")
+    @patch("src.main.save_state")
+    @patch("src.main.WhatsAppSender")
+    def test_staged_run_rechecks_dedupe(
+        self, mock_wa_class, mock_save_state, mock_load_state, monkeypatch, tmp_path
+    ):
+        """Test items sent by another run after staging are not sent twice."""
+        monkeypatch.setenv("IG_USERNAME", "test")
+        monkeypatch.setenv("IG_PASSWORD", "test")
+        monkeypatch.setenv("WA_CONTENT_CONTACT_NAME", "Friend")
+        from src.main import StagedRun
+        from src.state import State
+
+        mock_load_state.return_value = State(sent_ids_by_recipient={"r1": {"post:1"}})
+        mock_wa = Mock()
+        mock_wa_class.return_value = mock_wa
+        f = tmp_path / "a.jpg"
+        f.write_bytes(b"x")
+
+        staged = StagedRun(
+            ig=Mock(),
+            recipients=[RecipientSettings(id="r1", display_name="Friend")],
+            items_by_recipient={"r1": [self._item("post", 1, time.time())]},
+            downloaded={"post:1": [f]},
+            listed_ts=time.time(),
+        )
+
+        run_once(cfg=load_config(), recipient_id="r1", staged=staged)
+
         mock_wa.send_media_batch.assert_not_called()
+
+
+class TestDeliverFanout:
+    """Test multi-recipient delivery through the pipelined fan-out."""
+
+    @patch("src.main.load_state")
+    @patch("src.main.save_state")
+    def test_fanout_marks_items_as_confirmed(
+        self, mock_save_state, mock_load_state, monkeypatch, tmp_path
+    ):
+        """Test each recipient's items are marked sent as their uploads confirm."""
+        monkeypatch.setenv("IG_USERNAME", "test")
+        monkeypatch.setenv("IG_PASSWORD", "test")
+        monkeypatch.setenv("WA_CONTENT_CONTACT_NAME", "Friend")
+        monkeypatch.setenv("WA_MAX_IN_FLIGHT", "2")
+        from src.main import StagedRun, _deliver
+        from src.state import State
+
+        state = State()
+        mock_load_state.return_value = state
+        f = tmp_path / "a.jpg"
+        f.write_bytes(b"x")
+        item = IgItem(
+            kind="story",
+            unique_id="story:1",
+            title="story",
+            caption="",
+            created_ts=time.time(),
+            _client=Mock(),
+            _media_pk=1,
+        )
+        staged = StagedRun(
+            ig=Mock(),
+            recipients=[
+                RecipientSettings(id="r1", display_name="A", wa_contact_name="A"),
+                RecipientSettings(id="r2", display_name="B", wa_contact_name="B"),
+            ],
+            items_by_recipient={"r1": [item], "r2": [item]},
+            downloaded={"story:1": [f]},
+            listed_ts=time.time(),
+        )
+        wa = Mock()
+
+        def fanout(jobs, *, max_in_flight, on_sent):
+            assert max_in_flight == 2
+            assert [j.contact_name for j in jobs] == ["A", "B"]
+            on_sent(jobs[0], 0)  # only A confirmed before a crash would happen
+            assert state.sent_ids_by_recipient == {"r1": {"story:1"}}
+            on_sent(jobs[1], 0)
+            return []
+
+        wa.send_fanout.side_effect = fanout
+
+        _deliver(load_config(), staged, wa=wa, dry_run=False)
+
+        wa.send_media_batch.assert_not_called()
+        assert state.sent_ids_by_recipient == {"r1": {"story:1"}, "r2": {"story:1"}}
+
+
+class TestDeliverOutbox:
+    """Test a failed send is queued instead of failing the whole run."""
+
+    @patch("src.main.load_state")
+    @patch("src.main.save_state")
+    def test_failed_message_is_queued(
+        self, mock_save_state, mock_load_state, monkeypatch, tmp_path
+    ):
+        """Test the other messages still go out and the failed one is queued."""
+        monkeypatch.setenv("IG_USERNAME", "test")
+        monkeypatch.setenv("IG_PASSWORD", "test")
+        monkeypatch.setenv("WA_CONTENT_CONTACT_NAME", "Friend")
+        monkeypatch.chdir(tmp_path)
+        from src.exceptions import WhatsAppSendError
+        from src.main import StagedRun, _deliver
+        from src.outbox import Outbox
+        from src.state import State
+
+        state = State()
+        mock_load_state.return_value = state
+        f = tmp_path / "a.jpg"
+        f.write_bytes(b"x")
+        items = [
+            IgItem(
+                kind="post",
+                unique_id=f"post:{i}",
+                title="post",
+                caption="",
+                created_ts=time.time(),
+                _client=Mock(),
+                _media_pk=i,
+            )
+            for i in (1, 2)
+        ]
+        staged = StagedRun(
+            ig=Mock(),
+            recipients=[RecipientSettings(id="r1", display_name="A")],
+            items_by_recipient={"r1": items},
+            downloaded={"post:1": [f], "post:2": [f]},
+            listed_ts=time.time(),
+        )
+        wa = Mock(spec=["open_chat", "send_media_batch"])
+        wa.send_media_batch.side_effect = [
+            WhatsAppSendError("upload stalled", retry_after_seconds=120),
+            None,
+        ]
+
+        _deliver(load_config(), staged, wa=wa, dry_run=False)
+
+        assert state.sent_ids_by_recipient == {"r1": {"post:2"}}
+        outbox = Outbox()
+        assert [j.item_ids for j in outbox.jobs] == [["post:1"]]
+        assert outbox.jobs[0].next_attempt_ts > time.time() + 100
+
+
+class TestCheckpointResume:
+    """Test a run resumes from the checkpoint of an interrupted one."""
+
+    def _journal(self, monkeypatch, tmp_path, *, force=False):
+        from src.checkpoint import start_checkpoint
+
+        monkeypatch.chdir(tmp_path)
+        items = [
+            IgItem(
+                kind="story",
+                unique_id=f"story:{i}",
+                title="story",
+                caption="",
+                created_ts=time.time() - 60,
+                _client=Mock(),
+                _media_pk=i,
+            )
+            for i in (1, 2)
+        ]
+        cp = start_checkpoint(
+            recipient_id=None, force_resend_current=force, listed_ts=time.time()
+        )
+        cp.record_listing({"r1": items}, None, None)
+        f = tmp_path / "a.jpg"
+        f.write_bytes(b"x")
+        cp.record_download("story:1", [f])
+        return cp, f
+
+    def _patched_run(self, monkeypatch, *, force=False):
+        monkeypatch.setenv("IG_USERNAME", "test")
+        monkeypatch.setenv("IG_PASSWORD", "test")
+        monkeypatch.setenv("WA_CONTENT_CONTACT_NAME", "Friend")
+        from src.state import State
+
+        settings = Mock()
+        settings.recipients = [
+            RecipientSettings(id="r1", display_name="Friend", wa_contact_name="F")
+        ]
+        with patch("src.main.load_state", return_value=State()), patch(
+            "src.main.save_state"
+        ), patch("src.main.load_settings", return_value=settings), patch(
+            "src.main.IgClient"
+        ) as mock_ig_class, patch(
+            "src.main.WhatsAppSender"
+        ) as mock_wa_class:
+            run_once(cfg=load_config(), force_resend_current=force)
+        return mock_ig_class, mock_wa_class.return_value
+
+    def test_resume_skips_instagram_and_sent_items(self, monkeypatch, tmp_path):
+        """Test journaled files are reused and sends before the crash not repeated."""
+        from src.checkpoint import CHECKPOINT_PATH
+
+        cp, f = self._journal(monkeypatch, tmp_path, force=True)
+        cp.mark_sent("r1", ["story:2"])
+
+        mock_ig_class, wa = self._patched_run(monkeypatch, force=True)
+
+        mock_ig_class.assert_not_called()
+        wa.send_media_batch.assert_called_once()
+        assert wa.send_media_batch.call_args[0][1] == [f]
+        assert not CHECKPOINT_PATH.exists()
+
+    def test_resume_downloads_only_missing_files(self, monkeypatch, tmp_path):
+        """Test IG is logged into just to fetch what the crash left undownloaded."""
+        _, f = self._journal(monkeypatch, tmp_path)
+
+        mock_ig_class, wa = self._patched_run(monkeypatch)
+
+        mock_ig = mock_ig_class.return_value
+        mock_ig.login.assert_called_once()
+        mock_ig.get_new_post_items_after.assert_not_called()
+        mock_ig.rebind.assert_called_once()
+        assert mock_ig.rebind.call_args[0][0].unique_id == "story:2"
+        assert wa.send_media_batch.call_count == 2
+
+
+class TestMessageGroups:
+    """Test per-recipient album coalescing."""
+
+    def _items(self, n):
+        return [
+            IgItem(
+                kind="story",
+                unique_id=f"story:{i}",
+                title="story",
+                caption="",
+                created_ts=0.0,
+                _client=Mock(),
+                _media_pk=i,
+            )
+            for i in range(n)
+        ]
+
+    def test_one_message_per_item_by_default(self):
+        """Test items are sent separately unless the recipient wants albums."""
+        from src.main import _message_groups
+
+        items = self._items(3)
+        downloaded = {it.unique_id: ["f"] for it in items}
+        r = RecipientSettings(id="r1", display_name="A")
+
+        assert _message_groups(r, items, downloaded) == [[it] for it in items]
+
+    def test_album_respects_per_send_limit(self):
+        """Test albums are split at WhatsApp's per-send file limit."""
+        from src.main import WA_MAX_FILES_PER_SEND, _message_groups
+
+        items = self._items(4)
+        downloaded = {it.unique_id: ["f"] * 10 for it in items}
+        downloaded["story:3"] = []  # failed download: skipped
+        r = RecipientSettings(id="r1", display_name="A", send_as_album=True)
+
+        groups = _message_groups(r, items, downloaded)
+
+        assert groups == [items[:3]]
+        assert sum(len(downloaded[it.unique_id]) for it in groups[0]) == (
+            WA_MAX_FILES_PER_SEND
+        )
+
+    @patch("src.main.load_state")
+    @patch("src.main.save_state")
+    def test_album_send_marks_all_items(
+        self, mock_save_state, mock_load_state, tmp_path
+    ):
+        """Test one album send carries a combined caption and marks every item."""
+        from src.main import StagedRun, _deliver
+        from src.state import State
+
+        state = State()
+        mock_load_state.return_value = state
+        items = self._items(2)
+        f = tmp_path / "a.jpg"
+        f.write_bytes(b"x")
+        staged = StagedRun(
+            ig=Mock(),
+            recipients=[
+                RecipientSettings(id="r1", display_name="A", send_as_album=True)
+            ],
+            items_by_recipient={"r1": items},
+            downloaded={it.unique_id: [f] for it in items},
+        )
+        wa = Mock()
+        cfg = Mock(message_prefix="New:", wa_max_in_flight=1)
+
+        _deliver(cfg, staged, wa=wa, dry_run=False)
+
+        wa.send_media_batch.assert_called_once()
+        args, kwargs = wa.send_media_batch.call_args
+        assert args[1] == [f, f]
+        assert kwargs["caption"].count("story") == 2
+        assert state.sent_ids_by_recipient["r1"] == {"story:0", "story:1"}
@@ -0,0 +1,36 @@
+"""Tests for media handles passed between download and upload."""
+
+from pathlib import Path
+
+from src.media import InlineMedia, upload_files_arg
+
+
+class TestUploadFilesArg:
+    """Test conversion to Playwright's set_input_files argument."""
+
+    def test_all_inline_uses_buffers(self):
+        """Test in-memory media are passed as file payloads."""
+        media = [InlineMedia(name="a.jpg", mime_type="image/jpeg", data=b"abc")]
+
+        arg = upload_files_arg(media)
+
+        assert arg == [{"name": "a.jpg", "mimeType": "image/jpeg", "buffer": b"abc"}]
+
+    def test_paths_stay_paths(self, tmp_path):
+        """Test on-disk media are passed as path strings."""
+        p = tmp_path / "b.jpg"
+        p.write_bytes(b"x")
+
+        assert upload_files_arg([p]) == [str(p)]
+
+    def test_mixed_batch_spills_inline(self, tmp_path, monkeypatch):
+        """Test a mixed batch becomes all paths, since Playwright can't mix."""
+        monkeypatch.setattr("src.media.spill_dir", lambda: tmp_path)
+        p = tmp_path / "b.jpg"
+        p.write_bytes(b"x")
+        inline = InlineMedia(name="a.jpg", mime_type="image/jpeg", data=b"abc")
+
+        arg = upload_files_arg([inline, p])
+
+        assert arg == [str(tmp_path / "a.jpg"), str(p)]
+        assert Path(arg[0]).read_bytes() == b"abc"
@@ -0,0 +1,91 @@
+"""Tests for the durable outbox of failed WhatsApp sends."""
+
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from src.exceptions import PermanentError, WhatsAppSendError
+from src.media import InlineMedia
+from src.outbox import FAILED, PENDING, Outbox, drain, retry_after
+
+
+@pytest.fixture(autouse=True)
+def _isolated_cwd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+
+def _defer(outbox, error, files=None, now=1000.0):
+    return outbox.defer(
+        recipient_id="r1",
+        contact_name="Friend",
+        phone="",
+        item_ids=["post:1"],
+        files=files or [],
+        caption="New post",
+        error=error,
+        now=now,
+    )
+
+
+class TestRetryPolicy:
+    """Test retry timing follows the exception contract."""
+
+    def test_transient_hint_is_used(self):
+        """Test TransientError.retry_after_seconds sets the delay."""
+        assert retry_after(WhatsAppSendError("x", retry_after_seconds=42), 1) == 42
+
+    def test_other_errors_back_off(self):
+        """Test untyped errors back off exponentially, capped."""
+        assert retry_after(RuntimeError("x"), 1) < retry_after(RuntimeError("x"), 3)
+        assert retry_after(RuntimeError("x"), 50) == 3600
+
+    def test_permanent_error_parks_job(self):
+        """Test a permanent failure is kept but not retried."""
+        outbox = Outbox()
+        job = _defer(outbox, PermanentError("blocked"))
+
+        assert job.status == FAILED
+        assert outbox.due(now=10**12) == []
+        assert outbox.queued_item_ids("r1") == set()
+
+
+class TestOutbox:
+    """Test jobs persist and only failed ones are retried."""
+
+    def test_defer_persists_inline_media(self):
+        """Test in-memory files are written to disk and the job survives a reload."""
+        outbox = Outbox()
+        job = _defer(
+            outbox,
+            WhatsAppSendError("offline", retry_after_seconds=30),
+            files=[InlineMedia(name="a.jpg", mime_type="image/jpeg", data=b"jpg")],
+        )
+
+        again = Outbox()
+        assert [j.id for j in again.jobs] == [job.id]
+        assert again.jobs[0].status == PENDING
+        assert again.jobs[0].next_attempt_ts == 1030.0
+        assert Path(again.jobs[0].files[0]).read_bytes() == b"jpg"
+        assert again.queued_item_ids("r1") == {"post:1"}
+
+    def test_drain_sends_due_and_reschedules_failures(self, tmp_path):
+        """Test a delivered job is removed and a failing one gets a new retry time."""
+        f = tmp_path / "a.jpg"
+        f.write_bytes(b"x")
+        outbox = Outbox()
+        _defer(outbox, RuntimeError("first"), files=[f], now=0.0)
+
+        wa = Mock()
+        wa.send_media_batch.side_effect = WhatsAppSendError(
+            "again", retry_after_seconds=90
+        )
+        assert drain(outbox, wa, on_sent=Mock(), now=10**9) == 0
+        assert outbox.jobs[0].attempts == 2
+        assert outbox.next_due_ts() > 10**9 - 1
+
+        wa.send_media_batch.side_effect = None
+        on_sent = Mock()
+        assert drain(outbox, wa, on_sent=on_sent, now=10**12) == 1
+        on_sent.assert_called_once()
+        assert Outbox().jobs == []
@@ -129,3 +129,30 @@ class TestSettingsFromDict:
         assert len(settings.recipients) == 1
         assert settings.recipients[0].id == "valid"
         assert settings.recipients[0].display_name == "Valid User"
+
+    def test_parse_prefetch_lead(self):
+        """Test the staging lead time is parsed, defaulted and clamped."""
+        assert settings_from_public_dict({}).schedule.prefetch_lead_min == 5
+
+        data = {"schedule": {"prefetch_lead_min": 15}}
+        assert settings_from_public_dict(data).schedule.prefetch_lead_min == 15
+
+        data = {"schedule": {"prefetch_lead_min": "nope"}}
+        assert settings_from_public_dict(data).schedule.prefetch_lead_min == 5
+
+        data = {"schedule": {"prefetch_lead_min": -3}}
+        assert settings_from_public_dict(data).schedule.prefetch_lead_min == 0
+
+    def test_parse_send_as_album(self):
+        """Test the per-recipient album option defaults to off."""
+        data = {
+            "recipients": [
+                {"id": "a", "display_name": "A"},
+                {"id": "b", "display_name": "B", "send_as_album": True},
+            ]
+        }
+
+        settings = settings_from_public_dict(data)
+
+        assert settings.recipients[0].send_as_album is False
+        assert settings.recipients[1].send_as_album is True
@@ -27,6 +27,9 @@ class TestState:
             last_run_ts=1234567890.0,
             last_run_files=["file1.jpg", "file2.jpg"],
             last_run_caption="Test caption",
+            last_seen_post_pk="987",
+            last_seen_post_ts=1234567000.0,
+            story_watermark_by_recipient={"friend1": 1234567500.0},
         )
 
         # Save to temp file
@@ -52,6 +55,9 @@ class TestState:
         assert loaded_state.last_run_ts == state.last_run_ts
         assert loaded_state.last_run_files == state.last_run_files
         assert loaded_state.last_run_caption == state.last_run_caption
+        assert loaded_state.last_seen_post_pk == "987"
+        assert loaded_state.last_seen_post_ts == 1234567000.0
+        assert loaded_state.story_watermark_by_recipient == {"friend1": 1234567500.0}
 
     def test_load_state_nonexistent_file(self, tmp_path):
         """Test loading state when file doesn't exist."""
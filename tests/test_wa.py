@@ -0,0 +1,267 @@
+"""Tests for WhatsApp send confirmation."""
+
+import itertools
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+import pytest
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from src.exceptions import WhatsAppLoggedOutError
+from src.wa import MAX_CONFIRM_S, WhatsAppSender, send_timeout_s
+from src.wa_chats import ChatDirectory
+
+
+class TestSendConfirmation:
+    """Test sends are confirmed from the chat DOM instead of fixed sleeps."""
+
+    def test_timeout_scales_with_size(self):
+        """Test the confirmation bound grows with upload size, up to a cap."""
+        small = send_timeout_s(100_000)
+        big = send_timeout_s(50_000_000)
+
+        assert small < big
+        assert send_timeout_s(10**12) == MAX_CONFIRM_S
+
+    def test_wait_for_sent_passes_snapshot_and_bound(self):
+        """Test the wait uses the pre-send bubble ids and the size-based timeout."""
+        wa = WhatsAppSender(profile_dir=Path("wa_profile"))
+        wa._page = Mock()
+
+        assert wa._wait_for_sent(["true_1"], total_bytes=2_000_000) is True
+
+        _, kwargs = wa._page.wait_for_function.call_args
+        assert kwargs["arg"] == ["true_1"]
+        assert kwargs["timeout"] == send_timeout_s(2_000_000) * 1000
+
+    def test_wait_for_sent_timeout_is_not_fatal(self):
+        """Test an unconfirmed send is reported rather than raised."""
+        wa = WhatsAppSender(profile_dir=Path("wa_profile"))
+        wa._page = Mock()
+        wa._page.wait_for_function.side_effect = PlaywrightTimeoutError("slow")
+
+        assert wa._wait_for_sent([], total_bytes=0) is False
+
+
+class TestEnterText:
+    """Test captions/messages are pasted, with typing only as a fallback."""
+
+    def _wa(self):
+        wa = WhatsAppSender(profile_dir=Path("wa_profile"))
+        wa._page = Mock()
+        return wa
+
+    def test_paste_accepted(self):
+        """Test a pasted multi-line text with emoji is verified and not typed."""
+        wa = self._wa()
+        text = "New post 🎉\n\nLine two"
+        box = Mock()
+        box.inner_text.return_value = "New post 🎉\n\n\nLine two"
+
+        wa._enter_text(box, text)
+
+        box.evaluate.assert_called_once()
+        box.type.assert_not_called()
+
+    def test_insert_text_for_single_line(self):
+        """Test insert_text is tried when the paste event is ignored."""
+        wa = self._wa()
+        box = Mock()
+        box.inner_text.side_effect = ["", "hello"]
+
+        wa._enter_text(box, "hello")
+
+        wa._page.keyboard.insert_text.assert_called_once_with("hello")
+        box.type.assert_not_called()
+
+    def test_typing_fallback_keeps_line_breaks(self):
+        """Test the typing fallback uses Shift+Enter so lines don't send early."""
+        wa = self._wa()
+        box = Mock()
+        box.inner_text.return_value = ""
+
+        wa._enter_text(box, "a\nb", delay=0)
+
+        wa._page.keyboard.insert_text.assert_not_called()
+        assert [c.args[0] for c in box.type.call_args_list] == ["a", "b"]
+        box.press.assert_any_call("Shift+Enter")
+
+
+class TestSendFanout:
+    """Test pipelined delivery to several chats on one page."""
+
+    @pytest.fixture(autouse=True)
+    def _isolated_cwd(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+
+    def _wa(self, events):
+        wa = WhatsAppSender(profile_dir=Path("wa_profile"))
+        wa._page = Mock()
+        wa._open_chat = lambda name: events.append(("open", name))
+        wa._submit_media = lambda files, caption: events.append(("submit", caption))
+
+        def confirm(name, *, deadline):
+            events.append(("confirm", name))
+            return True
+
+        wa._wait_row_sent = confirm
+        return wa
+
+    def test_uploads_overlap_up_to_cap(self):
+        """Test at most max_in_flight recipients are unconfirmed at once."""
+        from src.wa import FanoutJob
+
+        events = []
+        wa = self._wa(events)
+        sent = []
+        jobs = [
+            FanoutJob(key=k, contact_name=k, parts=[([], f"{k}1"), ([], f"{k}2")])
+            for k in ("A", "B", "C")
+        ]
+
+        failures = wa.send_fanout(
+            jobs, max_in_flight=2, on_sent=lambda j, i: sent.append((j.key, i))
+        )
+
+        assert failures == []
+        # B is submitted before A is confirmed; C only after A is confirmed.
+        assert events.index(("open", "B")) < events.index(("confirm", "A"))
+        assert events.index(("confirm", "A")) < events.index(("open", "C"))
+        assert sent == [("A", 0), ("A", 1), ("B", 0), ("B", 1), ("C", 0), ("C", 1)]
+
+    def test_failure_does_not_stop_other_recipients(self):
+        """Test a failing recipient is reported and the others still go out."""
+        from src.wa import FanoutJob
+
+        events = []
+        wa = self._wa(events)
+
+        def open_chat(name):
+            if name == "A":
+                raise RuntimeError("chat not found")
+
+        wa._open_chat = open_chat
+        sent = []
+        jobs = [
+            FanoutJob(key="A", contact_name="A", parts=[([], "a")]),
+            FanoutJob(key="B", contact_name="B", parts=[([], "b")]),
+        ]
+
+        failures = wa.send_fanout(
+            jobs, max_in_flight=2, on_sent=lambda j, i: sent.append(j.key)
+        )
+
+        assert [j.key for j, _ in failures] == ["A"]
+        assert sent == ["B"]
+
+    def test_known_phone_only_chat_is_pipelined(self):
+        """Test a phone-only recipient with a remembered chat skips the reload."""
+        from src.wa import FanoutJob
+
+        events = []
+        wa = self._wa(events)
+        wa._chats.record("phone:49151", "Alice", "search")
+        wa._page.evaluate.return_value = ""
+        wa.send_media_batch = Mock()
+        jobs = [FanoutJob(key="A", contact_name="", phone="49151", parts=[([], "a")])]
+
+        failures = wa.send_fanout(jobs, max_in_flight=2, on_sent=lambda j, i: None)
+
+        assert failures == []
+        wa.send_media_batch.assert_not_called()
+        wa._page.goto.assert_not_called()
+        assert ("confirm", "Alice") in events
+
+
+class TestOpenChat:
+    """Test chats are switched in-app once their route is known."""
+
+    def _wa(self, tmp_path, title="Alice"):
+        wa = WhatsAppSender(profile_dir=Path("wa_profile"))
+        wa._chats = ChatDirectory(tmp_path / "wa_chats.json")
+        wa._page = Mock()
+        wa._page.evaluate.return_value = title
+        return wa
+
+    def test_first_open_uses_link_and_remembers(self, tmp_path):
+        """Test a new number is opened by deep link and its chat title stored."""
+        wa = self._wa(tmp_path)
+
+        wa.open_chat(contact_name="", phone="+49 151")
+
+        wa._page.goto.assert_called_once()
+        assert wa._chats.get("phone:49151") == {"title": "Alice", "via": "row"}
+
+    def test_known_chat_switches_in_app(self, tmp_path):
+        """Test a remembered chat is opened from its chat-list row, no reload."""
+        wa = self._wa(tmp_path, title="Bob")
+        wa._chats.record("phone:49151", "Alice", "row")
+
+        wa.open_chat(contact_name="", phone="49151")
+
+        wa._page.goto.assert_not_called()
+        wa._page.locator.return_value.first.click.assert_called_once()
+
+    def test_failed_switch_falls_back_to_link(self, tmp_path):
+        """Test a stale route is dropped and the deep link used instead."""
+        wa = self._wa(tmp_path, title="Bob")
+        wa._chats.record("phone:49151", "Alice", "row")
+        wa._page.wait_for_function.side_effect = PlaywrightTimeoutError("no")
+        wa._open_chat = Mock()
+
+        wa.open_chat(contact_name="", phone="49151")
+
+        wa._page.goto.assert_called_once()
+        assert wa._chats.get("phone:49151") == {"title": "Bob", "via": "row"}
+
+
+class TestLoginDetection:
+    """Test logged-in/logged-out detection when WhatsApp Web opens."""
+
+    def _wa(self, states, *, headless):
+        wa = WhatsAppSender(profile_dir=Path("wa_profile"), headless=headless)
+        wa._page = Mock()
+        wa._page.evaluate.side_effect = states
+        return wa
+
+    def test_logged_in(self):
+        """Test the wait returns once the app UI is shown."""
+        wa = self._wa(["loading", "in"], headless=True)
+
+        with patch("src.wa.time.sleep"):
+            wa._wait_until_logged_in()
+
+    def test_headless_logged_out_fails_fast(self):
+        """Test a headless start raises once the QR page persists."""
+        wa = self._wa(itertools.repeat("out"), headless=True)
+        clock = itertools.count(1000.0, 1.0)
+
+        with patch("src.wa.time.sleep"), patch(
+            "src.wa.time.time", side_effect=lambda: next(clock)
+        ):
+            with pytest.raises(WhatsAppLoggedOutError):
+                wa._wait_until_logged_in(timeout_s=120)
+
+        assert next(clock) < 1000.0 + 10
+
+    def test_headed_waits_for_scan(self):
+        """Test a headed start keeps waiting while the QR code is shown."""
+        wa = self._wa(["out"] * 10 + ["in"], headless=False)
+        clock = itertools.count(1000.0, 1.0)
+
+        with patch("src.wa.time.sleep"), patch(
+            "src.wa.time.time", side_effect=lambda: next(clock)
+        ):
+            wa._wait_until_logged_in(timeout_s=120)
+
+    def test_headless_user_agent(self):
+        """Test the HeadlessChrome token is replaced before loading the app."""
+        wa = WhatsAppSender(profile_dir=Path("wa_profile"), headless=True)
+        wa._page, wa._context = Mock(), Mock()
+        wa._page.evaluate.return_value = "Mozilla/5.0 HeadlessChrome/120.0 Safari"
+
+        wa._spoof_desktop_user_agent()
+
+        headers = wa._context.set_extra_http_headers.call_args[0][0]
+        assert headers["User-Agent"] == "Mozilla/5.0 Chrome/120.0 Safari"
+        assert "Chrome/120.0" in wa._context.add_init_script.call_args[0][0]
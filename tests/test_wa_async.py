@@ -0,0 +1,98 @@
+"""Tests for the asyncio WhatsApp sender."""
+
+import asyncio
+import itertools
+from pathlib import Path
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.exceptions import WhatsAppLoggedOutError
+from src.wa_async import AsyncWhatsAppSender
+
+
+def _sender(tmp_path, **kw):
+    wa = AsyncWhatsAppSender(profile_dir=Path("wa_profile"), **kw)
+    wa._page = MagicMock()
+    wa._page.evaluate = AsyncMock(return_value="")
+    wa._page.keyboard.press = AsyncMock()
+    wa.open_chat = AsyncMock()
+    wa._upload = AsyncMock()
+    wa._fill_caption = AsyncMock()
+    wa._click_first = AsyncMock()
+    wa._wait_for_sent = AsyncMock(return_value=True)
+    return wa
+
+
+def _multi_input(wa, count):
+    wa._page.locator.return_value.first.count = AsyncMock(return_value=count)
+
+
+class TestSendMediaBatch:
+    """Test batches go out as one message when the input allows it."""
+
+    def test_multi_select_sends_once(self, tmp_path):
+        """Test all files are uploaded and sent together with the caption."""
+        wa = _sender(tmp_path)
+        _multi_input(wa, 1)
+        files = [tmp_path / "a.jpg", tmp_path / "b.jpg"]
+
+        asyncio.run(wa.send_media_batch("Friend", files, caption="hi"))
+
+        wa._upload.assert_awaited_once_with(files)
+        wa._fill_caption.assert_awaited_once_with("hi")
+        assert wa._click_first.await_args.kwargs["action"] == "batch_send"
+
+    def test_sequential_fallback_captions_first_only(self, tmp_path):
+        """Test without multi-select each file is its own message."""
+        wa = _sender(tmp_path)
+        _multi_input(wa, 0)
+        files = [tmp_path / "a.jpg", tmp_path / "b.jpg"]
+
+        asyncio.run(wa.send_media_batch("Friend", files, caption="hi"))
+
+        assert wa._upload.await_count == 2
+        wa._fill_caption.assert_awaited_once_with("hi")
+
+
+class TestAsyncLogin:
+    """Test logged-out detection matches the sync sender."""
+
+    def test_headless_logged_out_fails_fast(self, tmp_path):
+        """Test a persistent QR page raises instead of waiting 120s."""
+        wa = AsyncWhatsAppSender(profile_dir=Path("wa_profile"), headless=True)
+        wa._page = MagicMock()
+        wa._page.evaluate = AsyncMock(return_value="out")
+        clock = itertools.count(1000.0, 1.0)
+
+        with patch("src.wa_async.asyncio.sleep", AsyncMock()), patch(
+            "src.wa_async.time.time", side_effect=lambda: next(clock)
+        ):
+            with pytest.raises(WhatsAppLoggedOutError):
+                asyncio.run(wa._wait_until_logged_in(timeout_s=120))
+
+
+class TestConcurrency:
+    """Test senders share one event loop."""
+
+    def test_two_senders_overlap(self, tmp_path):
+        """Test two sends on one loop run concurrently, not back to back."""
+
+        async def slow_wait(*a, **k):
+            await asyncio.sleep(0.2)
+            return True
+
+        senders = [_sender(tmp_path), _sender(tmp_path)]
+        for wa in senders:
+            _multi_input(wa, 1)
+            wa._wait_for_sent = AsyncMock(side_effect=slow_wait)
+
+        async def both():
+            loop = asyncio.get_running_loop()
+            t0 = loop.time()
+            await asyncio.gather(
+                *(wa.send_media("F", tmp_path / "a.jpg") for wa in senders)
+            )
+            return loop.time() - t0
+
+        assert asyncio.run(both()) < 0.35
@@ -0,0 +1,54 @@
+"""Tests for starting WhatsApp in the background."""
+
+import threading
+from unittest.mock import Mock
+
+import pytest
+
+from src.wa_background import BackgroundSender
+
+
+class TestBackgroundSender:
+    """Test the sender is started and driven from one dedicated thread."""
+
+    def test_calls_run_on_sender_thread(self):
+        """Test start and sends all run on the thread that built the sender."""
+        threads = []
+        sender = Mock()
+        sender.start.side_effect = lambda: threads.append(threading.get_ident())
+        sender.send_text.side_effect = lambda *a, **k: threads.append(
+            threading.get_ident()
+        )
+        bg = BackgroundSender(lambda: sender)
+
+        bg.begin()
+        bg.start()
+        bg.send_text("Friend", "hi", phone="")
+        bg.stop()
+
+        sender.send_text.assert_called_once_with("Friend", "hi", phone="")
+        sender.stop.assert_called_once()
+        assert len(set(threads)) == 1
+        assert threads[0] != threading.get_ident()
+
+    def test_never_begun_launches_nothing(self):
+        """Test stopping an unused sender does not build one."""
+        factory = Mock()
+        bg = BackgroundSender(factory)
+
+        bg.stop()
+
+        factory.assert_not_called()
+        assert not bg.begun
+
+    def test_start_error_is_raised_to_caller(self):
+        """Test a failed launch surfaces in start() and stop() is safe."""
+        sender = Mock()
+        sender.start.side_effect = RuntimeError("no browser")
+        bg = BackgroundSender(lambda: sender)
+
+        with pytest.raises(RuntimeError, match="no browser"):
+            bg.start()
+        bg.stop()
+
+        sender.stop.assert_not_called()
@@ -0,0 +1,43 @@
+"""Tests for the remembered WhatsApp chat routes."""
+
+from src.wa_chats import VIA_ROW, VIA_SEARCH, ChatDirectory, chat_key
+
+
+class TestChatKey:
+    """Test cache keys prefer the phone number."""
+
+    def test_phone_then_name(self):
+        """Test phone digits win over the contact name."""
+        assert chat_key("Alice", "+49 151-23") == "phone:4915123"
+        assert chat_key("Alice") == "name:Alice"
+
+
+class TestChatDirectory:
+    """Test routes are persisted, updated and forgotten."""
+
+    def test_record_and_reload(self, tmp_path):
+        """Test a recorded route survives a reload."""
+        path = tmp_path / "wa_chats.json"
+        chats = ChatDirectory(path)
+        chats.record("phone:49", "Alice", VIA_ROW)
+
+        again = ChatDirectory(path)
+        assert again.get("phone:49") == {"title": "Alice", "via": VIA_ROW}
+        assert again.title("phone:49") == "Alice"
+        assert again.title("phone:1") == ""
+
+    def test_forget(self, tmp_path):
+        """Test a broken route is dropped from disk."""
+        path = tmp_path / "wa_chats.json"
+        chats = ChatDirectory(path)
+        chats.record("name:Bob", "Bob", VIA_SEARCH)
+        chats.forget("name:Bob")
+
+        assert ChatDirectory(path).get("name:Bob") is None
+
+    def test_corrupt_file(self, tmp_path):
+        """Test an unreadable cache starts empty."""
+        path = tmp_path / "wa_chats.json"
+        path.write_text("{not json", encoding="utf-8")
+
+        assert ChatDirectory(path).get("name:Bob") is None
@@ -0,0 +1,97 @@
+"""Tests for the long-lived WhatsApp daemon and its client."""
+
+import threading
+from pathlib import Path
+from unittest.mock import Mock
+
+import pytest
+
+from src.exceptions import WhatsAppConnectionError, WhatsAppSendError
+from src.media import InlineMedia
+from src.wa_daemon import WhatsAppDaemon, WhatsAppDaemonClient, connect
+
+
+@pytest.fixture
+def daemon():
+    sender = Mock()
+    d = WhatsAppDaemon(sender, port=0)
+    d.start_http()
+    worker = threading.Thread(target=d.run_jobs, daemon=True)
+    worker.start()
+    yield d, sender, WhatsAppDaemonClient(f"http://127.0.0.1:{d.port}")
+    d.shutdown()
+    worker.join(timeout=5)
+
+
+class TestWhatsAppDaemon:
+    """Test jobs submitted over HTTP run against the daemon's sender."""
+
+    def test_health(self, daemon):
+        """Test /health reports an idle daemon."""
+        _, _, client = daemon
+
+        h = client.health()
+
+        assert h["ok"] is True
+        assert h["busy"] is False
+        assert h["queued"] == 0
+
+    def test_send_text(self, daemon):
+        """Test send_text is forwarded to the sender."""
+        _, sender, client = daemon
+
+        client.send_text("Friend", "hello", phone="+49 123")
+
+        sender.send_text.assert_called_once_with("Friend", "hello", phone="+49 123")
+
+    def test_send_media_batch_materializes_inline(self, daemon, tmp_path):
+        """Test paths and in-memory media both reach the daemon as paths."""
+        _, sender, client = daemon
+        f = tmp_path / "a.jpg"
+        f.write_bytes(b"x")
+        inline = InlineMedia(name="b.jpg", mime_type="image/jpeg", data=b"y")
+
+        client.send_media_batch("Friend", [f, inline], caption="cap")
+
+        args, kwargs = sender.send_media_batch.call_args
+        paths = args[1]
+        assert paths[0] == f.resolve()
+        assert isinstance(paths[1], Path) and paths[1].read_bytes() == b"y"
+        assert kwargs["caption"] == "cap"
+
+    def test_failure_raises_send_error(self, daemon):
+        """Test a failing job surfaces as WhatsAppSendError in the client."""
+        _, sender, client = daemon
+        sender.send_text.side_effect = RuntimeError("no chat")
+
+        with pytest.raises(WhatsAppSendError, match="no chat"):
+            client.send_text("Friend", "hello")
+
+    def test_page_closed_restarts_and_retries(self, daemon):
+        """Test a closed page triggers one browser restart and a retry."""
+        _, sender, client = daemon
+        sender.send_text.side_effect = [
+            RuntimeError("Target page has been closed"),
+            None,
+        ]
+
+        client.send_text("Friend", "hello")
+
+        sender.stop.assert_called_once()
+        sender.start.assert_called_once()
+        assert sender.send_text.call_count == 2
+
+
+class TestConnect:
+    """Test daemon discovery."""
+
+    def test_connect_without_daemon(self):
+        """Test connect returns None when nothing listens."""
+        assert connect("http://127.0.0.1:9") is None
+
+    def test_unreachable_daemon_raises_connection_error(self):
+        """Test a daemon that went away raises a transient connection error."""
+        client = WhatsAppDaemonClient("http://127.0.0.1:9")
+
+        with pytest.raises(WhatsAppConnectionError):
+            client.send_text("Friend", "hello")
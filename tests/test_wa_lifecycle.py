@@ -0,0 +1,90 @@
+"""Tests for browser recycling and profile cache pruning."""
+
+from unittest.mock import Mock
+
+from src.wa_daemon import WhatsAppDaemon
+from src.wa_lifecycle import (
+    CACHE_CHECK_INTERVAL_S,
+    BrowserLifecycle,
+    profile_cache_size,
+    prune_profile_caches,
+)
+
+MIB = 1 << 20
+
+
+def _fill(path, size):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"\0" * size)
+
+
+class TestProfileCaches:
+    """Test sizing and pruning of re-creatable profile caches."""
+
+    def test_prune_keeps_login_data(self, tmp_path):
+        """Test caches are removed while storage holding the login is kept."""
+        _fill(tmp_path / "Default" / "Cache" / "Cache_Data" / "f_0001", 3000)
+        _fill(tmp_path / "Default" / "Service Worker" / "CacheStorage" / "x", 2000)
+        _fill(tmp_path / "Default" / "IndexedDB" / "wa.leveldb" / "000003.log", 500)
+        _fill(tmp_path / "Default" / "Local Storage" / "leveldb" / "LOG", 100)
+
+        assert profile_cache_size(tmp_path) == 5000
+        assert prune_profile_caches(tmp_path) == 5000
+        assert profile_cache_size(tmp_path) == 0
+        assert (tmp_path / "Default" / "IndexedDB" / "wa.leveldb").exists()
+        assert (tmp_path / "Default" / "Local Storage" / "leveldb" / "LOG").exists()
+
+
+class TestBrowserLifecycle:
+    """Test when the sender is recycled."""
+
+    def test_recycles_above_rss_limit(self, tmp_path):
+        """Test a browser over the RSS limit is stopped and started again."""
+        sender = Mock()
+        rss = Mock(return_value=100 * MIB)
+        lc = BrowserLifecycle(sender, tmp_path, max_rss_mib=200, rss=rss)
+
+        assert lc.between_jobs() is False
+        rss.return_value = 300 * MIB
+        assert lc.between_jobs() is True
+
+        sender.stop.assert_called_once()
+        sender.start.assert_called_once()
+        assert lc.recycles == 1
+
+    def test_cache_limit_prunes_on_recycle(self, tmp_path):
+        """Test oversized caches trigger a recycle that prunes them."""
+        sender = Mock()
+        now = [0.0]
+        lc = BrowserLifecycle(
+            sender,
+            tmp_path,
+            max_rss_mib=0,
+            max_cache_mib=1,
+            rss=lambda: 0,
+            clock=lambda: now[0],
+        )
+        assert lc.between_jobs() is False
+
+        _fill(tmp_path / "Default" / "Code Cache" / "js" / "a", 2 * MIB)
+        # Sized again only after the check interval.
+        assert lc.between_jobs() is False
+        now[0] += CACHE_CHECK_INTERVAL_S
+        assert lc.between_jobs() is True
+
+        assert profile_cache_size(tmp_path) == 0
+        sender.start.assert_called_once()
+
+    def test_daemon_checks_limits_after_each_job(self, tmp_path):
+        """Test the daemon consults the lifecycle once a job has finished."""
+        sender = Mock()
+        lifecycle = Mock()
+        d = WhatsAppDaemon(sender, port=0, lifecycle=lifecycle)
+        d.submit("send_text", {"contact_name": "Friend", "text": "hi"})
+        d._jobs.put(None)
+
+        d.run_jobs()
+        d.shutdown()
+
+        sender.send_text.assert_called_once()
+        lifecycle.between_jobs.assert_called_once()
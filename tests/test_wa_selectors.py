@@ -0,0 +1,99 @@
+"""Tests for selector racing and the learned selector ranking."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from src.wa_selectors import SelectorRanking, race_selectors
+
+
+class _FakePage:
+    """Just enough of a Playwright page: each selector is visible or not."""
+
+    def __init__(self, visible: set[str], *, appear: bool = True):
+        self._visible = visible
+        self._appear = appear
+        self.waits = 0
+
+    def locator(self, sel):
+        loc = MagicMock(name=sel)
+        loc.first = loc
+        loc.is_visible.return_value = sel in self._visible
+        loc.count.return_value = 1 if sel in self._visible else 0
+        loc.or_.return_value = loc
+
+        def wait_for(**_):
+            self.waits += 1
+            if not self._appear:
+                raise PlaywrightTimeoutError("nothing matched")
+
+        loc.wait_for.side_effect = wait_for
+        loc.selector = sel
+        return loc
+
+
+class TestSelectorRanking:
+    """Test winners are remembered and tried first."""
+
+    def test_order_and_record(self, tmp_path):
+        """Test the last winner moves to the front and is persisted."""
+        path = tmp_path / "wa_selectors.json"
+        r = SelectorRanking(path)
+        assert r.order("send", ["a", "b", "c"]) == ["a", "b", "c"]
+
+        r.record("send", "c")
+
+        assert r.order("send", ["a", "b", "c"]) == ["c", "a", "b"]
+        assert SelectorRanking(path).order("send", ["a", "b", "c"]) == ["c", "a", "b"]
+
+    def test_unknown_learned_selector_is_ignored(self, tmp_path):
+        """Test a learned selector no longer in the candidate list is dropped."""
+        path = tmp_path / "wa_selectors.json"
+        path.write_text('{"send": ["gone", "b"]}')
+
+        assert SelectorRanking(path).order("send", ["a", "b"]) == ["b", "a"]
+
+    def test_corrupt_file_is_ignored(self, tmp_path):
+        """Test a corrupt ranking file does not break anything."""
+        path = tmp_path / "wa_selectors.json"
+        path.write_text("{not json")
+
+        assert SelectorRanking(path).order("send", ["a"]) == ["a"]
+
+
+class TestRaceSelectors:
+    """Test all candidates are awaited at once."""
+
+    def test_single_wait_and_winner_recorded(self, tmp_path):
+        """Test one combined wait picks the matching selector and learns it."""
+        page = _FakePage(visible={"c"})
+        ranking = SelectorRanking(tmp_path / "r.json")
+
+        loc, sel = race_selectors(
+            page, ["a", "b", "c"], timeout_ms=100, ranking=ranking, action="x"
+        )
+
+        assert sel == "c" and loc.selector == "c"
+        assert page.waits == 1
+        assert ranking.order("x", ["a", "b", "c"])[0] == "c"
+
+    def test_learned_selector_preferred_among_matches(self, tmp_path):
+        """Test the known-good selector wins when several match."""
+        page = _FakePage(visible={"a", "c"})
+        ranking = SelectorRanking(tmp_path / "r.json")
+        ranking.record("x", "c")
+
+        _, sel = race_selectors(
+            page, ["a", "b", "c"], timeout_ms=100, ranking=ranking, action="x"
+        )
+
+        assert sel == "c"
+
+    def test_timeout_when_nothing_matches(self):
+        """Test a timeout is raised once, not per candidate."""
+        page = _FakePage(visible=set(), appear=False)
+
+        with pytest.raises(PlaywrightTimeoutError):
+            race_selectors(page, ["a", "b"], timeout_ms=100)
+        assert page.waits == 1
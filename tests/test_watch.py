@@ -0,0 +1,88 @@
+"""Tests for watch mode (adaptive polling + delivery windows)."""
+
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from src.ig import ActivityProbe
+from src.settings import RecipientSettings, ScheduleSettings
+from src.watch import AdaptiveInterval, _changed, in_delivery_window
+
+BERLIN = ZoneInfo("Europe/Berlin")
+
+
+class TestAdaptiveInterval:
+    """Test the poll interval adapts to activity and rate budget."""
+
+    def test_backs_off_when_quiet_and_resets_on_activity(self):
+        """Test quiet polls stretch the interval up to the max."""
+        iv = AdaptiveInterval(min_s=100, max_s=400, backoff=2.0, current=100)
+        now = datetime(2026, 1, 1, 3, 0, tzinfo=BERLIN)
+
+        iv.on_quiet()
+        iv.on_quiet()
+        iv.on_quiet()
+        assert iv.next_delay(now) == 400
+
+        iv.on_activity(now)
+        assert iv.next_delay(now) == 100
+
+    def test_busy_hour_keeps_interval_short(self):
+        """Test hours with past activity are polled more often."""
+        iv = AdaptiveInterval(min_s=100, max_s=1000, current=1000)
+        busy = datetime(2026, 1, 1, 9, 0, tzinfo=BERLIN)
+        iv.active_hours[9] = 3
+
+        assert iv.next_delay(busy) == 200
+        assert iv.next_delay(busy.replace(hour=3)) == 1000
+
+    def test_low_budget_slows_polling(self):
+        """Test a nearly exhausted hourly budget stretches the interval."""
+        iv = AdaptiveInterval(min_s=100, max_s=1000, current=100)
+        now = datetime(2026, 1, 1, 3, 0, tzinfo=BERLIN)
+
+        assert iv.next_delay(now, budget_left=1.0) == 100
+        assert iv.next_delay(now, budget_left=0.05) == 500
+
+
+class TestDeliveryWindow:
+    """Test per-recipient schedules act as delivery windows."""
+
+    def test_unscheduled_recipient_is_live(self):
+        """Test recipients without a schedule always receive forwards."""
+        r = RecipientSettings(id="r1", display_name="A", schedule_enabled=False)
+        now = datetime(2026, 1, 1, 3, 0, tzinfo=BERLIN)
+
+        assert in_delivery_window(r, ScheduleSettings(), now, window_min=60)
+
+    def test_scheduled_recipient_window(self):
+        """Test a scheduled recipient only receives inside [slot, slot+window)."""
+        r = RecipientSettings(
+            id="r1",
+            display_name="A",
+            schedule_enabled=True,
+            schedule_tz="Europe/Berlin",
+            schedule_time_hhmm="23:30",
+        )
+        sched = ScheduleSettings()
+
+        def at(h, m):
+            return datetime(2026, 1, 2, h, m, tzinfo=BERLIN)
+
+        assert not in_delivery_window(r, sched, at(23, 0), window_min=60)
+        assert in_delivery_window(r, sched, at(23, 45), window_min=60)
+        # Window crosses midnight.
+        assert in_delivery_window(r, sched, at(0, 15), window_min=60)
+        assert not in_delivery_window(r, sched, at(0, 45), window_min=60)
+
+
+class TestProbeChange:
+    """Test change detection on the activity probe."""
+
+    def test_changed(self):
+        """Test a new post or story counts as a change; an equal probe does not."""
+        a = ActivityProbe(media_count=10, latest_story_ts=100.0)
+
+        assert _changed(None, a)
+        assert not _changed(a, ActivityProbe(media_count=10, latest_story_ts=100.0))
+        assert _changed(a, ActivityProbe(media_count=11, latest_story_ts=100.0))
+        assert _changed(a, ActivityProbe(media_count=10, latest_story_ts=200.0))